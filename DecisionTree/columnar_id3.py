@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+
+import heapq
+from itertools import count
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from dataset.dataset import Attribute, AttributeName, AttributeValue
+from dataset.columnar import MISSING, ColumnarExamples, Encodings
+from . import id3, impurity
+from .decision_tree import Node, TreeNode, ThresholdNode, LeafNode, truncate
+
+##################
+# Impurity Lookup
+
+ImpurityFunc = Union[id3.EntropyFunc, impurity.CountImpurity]
+
+def count_impurity(entropy_func: ImpurityFunc) -> impurity.CountImpurity:
+    # the id3 criteria are adapters over count impurities
+    return id3.count_impurity(entropy_func) or entropy_func
+
+##################
+# Contingency Tables
+
+def label_counts(labels: np.ndarray, weights: np.ndarray, num_labels: int) -> np.ndarray:
+    return np.bincount(labels, weights=weights, minlength=num_labels)
+
+def contingency_table(column: np.ndarray, labels: np.ndarray, weights: np.ndarray, num_values: int, num_labels: int) -> np.ndarray:
+    known = column != MISSING
+    cells = column[known].astype(np.intp) * num_labels + labels[known]
+    counts = np.bincount(cells, weights=weights[known], minlength=num_values * num_labels)
+    return counts.reshape(num_values, num_labels)
+
+def code_matrix(examples: ColumnarExamples, names: Sequence[AttributeName]) -> np.ndarray:
+    # (example x attribute) codes, so a node gathers its rows in one step
+    if len(names) == 0:
+        return np.zeros((len(examples), 0), dtype=np.int8)
+    return np.stack([examples.columns[name] for name in names], axis=1)
+
+def contingency_tables(codes: np.ndarray, labels: np.ndarray, weights: np.ndarray, num_values: int, num_labels: int, missing: bool = False) -> np.ndarray:
+    # (attribute x value x label) tables for the (example x attribute) codes
+    # from one bincount; MISSING codes land in an extra value that is dropped,
+    # or with missing kept as value 0 ahead of the others
+    num_attributes = codes.shape[1]
+    cells = codes.astype(np.intp)
+    cells += 1
+    cells *= num_labels
+    cells += labels[:, None]
+    cells += np.arange(num_attributes, dtype=np.intp) * ((num_values + 1) * num_labels)
+    counts = np.bincount(
+        cells.ravel(), weights=np.repeat(weights, num_attributes),
+        minlength=num_attributes * (num_values + 1) * num_labels
+    )
+    counts = counts.reshape(num_attributes, num_values + 1, num_labels)
+    return counts if missing else counts[:, 1:]
+
+def stack_tables(tables: Dict[AttributeName, np.ndarray]) -> np.ndarray:
+    # (attribute x value x label), padded with empty values; an empty value
+    # has no weight, so it adds nothing to an attribute's expected impurity
+    stacked = np.zeros((len(tables), max((len(t) for t in tables.values()), default=0), max((t.shape[1] for t in tables.values()), default=0)))
+    for i, table in enumerate(tables.values()):
+        stacked[i, :len(table)] = table
+    return stacked
+
+def gains_from_stacked(impurity_func: impurity.CountImpurity, counts: np.ndarray, stacked: np.ndarray) -> np.ndarray:
+    # every attribute is scored by a single call of the criterion
+    value_weights = stacked.sum(axis=2) / counts.sum()
+    return impurity_func(counts) - (value_weights * impurity_func(stacked)).sum(axis=1)
+
+def gains_from_tables(
+        impurity_func: impurity.CountImpurity,
+        counts: np.ndarray,
+        tables: Dict[AttributeName, np.ndarray]
+) -> Dict[AttributeName, float]:
+    gains = gains_from_stacked(impurity_func, counts, stack_tables(tables))
+    return dict(zip(tables.keys(), gains.tolist()))
+
+def attribute_gains(entropy_func: ImpurityFunc, examples: ColumnarExamples, attributes: Set[Attribute], label: Attribute, encodings: Encodings) -> Dict[Attribute, float]:
+    labels = examples.columns[label.name]
+    num_labels = len(encodings[label.name].values)
+    tables = {
+        A.name: contingency_table(examples.columns[A.name], labels, examples.weights, len(encodings[A.name].values), num_labels)
+        for A in attributes
+    }
+    counts = label_counts(labels, examples.weights, num_labels)
+    gains = gains_from_tables(count_impurity(entropy_func), counts, tables)
+    return { A: gains[A.name] for A in attributes }
+
+def group_rows(codes: np.ndarray, rows: np.ndarray, num_values: int) -> List[np.ndarray]:
+    # one stable sort (or, for two codes, two masks) groups rows by code,
+    # keeping their order within each group; MISSING (-1) is dropped
+    if num_values == 2:
+        return [rows[codes == 0], rows[codes == 1]]
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(num_values + 1))
+    return [rows[order[bounds[v]:bounds[v + 1]]] for v in range(num_values)]
+
+def partition_indices(column: np.ndarray, rows: np.ndarray, num_values: int) -> List[np.ndarray]:
+    return group_rows(column[rows], rows, num_values)
+
+##################
+# Threshold Splits
+#
+# Continuous attributes are split into values below a threshold and the
+# rest. Each value is replaced once, up front, by its rank among the
+# attribute's distinct values (one sort per attribute). A node then gets
+# the label counts of every distinct value of every continuous attribute in
+# one pass, and scores all thresholds from their prefix sums.
+
+def rank_matrix(values: Sequence[np.ndarray], count: int, max_bins: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # (example x attribute) ranks into the concatenated distinct values (or
+    # bins of values) of all attributes, with missing (NaN) values of the
+    # j-th attribute ranked j past the last; the least and greatest value of
+    # each rank; and the offset of each attribute's first rank
+    lows, highs = [], []
+    for v in values:
+        distinct = np.unique(v[~np.isnan(v)])
+        if max_bins is None or len(distinct) <= max_bins:
+            lows.append(distinct)
+            highs.append(distinct)
+        else:
+            # bins of roughly equal numbers of examples, bounded by values
+            edges = np.unique(np.quantile(v[~np.isnan(v)], np.linspace(0, 1, max_bins + 1)[1:-1], method="inverted_cdf"))
+            bins = np.searchsorted(edges, distinct)
+            first = np.flatnonzero(np.diff(bins, prepend=-1))
+            lows.append(distinct[first])
+            highs.append(distinct[np.append(first[1:], len(distinct)) - 1])
+    offsets = np.cumsum([0] + [len(low) for low in lows])
+
+    ranks = np.empty((count, len(values)), dtype=np.int32)
+    for j, (v, low) in enumerate(zip(values, lows)):
+        known = ~np.isnan(v)
+        ranks[known, j] = np.searchsorted(low, v[known], side="right") - 1 + offsets[j]
+        ranks[~known, j] = offsets[-1] + j
+    concatenate = lambda arrays: np.concatenate(arrays) if len(arrays) > 0 else np.zeros(0)
+    return ranks, concatenate(lows), concatenate(highs), offsets
+
+def rank_label_counts(ranks: np.ndarray, labels: np.ndarray, weights: np.ndarray, num_ranks: int, num_labels: int) -> Tuple[np.ndarray, np.ndarray]:
+    # the ranks present among these rows, missing ranks included, and the
+    # label weights of each
+    num_attributes = ranks.shape[1]
+    cells = ranks.astype(np.intp)
+    cells *= num_labels
+    cells += labels[:, None]
+    cells = cells.ravel()
+    cell_weights = np.repeat(weights, num_attributes)
+
+    if ranks.size * 8 < num_ranks:
+        # few rows: sort their ranks
+        present, groups = np.unique(cells // num_labels, return_inverse=True)
+        counts = np.bincount(groups * num_labels + cells % num_labels, weights=cell_weights, minlength=len(present) * num_labels)
+        return present, counts.reshape(len(present), num_labels)
+
+    # many rows: count every rank
+    counts = np.bincount(cells, weights=cell_weights, minlength=(num_ranks + num_attributes) * num_labels)
+    counts = counts.reshape(num_ranks + num_attributes, num_labels)
+    present = np.flatnonzero(np.bincount(ranks.ravel(), minlength=num_ranks + num_attributes))
+    return present, counts[present]
+
+def split_missing(present: np.ndarray, counts: np.ndarray, num_ranks: int, num_attributes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # the present ranks of known values and their label counts, and the
+    # (attribute x label) counts of missing values
+    known = present < num_ranks
+    missing = np.zeros((num_attributes, counts.shape[1]))
+    missing[present[~known] - num_ranks] = counts[~known]
+    return present[known], counts[known], missing
+
+def threshold_sweep(present: np.ndarray, counts: np.ndarray, offsets: np.ndarray, num_labels: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # for every pair of consecutive present ranks of an attribute: the
+    # attribute, the two ranks, and the [below, above] x label table of
+    # splitting between them, from prefix sums of the ranks' label counts
+    attribute = np.searchsorted(offsets, present, side="right") - 1
+    bounds = np.searchsorted(attribute, np.arange(len(offsets)))
+    tables = np.empty((max(len(present) - 1, 0), 2, num_labels))
+    split = np.zeros(len(tables), dtype=bool)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start > 1:
+            below = np.cumsum(counts[start:end], axis=0)
+            tables[start:end - 1, 0] = below[:-1]
+            tables[start:end - 1, 1] = below[-1] - below[:-1]
+            split[start:end - 1] = True
+    return attribute[:-1][split], np.stack([present[:-1][split], present[1:][split]]), tables[split]
+
+def threshold_tables(ranks: np.ndarray, labels: np.ndarray, weights: np.ndarray, offsets: np.ndarray, num_labels: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    present, counts = rank_label_counts(ranks, labels, weights, int(offsets[-1]), num_labels)
+    present, counts, _ = split_missing(present, counts, int(offsets[-1]), ranks.shape[1])
+    return threshold_sweep(present, counts, offsets, num_labels)
+
+def threshold(lower: float, upper: float) -> float:
+    # halfway between two consecutive values, unless that rounds to the lower
+    middle = (lower + upper) / 2
+    return float(middle if middle > lower else upper)
+
+##################
+# Histograms
+#
+# With max_bins, continuous attributes are quantized into at most that many
+# bins up front, and each node keeps a histogram of its label weights over
+# the values of every attribute. A split counts the rows of all but its
+# largest branch; the largest branch's histogram is the parent's minus the
+# others', so each level costs about as much as its smaller halves.
+
+# the contingency tables of all categorical attributes, missing values
+# first, and the label weights and number of rows of every rank of the
+# continuous attributes, missing ranks included
+Histogram = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def subtract_histograms(parent: Histogram, parts: Sequence[Histogram], shared_counts: Optional[np.ndarray] = None) -> Histogram:
+    # shared_counts are the row counts of rows subtracted once too often
+    # because they are in more than one part
+    tables, weights, counts = np.array(parent[0], dtype=np.float64), np.array(parent[1], dtype=np.float64), parent[2].copy()
+    for part_tables, part_weights, part_counts in parts:
+        tables -= part_tables
+        weights -= part_weights
+        counts -= part_counts
+    if shared_counts is not None:
+        counts += shared_counts
+    # rounding may leave specks of weight on emptied cells
+    np.maximum(tables, 0.0, out=tables)
+    np.maximum(weights, 0.0, out=weights)
+    weights[counts == 0] = 0.0
+    return tables, weights, counts
+
+##################
+# Missing Values
+#
+# With fractional_missing, rows missing the split attribute go down every
+# branch that has rows, their weight shared out in proportion to the weight
+# of the rows with known values in each branch (as in C4.5). Gains count
+# them the same way, and nodes keep the fractions so prediction can follow
+# every branch for examples missing the value.
+
+def distribute_missing(tables: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    # (attribute x value x label) tables of known values plus the
+    # (attribute x label) weights of missing values spread over the values
+    value_weights = tables.sum(axis=2)
+    total = value_weights.sum(axis=1, keepdims=True)
+    fractions = value_weights / np.where(total > 0, total, 1.0)
+    return tables + fractions[:, :, None] * missing[:, None, :]
+
+##################
+# Split Search
+
+Thresholds = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# stats shared by every criterion at a node: the contingency tables of the
+# candidate categorical attributes with missing values first, the candidate
+# thresholds of the continuous attributes from threshold_sweep, and the
+# (attribute x label) weights of missing continuous values
+NodeStats = Tuple[np.ndarray, Thresholds, np.ndarray]
+
+# the attribute to split on, by position in name order, and its threshold
+# if it is continuous
+Split = Tuple[int, Optional[float]]
+
+# the rows, their weights and the histogram of each branch, the fraction of
+# the weight of known values in each branch (with fractional_missing), and
+# the candidate categorical attributes below
+Branches = Tuple[List[np.ndarray], List[np.ndarray], List[Optional[Histogram]], Optional[np.ndarray], List[int]]
+
+class _Splitter:
+    def __init__(
+            self,
+            examples: ColumnarExamples,
+            attributes: Set[Attribute],
+            label: Attribute,
+            encodings: Encodings,
+            max_bins: Optional[int] = None,
+            fractional_missing: bool = False
+    ):
+        self.encodings = encodings
+        self.label_encoding = encodings[label.name]
+        self.labels = examples.columns[label.name]
+        self.weights = examples.weights
+        self.num_labels = len(encodings[label.name].values)
+        self.max_bins = max_bins
+        self.fractional_missing = fractional_missing
+
+        # attributes are referred to by position in name order, so ties are
+        # broken the same way in every process
+        self.names = sorted(A.name for A in attributes)
+        self.categorical = [i for i, name in enumerate(self.names) if name not in examples.numeric]
+        self.numeric = [i for i, name in enumerate(self.names) if name in examples.numeric]
+        self.codes = code_matrix(examples, [self.names[i] for i in self.categorical])
+        self.num_values = max((len(encodings[self.names[i]].values) for i in self.categorical), default=0)
+        self.values = [examples.numeric[self.names[i]] for i in self.numeric]
+        self.ranks, self.lows, self.highs, self.offsets = rank_matrix(self.values, len(examples), max_bins)
+        self.num_ranks = int(self.offsets[-1])
+
+    def root(self, rows: np.ndarray) -> Tuple[np.ndarray, Optional[Histogram], List[int]]:
+        # the weights of the root's rows, its histogram if kept, and the
+        # candidate categorical attributes by column of codes
+        weights = self.weights[rows]
+        histogram = self.histogram(rows, weights) if self.max_bins is not None else None
+        return weights, histogram, list(range(len(self.categorical)))
+
+    def rank_counts(self, rows: np.ndarray) -> np.ndarray:
+        return np.bincount(self.ranks[rows].ravel(), minlength=self.num_ranks + len(self.numeric))
+
+    def histogram(self, rows: np.ndarray, weights: np.ndarray) -> Histogram:
+        labels = self.labels[rows]
+        num_ranks = self.num_ranks + len(self.numeric)
+        tables = contingency_tables(self.codes[rows], labels, weights, self.num_values, self.num_labels, missing=True)
+        cells = self.ranks[rows].astype(np.intp) * self.num_labels + labels[:, None]
+        rank_weights = np.bincount(cells.ravel(), weights=np.repeat(weights, len(self.numeric)), minlength=num_ranks * self.num_labels)
+        return tables, rank_weights.reshape(num_ranks, self.num_labels), self.rank_counts(rows)
+
+    def stats(self, rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int]) -> NodeStats:
+        return (self.categorical_stats(rows, weights, histogram, candidates), *self.numeric_stats(rows, weights, histogram))
+
+    def categorical_stats(self, rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int]) -> np.ndarray:
+        if histogram is not None:
+            return histogram[0][candidates]
+        codes = self.codes[np.ix_(rows, candidates)]
+        return contingency_tables(codes, self.labels[rows], weights, self.num_values, self.num_labels, missing=True)
+
+    def numeric_stats(self, rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram]) -> Tuple[Thresholds, np.ndarray]:
+        if histogram is not None:
+            _, rank_weights, rank_counts = histogram
+            present = np.flatnonzero(rank_counts[:self.num_ranks])
+            return threshold_sweep(present, rank_weights[present], self.offsets, self.num_labels), rank_weights[self.num_ranks:]
+        if len(self.numeric) == 0:
+            return (np.zeros(0, dtype=np.intp), np.zeros((2, 0), dtype=np.intp), np.zeros((0, 2, self.num_labels))), np.zeros((0, self.num_labels))
+        present, counts = rank_label_counts(self.ranks[rows], self.labels[rows], weights, self.num_ranks, self.num_labels)
+        present, counts, missing = split_missing(present, counts, self.num_ranks, len(self.numeric))
+        return threshold_sweep(present, counts, self.offsets, self.num_labels), missing
+
+    def best_split(self, impurity_func: impurity.CountImpurity, counts: np.ndarray, stats: NodeStats, candidates: List[int]) -> Optional[Split]:
+        best = self.best_split_gain(impurity_func, counts, stats, candidates)
+        return None if best is None else best[0]
+
+    def best_split_gain(self, impurity_func: impurity.CountImpurity, counts: np.ndarray, stats: NodeStats, candidates: List[int]) -> Optional[Tuple[Split, float]]:
+        tables, (attribute, split_ranks, split_tables), missing = stats
+        known = tables[:, 1:]
+        if self.fractional_missing:
+            known = distribute_missing(known, tables[:, 0])
+            split_tables = distribute_missing(split_tables, missing[attribute])
+
+        gains = np.full(len(self.names), -np.inf)
+        if len(candidates) > 0:
+            candidate_gains = gains_from_stacked(impurity_func, counts, known)
+            if self.fractional_missing:
+                # attributes missing from every row cannot be split on
+                candidate_gains[tables[:, 1:].sum(axis=(1, 2)) <= 0] = -np.inf
+            gains[[self.categorical[c] for c in candidates]] = candidate_gains
+
+        thresholds: Dict[int, float] = {}
+        if len(attribute) > 0:
+            split_gains = gains_from_stacked(impurity_func, counts, split_tables)
+            bounds = np.searchsorted(attribute, np.arange(len(self.numeric) + 1))
+            for j, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+                if end > start:
+                    k = start + int(np.argmax(split_gains[start:end]))
+                    gains[self.numeric[j]] = split_gains[k]
+                    lower, upper = split_ranks[:, k]
+                    thresholds[self.numeric[j]] = threshold(self.highs[lower], self.lows[upper])
+
+        # argmax keeps the first of tied attributes
+        a = int(np.argmax(gains)) if len(gains) > 0 else 0
+        if len(gains) == 0 or gains[a] == -np.inf:
+            return None
+        return (a, thresholds.get(a)), float(gains[a])
+
+    def num_branches(self, split: Split) -> int:
+        a, threshold = split
+        return 2 if threshold is not None else len(self.encodings[self.names[a]].values)
+
+    def split(self, rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int], split: Split) -> Branches:
+        a, threshold = split
+        if threshold is None:
+            codes = self.codes[rows, self.categorical.index(a)]
+            candidates = [c for c in candidates if self.categorical[c] != a]
+        else:
+            values = self.values[self.numeric.index(a)][rows]
+            codes = np.where(np.isnan(values), MISSING, values >= threshold).astype(np.int8)
+        positions = group_rows(codes, np.arange(len(rows)), self.num_branches(split))
+        branch_rows = [rows[p] for p in positions]
+        branch_weights = [weights[p] for p in positions]
+
+        fractions = None
+        missing = np.flatnonzero(codes == MISSING)
+        if self.fractional_missing:
+            known_weights = np.array([w.sum() for w in branch_weights])
+            fractions = known_weights / known_weights.sum()
+            if len(missing) > 0:
+                for b in np.flatnonzero(fractions > 0):
+                    branch_rows[b] = np.concatenate([branch_rows[b], rows[missing]])
+                    branch_weights[b] = np.concatenate([branch_weights[b], weights[missing] * fractions[b]])
+        if histogram is None:
+            return branch_rows, branch_weights, [None for _ in branch_rows], fractions, candidates
+
+        largest = max(range(len(branch_rows)), key=lambda b: len(branch_rows[b]))
+        histograms: List[Optional[Histogram]] = [
+            self.histogram(rows_b, weights_b) if b != largest and len(rows_b) > 0 else None
+            for b, (rows_b, weights_b) in enumerate(zip(branch_rows, branch_weights))
+        ]
+        parts = [h for h in histograms if h is not None]
+        shared_counts = None
+        if len(missing) > 0 and fractions is None:
+            # rows missing the split's attribute take no branch
+            parts.append(self.histogram(rows[missing], weights[missing]))
+        elif len(missing) > 0:
+            # or take every branch with rows
+            shared_counts = (np.count_nonzero(fractions > 0) - 1) * self.rank_counts(rows[missing])
+        histograms[largest] = subtract_histograms(histogram, parts, shared_counts)
+        return branch_rows, branch_weights, histograms, fractions, candidates
+
+    def node(self, split: Split, children: List[Node], label: AttributeValue, fractions: Optional[np.ndarray] = None) -> Node:
+        a, threshold = split
+        if threshold is not None:
+            below_fraction = None if fractions is None else float(fractions[0])
+            return ThresholdNode(self.names[a], threshold, children[0], children[1], label=label, below_fraction=below_fraction)
+        values = self.encodings[self.names[a]].values
+        root = TreeNode(self.names[a], label=label, fractions=None if fractions is None else dict(zip(values, fractions.tolist())))
+        for value, child in zip(values, children):
+            root.add_child(value, child)
+        return root
+
+##################
+# ID3
+
+# Trees are grown from a work list of nodes instead of by recursion. Depth
+# first takes the most recently found node next; best first takes the node
+# whose split gains the most. With max_leaves, a node that would take the
+# tree past that many leaves stays a leaf. delegate may take over the whole
+# subtree of a node that is neither pure nor at max_depth by returning a
+# placeholder for it.
+def _grow(
+        splitter: _Splitter,
+        impurity_func: impurity.CountImpurity,
+        max_depth: Optional[int],
+        rows: np.ndarray,
+        weights: np.ndarray,
+        histogram: Optional[Histogram],
+        candidates: List[int],
+        depth: int = 0,
+        max_leaves: Optional[int] = None,
+        best_first: bool = False,
+        delegate: Optional[Callable[[np.ndarray, np.ndarray, Optional[Histogram], List[int], int], Optional[Node]]] = None
+) -> Node:
+    label_encoding = splitter.label_encoding
+
+    # nodes that were split, as (split, children, label, fractions) in the
+    # order they were split; a child is a finished node or the index of a
+    # split node
+    Child = Union[Node, int, None]
+    splits: List[Tuple[Split, List[Child], AttributeValue, Optional[np.ndarray]]] = []
+    root: List[Child] = [None]
+
+    # nodes waiting to be split, each with the slot its subtree goes in
+    Waiting = Tuple[np.ndarray, np.ndarray, Optional[Histogram], List[int], int, Split, AttributeValue, Tuple[List[Child], int]]
+    waiting: List[Tuple[float, int, Waiting]] = []
+    order = count()
+    leaves = 1
+
+    def add(rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int], depth: int, slot: Tuple[List[Child], int]):
+        assert len(rows) > 0
+        children, b = slot
+        labels = splitter.labels[rows]
+        counts = label_counts(labels, weights, splitter.num_labels)
+        present = np.flatnonzero(np.bincount(labels, minlength=splitter.num_labels))
+        if len(present) < 2:
+            children[b] = LeafNode(label_encoding.decode(present[0]))
+            return
+
+        most_common_label = label_encoding.decode(int(np.argmax(counts)))
+        if max_depth is not None and depth >= max_depth:
+            children[b] = LeafNode(most_common_label)
+            return
+        if delegate is not None:
+            placeholder = delegate(rows, weights, histogram, candidates, depth)
+            if placeholder is not None:
+                children[b] = placeholder
+                return
+
+        best = splitter.best_split_gain(impurity_func, counts, splitter.stats(rows, weights, histogram, candidates), candidates)
+        if best is None:
+            children[b] = LeafNode(most_common_label)
+            return
+
+        split, gain = best
+        node = (rows, weights, histogram, candidates, depth, split, most_common_label, slot)
+        if best_first:
+            heapq.heappush(waiting, (-gain, next(order), node))
+        else:
+            waiting.append((-gain, next(order), node))
+
+    add(rows, weights, histogram, candidates, depth, (root, 0))
+    while len(waiting) > 0:
+        _, _, (rows, weights, histogram, candidates, depth, split, most_common_label, (children, b)) = heapq.heappop(waiting) if best_first else waiting.pop()
+        num_branches = splitter.num_branches(split)
+        if max_leaves is not None and leaves + num_branches - 1 > max_leaves:
+            children[b] = LeafNode(most_common_label)
+            continue
+        leaves += num_branches - 1
+
+        children[b] = len(splits)
+        node_children: List[Child] = [None] * num_branches
+        branch_rows, branch_weights, branch_histograms, fractions, remaining = splitter.split(rows, weights, histogram, candidates, split)
+        splits.append((split, node_children, most_common_label, fractions))
+        del histogram
+
+        # depth first visits the branches in order, so add them in reverse
+        branches = list(enumerate(zip(branch_rows, branch_weights, branch_histograms)))
+        for b_v, (rows_v, weights_v, histogram_v) in branches if best_first else reversed(branches):
+            if len(rows_v) == 0:
+                node_children[b_v] = LeafNode(most_common_label)
+            else:
+                add(rows_v, weights_v, histogram_v, remaining, depth + 1, (node_children, b_v))
+
+    # children were split after their parents
+    nodes: List[Node] = [None] * len(splits)
+    for i in reversed(range(len(splits))):
+        split, node_children, most_common_label, fractions = splits[i]
+        nodes[i] = splitter.node(split, [nodes[c] if isinstance(c, int) else c for c in node_children], most_common_label, fractions)
+    return nodes[root[0]] if isinstance(root[0], int) else root[0]
+
+def ID3(
+        entropy_func: ImpurityFunc,
+        max_depth: Optional[int],
+        examples: ColumnarExamples,
+        attributes: Set[Attribute],
+        label: Attribute,
+        encodings: Encodings,
+        indices: Optional[np.ndarray] = None,
+        max_bins: Optional[int] = None,
+        max_leaves: Optional[int] = None,
+        best_first: bool = False,
+        fractional_missing: bool = False
+) -> Node:
+    # continuous attributes (those in examples.numeric) are split on the
+    # best threshold at each node and may be split again further down; with
+    # max_bins, only between bins of their values (see Histograms). With
+    # max_leaves, best_first spends the leaves on the splits that gain most.
+    # See Missing Values for fractional_missing.
+    splitter = _Splitter(examples, attributes, label, encodings, max_bins, fractional_missing)
+
+    # nodes pass down row indices into the shared examples instead of copies;
+    # indices may repeat rows, e.g. for a bootstrap sample
+    if indices is None:
+        indices = np.arange(len(examples))
+    rows = np.asarray(indices, dtype=np.intp)
+    return _grow(splitter, count_impurity(entropy_func), max_depth, rows, *splitter.root(rows), max_leaves=max_leaves, best_first=best_first)
+
+def ID3_sweep(
+        entropy_func: ImpurityFunc,
+        max_depths: Iterable[int],
+        examples: ColumnarExamples,
+        attributes: Set[Attribute],
+        label: Attribute,
+        encodings: Encodings,
+        indices: Optional[np.ndarray] = None,
+        max_bins: Optional[int] = None,
+        fractional_missing: bool = False
+) -> Dict[int, Node]:
+    # grow once to the deepest depth; shallower trees are truncations of it
+    max_depths = list(max_depths)
+    tree = ID3(entropy_func, max(max_depths), examples, attributes, label, encodings, indices, max_bins, fractional_missing=fractional_missing)
+    return { max_depth: truncate(tree, max_depth) for max_depth in max_depths }
+
+def ID3_multi(
+        entropy_funcs: Sequence[ImpurityFunc],
+        max_depth: Optional[int],
+        examples: ColumnarExamples,
+        attributes: Set[Attribute],
+        label: Attribute,
+        encodings: Encodings,
+        indices: Optional[np.ndarray] = None,
+        max_bins: Optional[int] = None,
+        fractional_missing: bool = False
+) -> List[Node]:
+    # grows one tree per criterion, the same trees ID3 grows for each. A
+    # node's rows are fixed by the set of conditions on its path, so its
+    # label counts and contingency tables are computed once and shared by
+    # every criterion whose tree reaches the same conditions, in any order.
+    # With fractional_missing the weights of rows missing a split attribute
+    # depend on the order of the splits above them, so only trees reaching
+    # the same conditions in the same order share them.
+    impurity_funcs = [count_impurity(f) for f in entropy_funcs]
+    label_encoding = encodings[label.name]
+    num_labels = len(label_encoding.values)
+    splitter = _Splitter(examples, attributes, label, encodings, max_bins, fractional_missing)
+
+    # a condition is a split and the branch taken
+    Path = Tuple[Tuple[Split, int], ...]
+    node_stats: Dict[Union[Path, FrozenSet[Tuple[Split, int]]], NodeStats] = {}
+
+    # groups of criteria that split a node the same way, as (split,
+    # criteria, children, label, fractions) in the order they were split. A
+    # child gives every criterion of its group a finished node or the index
+    # of a split group, as does a node waiting to be split.
+    Child = Dict[int, Union[Node, int]]
+    splits: List[Tuple[Split, List[int], List[Optional[Child]], AttributeValue, Optional[np.ndarray]]] = []
+    root: List[Optional[Child]] = [None]
+
+    # nodes waiting to be split, each with the slot its subtrees go in
+    Waiting = Tuple[np.ndarray, np.ndarray, Optional[Histogram], List[int], Path, List[int], int, Tuple[List[Optional[Child]], int]]
+    waiting: List[Waiting] = []
+
+    if indices is None:
+        indices = np.arange(len(examples))
+    rows = np.asarray(indices, dtype=np.intp)
+    waiting.append((rows, *splitter.root(rows), (), list(range(len(impurity_funcs))), 0, (root, 0)))
+
+    while len(waiting) > 0:
+        rows, weights, histogram, candidates, path, criteria, depth, (children, b) = waiting.pop()
+        assert len(rows) > 0
+
+        labels = splitter.labels[rows]
+        counts = label_counts(labels, weights, num_labels)
+        present = np.flatnonzero(np.bincount(labels, minlength=num_labels))
+        if len(present) < 2:
+            leaf = LeafNode(label_encoding.decode(present[0]))
+            children[b] = { c: leaf for c in criteria }
+            continue
+
+        most_common_label = label_encoding.decode(int(np.argmax(counts)))
+        if max_depth is not None and depth >= max_depth:
+            leaf = LeafNode(most_common_label)
+            children[b] = { c: leaf for c in criteria }
+            continue
+
+        key = path if fractional_missing else frozenset(path)
+        if key not in node_stats:
+            node_stats[key] = splitter.stats(rows, weights, histogram, candidates)
+        stats = node_stats[key]
+
+        # criteria choosing the same split also share the children
+        groups: Dict[Optional[Split], List[int]] = {}
+        for c in criteria:
+            groups.setdefault(splitter.best_split(impurity_funcs[c], counts, stats, candidates), []).append(c)
+
+        node: Child = {}
+        for split, group in groups.items():
+            if split is None:
+                leaf = LeafNode(most_common_label)
+                node.update({ c: leaf for c in group })
+                continue
+
+            branch_rows, branch_weights, branch_histograms, fractions, remaining = splitter.split(rows, weights, histogram, candidates, split)
+            group_children: List[Optional[Child]] = [None] * len(branch_rows)
+            node.update({ c: len(splits) for c in group })
+            splits.append((split, group, group_children, most_common_label, fractions))
+
+            # the branches are visited in order, so add them in reverse
+            branches = list(enumerate(zip(branch_rows, branch_weights, branch_histograms)))
+            for b_v, (rows_v, weights_v, histogram_v) in reversed(branches):
+                if len(rows_v) == 0:
+                    leaf = LeafNode(most_common_label)
+                    group_children[b_v] = { c: leaf for c in group }
+                else:
+                    waiting.append((rows_v, weights_v, histogram_v, remaining, path + ((split, b_v),), group, depth + 1, (group_children, b_v)))
+        children[b] = node
+        del histogram
+
+    # groups were split after their parents
+    nodes: List[Dict[int, Node]] = [{} for _ in splits]
+    def resolve(child: Child, c: int) -> Node:
+        return nodes[child[c]][c] if isinstance(child[c], int) else child[c]
+    for i in reversed(range(len(splits))):
+        split, group, group_children, most_common_label, fractions = splits[i]
+        for c in group:
+            nodes[i][c] = splitter.node(split, [resolve(child, c) for child in group_children], most_common_label, fractions)
+    return [resolve(root[0], c) for c in range(len(impurity_funcs))]
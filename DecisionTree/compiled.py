@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dataset.dataset import Attribute, AttributeName, AttributeValue
+from dataset.columnar import MISSING, ColumnarExamples, Encodings
+from .decision_tree import Node, TreeNode, ThresholdNode, LeafNode
+
+##################
+# Type Definitions
+
+# feature of leaf nodes, and label of internal nodes without a recorded
+# most common label
+NONE = -1
+
+# A tree lowered into parallel arrays indexed by node id, with the root at
+# id 0. The child of node n for value code c of its feature is
+# children[child_offset[n] + 1 + c]. children[child_offset[n]] is n itself,
+# as is the child of any value without a branch, so examples with a missing
+# value (and examples at a leaf) stay where they are and take the node's
+# label. Values and labels use the dataset's encodings.
+#
+# Trees with threshold nodes also have a threshold per node, NaN except at
+# threshold nodes, whose children are below and then above the threshold.
+# Continuous attributes have no attribute_values.
+#
+# Trees whose nodes kept branch fractions (see columnar_id3's Missing
+# Values) also have a fraction per slot, NaN at the slots of other nodes.
+# An example missing the value of such a node follows every branch, and the
+# labels it reaches vote with its share in each.
+@dataclass(frozen = True)
+class CompiledTree:
+    attribute_names: Tuple[AttributeName, ...]
+    attribute_values: Tuple[Tuple[AttributeValue, ...], ...]
+    label_values: Tuple[AttributeValue, ...]
+    feature: np.ndarray
+    child_offset: np.ndarray
+    children: np.ndarray
+    label: np.ndarray
+    height: int
+    threshold: Optional[np.ndarray] = None
+    fraction: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.feature)
+
+##################
+# Compilation
+
+def _used_attributes(tree: Node) -> List[AttributeName]:
+    names = set()
+    stack = [tree]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, TreeNode):
+            names.add(node.attribute_name)
+            stack.extend(node.children.values())
+        elif isinstance(node, ThresholdNode):
+            names.add(node.attribute_name)
+            stack.extend((node.below, node.above))
+    return sorted(names)
+
+def compile_tree(tree: Node, encodings: Encodings, label: Attribute) -> CompiledTree:
+    attribute_names = _used_attributes(tree)
+    feature_index = { name: i for i, name in enumerate(attribute_names) }
+    label_encoding = encodings[label.name]
+
+    feature: List[int] = []
+    child_offset: List[int] = []
+    children: List[int] = []
+    label_codes: List[int] = []
+    thresholds: List[float] = []
+    fractions: List[float] = []
+
+    # number nodes in breadth first order so each level is contiguous
+    num_nodes = 1
+    height = 0
+    queue = deque([(tree, 0)])
+    while len(queue) > 0:
+        node, depth = queue.popleft()
+        node_id = len(feature)
+        height = max(height, depth)
+        child_offset.append(len(children))
+        children.append(node_id)
+        fractions.append(np.nan)
+        thresholds.append(np.nan)
+        if isinstance(node, LeafNode):
+            feature.append(NONE)
+            label_codes.append(label_encoding.encode(node.label))
+        elif isinstance(node, ThresholdNode):
+            feature.append(feature_index[node.attribute_name])
+            label_codes.append(NONE if node.label is None else label_encoding.encode(node.label))
+            thresholds[-1] = node.threshold
+            for child in (node.below, node.above):
+                children.append(num_nodes)
+                num_nodes += 1
+                queue.append((child, depth + 1))
+            fractions.extend([np.nan, np.nan] if node.below_fraction is None else [node.below_fraction, 1.0 - node.below_fraction])
+        else:
+            feature.append(feature_index[node.attribute_name])
+            label_codes.append(NONE if node.label is None else label_encoding.encode(node.label))
+            for value in encodings[node.attribute_name].values:
+                fractions.append(np.nan if node.fractions is None else node.fractions.get(value, 0.0))
+                if value in node.children:
+                    children.append(num_nodes)
+                    num_nodes += 1
+                    queue.append((node.children[value], depth + 1))
+                else:
+                    children.append(node_id)
+
+    threshold = np.array(thresholds, dtype=np.float64)
+    fraction = np.array(fractions, dtype=np.float64)
+    return CompiledTree(
+        tuple(attribute_names),
+        tuple(encodings[name].values if name in encodings else () for name in attribute_names),
+        label_encoding.values,
+        np.array(feature, dtype=np.int32),
+        np.array(child_offset, dtype=np.int32),
+        np.array(children, dtype=np.int32),
+        np.array(label_codes, dtype=np.int32),
+        height,
+        None if np.isnan(threshold).all() else threshold,
+        None if np.isnan(fraction).all() else fraction
+    )
+
+##################
+# Prediction
+
+def _feature_matrix(examples: ColumnarExamples, attribute_names: Sequence[AttributeName], numeric: bool = False) -> np.ndarray:
+    # flattened (feature x example) codes shifted past each node's own slot,
+    # plus a row of zeros that routes leaves to their own slot. With numeric
+    # the matrix is float and also holds the values of continuous attributes.
+    n = len(examples)
+    X = np.zeros((len(attribute_names) + 1) * n, dtype=np.float64 if numeric else np.int32)
+    for f, name in enumerate(attribute_names):
+        if name in examples.columns:
+            X[f * n:(f + 1) * n] = examples.columns[name]
+            X[f * n:(f + 1) * n] += 1
+        elif numeric:
+            X[f * n:(f + 1) * n] = examples.numeric[name]
+    return X
+
+def _slot_thresholds(compiled: CompiledTree) -> np.ndarray:
+    slot_threshold = np.full(len(compiled.children), np.nan)
+    slot_threshold[compiled.child_offset] = compiled.threshold
+    return slot_threshold
+
+def _threshold_codes(x: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # at a threshold node the example's value becomes branch 1 (below) or 2
+    # (above), or 0 (stay) when it is missing
+    return np.where(np.isnan(t), x, np.where(np.isnan(x), 0, 1 + (x >= t)))
+
+def _route_fractions(
+        compiled: CompiledTree,
+        X: np.ndarray,
+        n: int,
+        next_slot: np.ndarray,
+        slot_feature: np.ndarray,
+        slot_label: np.ndarray,
+        steps: int
+) -> np.ndarray:
+    # routes (example, slot, share) triples; an example missing the value
+    # of a node with fractions becomes one triple per branch
+    assert compiled.fraction is not None
+    num_branches = np.diff(np.append(compiled.child_offset, len(compiled.children))) - 1
+    splits_missing = np.zeros(len(compiled.children), dtype=bool)
+    has_branches = compiled.feature != NONE
+    splits_missing[compiled.child_offset[has_branches]] = ~np.isnan(compiled.fraction[compiled.child_offset[has_branches] + 1])
+    slot_branches = np.zeros(len(compiled.children), dtype=np.intp)
+    slot_branches[compiled.child_offset] = num_branches
+
+    slot_threshold = _slot_thresholds(compiled) if compiled.threshold is not None else None
+
+    example = np.arange(n)
+    slot = np.zeros(n, dtype=np.intp)
+    share = np.ones(n)
+    for _ in range(steps):
+        code = X.take(slot_feature.take(slot) + example)
+        if slot_threshold is not None:
+            code = _threshold_codes(code, slot_threshold.take(slot))
+        code = code.astype(np.intp)
+        missing = (code == 0) & splits_missing.take(slot)
+        if not missing.any():
+            slot = next_slot.take(slot + code)
+            continue
+
+        m = np.flatnonzero(missing)
+        branches = slot_branches.take(slot[m])
+        copies = np.repeat(m, branches)
+        branch_slot = slot[copies] + 1 + np.arange(len(copies)) - np.repeat(np.cumsum(branches) - branches, branches)
+        copy_share = share[copies] * compiled.fraction.take(branch_slot)
+        kept = np.flatnonzero(~missing)
+        followed = copy_share > 0
+        example = np.concatenate([example[kept], example[copies][followed]])
+        slot = np.concatenate([next_slot.take(slot[kept] + code[kept]), next_slot.take(branch_slot[followed])])
+        share = np.concatenate([share[kept], copy_share[followed]])
+
+    labels = slot_label.take(slot)
+    reached = labels != NONE
+    votes = np.zeros((n, len(compiled.label_values)))
+    np.add.at(votes, (example[reached], labels[reached]), share[reached])
+    return np.where(votes.sum(axis=1) > 0, np.argmax(votes, axis=1), NONE).astype(np.int32)
+
+def _route(compiled: CompiledTree, X: np.ndarray, n: int, feature_rows: np.ndarray, max_depth: Optional[int] = None) -> np.ndarray:
+    # track each example by its node's first slot so that a step needs only
+    # three gathers: the node's feature, the example's code, the next slot
+    next_slot = compiled.child_offset.take(compiled.children)
+    slot_feature = np.full(len(compiled.children), (len(X) // n - 1) * n, dtype=np.int32)
+    slot_feature[compiled.child_offset] = np.where(compiled.feature == NONE, len(X) // n - 1, feature_rows) * n
+    slot_label = np.full(len(compiled.children), NONE, dtype=np.int32)
+    slot_label[compiled.child_offset] = compiled.label
+
+    steps = compiled.height if max_depth is None else min(compiled.height, max_depth)
+    if compiled.fraction is not None:
+        return _route_fractions(compiled, X, n, next_slot, slot_feature, slot_label, steps)
+
+    rows = np.arange(n, dtype=np.int32)
+    slot = np.zeros(n, dtype=np.int32)
+    step = np.empty(n, dtype=np.int32)
+    if compiled.threshold is None:
+        for _ in range(steps):
+            slot_feature.take(slot, out=step, mode="clip")
+            step += rows
+            X.take(step, out=step, mode="clip")
+            step += slot
+            next_slot.take(step, out=slot, mode="clip")
+    else:
+        slot_threshold = _slot_thresholds(compiled)
+        for _ in range(steps):
+            slot_feature.take(slot, out=step, mode="clip")
+            step += rows
+            x = X.take(step, mode="clip")
+            t = slot_threshold.take(slot, mode="clip")
+            step[:] = _threshold_codes(x, t)
+            step += slot
+            next_slot.take(step, out=slot, mode="clip")
+    return slot_label.take(slot)
+
+def predict_batch(compiled: CompiledTree, examples: ColumnarExamples, max_depth: Optional[int] = None) -> np.ndarray:
+    # returns a label code per example; examples that stop at an internal
+    # node (because of max_depth, a missing value or a value without a
+    # branch) take its label, which may be NONE
+    X = _feature_matrix(examples, compiled.attribute_names, compiled.threshold is not None)
+    feature_rows = np.maximum(compiled.feature, 0)
+    return _route(compiled, X, len(examples), feature_rows, max_depth)
+
+def predict_forest(trees: Sequence[CompiledTree], examples: ColumnarExamples, weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    # weighted majority vote of the trees' predictions (one vote each by default)
+    attribute_names = sorted(set(name for compiled in trees for name in compiled.attribute_names))
+    feature_index = { name: i for i, name in enumerate(attribute_names) }
+    X = _feature_matrix(examples, attribute_names)
+    X_numeric = _feature_matrix(examples, attribute_names, True) if any(compiled.threshold is not None for compiled in trees) else None
+
+    num_labels = len(trees[0].label_values)
+    votes = np.zeros((len(examples), num_labels))
+    rows = np.arange(len(examples))
+    for i, compiled in enumerate(trees):
+        tree_rows = np.array([feature_index[name] for name in compiled.attribute_names] + [0], dtype=np.int32)
+        predictions = _route(compiled, X if compiled.threshold is None else X_numeric, len(examples), tree_rows[compiled.feature])
+        predicted = predictions != NONE
+        votes[rows[predicted], predictions[predicted]] += 1.0 if weights is None else weights[i]
+    return np.argmax(votes, axis=1)
+
+##################
+# Decompilation
+
+def decompile_tree(compiled: CompiledTree) -> Node:
+    # children are numbered after their parents, so build from the last id
+    nodes: List[Node] = [None] * len(compiled)
+    for node_id in reversed(range(len(compiled))):
+        f = compiled.feature[node_id]
+        code = compiled.label[node_id]
+        label = None if code == NONE else compiled.label_values[code]
+        if f == NONE:
+            nodes[node_id] = LeafNode(label)
+            continue
+        offset = compiled.child_offset[node_id] + 1
+        end = compiled.child_offset[node_id + 1] if node_id + 1 < len(compiled) else len(compiled.children)
+        fractions = None
+        if compiled.fraction is not None and not np.isnan(compiled.fraction[offset]):
+            fractions = compiled.fraction[offset:end]
+        if compiled.threshold is not None and not np.isnan(compiled.threshold[node_id]):
+            below, above = compiled.children[offset:offset + 2]
+            below_fraction = None if fractions is None else float(fractions[0])
+            nodes[node_id] = ThresholdNode(compiled.attribute_names[f], float(compiled.threshold[node_id]), nodes[below], nodes[above], label, below_fraction)
+            continue
+        root = TreeNode(compiled.attribute_names[f], label=label)
+        if fractions is not None:
+            root.fractions = dict(zip(compiled.attribute_values[f], fractions.tolist()))
+        for code, value in enumerate(compiled.attribute_values[f]):
+            child_id = int(compiled.children[offset + code])
+            if child_id != node_id:
+                root.add_child(value, nodes[child_id])
+        nodes[node_id] = root
+    return nodes[0]
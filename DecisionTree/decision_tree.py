@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from typing import Dict, Union
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, field
 
 from dataset.dataset import Example, Examples, Attribute, AttributeName, AttributeValue
@@ -9,25 +9,107 @@ from dataset.dataset import Example, Examples, Attribute, AttributeName, Attribu
 class TreeNode:
     attribute_name: AttributeName
     children: Dict[AttributeValue, 'Node'] = field(default_factory=dict)
+    # most common label among the training examples that reached this node
+    label: Optional[AttributeValue] = None
+    # share of the training weight with a known value that took each branch,
+    # kept when examples missing the value are sent down every branch
+    fractions: Optional[Dict[AttributeValue, float]] = None
 
     def add_child(self, attribute_value: AttributeValue, child: 'Node'):
         self.children[attribute_value] = child
 
+# split on a continuous attribute: values below the threshold go to below,
+# all others to above
+@dataclass
+class ThresholdNode:
+    attribute_name: AttributeName
+    threshold: float
+    below: 'Node'
+    above: 'Node'
+    label: Optional[AttributeValue] = None
+    below_fraction: Optional[float] = None
+
 @dataclass
 class LeafNode:
     label: AttributeValue
 
-Node = Union[TreeNode, LeafNode]
+Node = Union[TreeNode, ThresholdNode, LeafNode]
+
+def _number(value) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+def _branches(tree: Union[TreeNode, ThresholdNode], example: Example) -> List[Tuple['Node', float]]:
+    # the branches an example takes and its share in each. Examples missing
+    # the value follow every branch of nodes that kept fractions.
+    name = tree.attribute_name
+    if isinstance(tree, ThresholdNode):
+        if tree.below_fraction is not None and _number(example.get(name)) is None:
+            return [(tree.below, tree.below_fraction), (tree.above, 1.0 - tree.below_fraction)]
+        return [(tree.below if float(example[name]) < tree.threshold else tree.above, 1.0)]
+    if tree.fractions is not None and example.get(name) not in tree.children:
+        return [(child, tree.fractions[value]) for value, child in tree.children.items()]
+    return [(tree.children[example[name]], 1.0)]
+
+def predict(tree: Node, example: Example, max_depth: Optional[int] = None) -> AttributeValue:
+    # the labels reached vote by the example's share in each; ties go to
+    # the least label, as in compiled trees
+    votes: Dict[AttributeValue, float] = {}
+    stack = [(tree, 1.0, 0)]
+    while len(stack) > 0:
+        node, share, depth = stack.pop()
+        if isinstance(node, LeafNode):
+            votes[node.label] = votes.get(node.label, 0.0) + share
+        elif max_depth is not None and depth >= max_depth:
+            assert node.label is not None
+            votes[node.label] = votes.get(node.label, 0.0) + share
+        else:
+            stack.extend((child, share * fraction, depth + 1) for child, fraction in reversed(_branches(node, example)) if fraction > 0)
+    return max(sorted(votes), key=lambda label: votes[label])
+
+def _children(tree: Node) -> List['Node']:
+    if isinstance(tree, ThresholdNode):
+        return [tree.below, tree.above]
+    elif isinstance(tree, TreeNode):
+        return list(tree.children.values())
+    return []
+
+def truncate(tree: Node, max_depth: int) -> Node:
+    # the tree ID3 would have grown with this max_depth; leaves are shared.
+    # Nodes are copied parents first, then linked to their copied children.
+    copies: Dict[int, Node] = {}
+    order = []
+    stack = [(tree, max_depth)]
+    while len(stack) > 0:
+        node, depth = stack.pop()
+        if isinstance(node, LeafNode):
+            continue
+        order.append((node, depth))
+        if depth > 0:
+            stack.extend((child, depth - 1) for child in _children(node))
 
-def predict(tree: Node, example: Example) -> AttributeValue:
-    if isinstance(tree, LeafNode):
-        return tree.label
-    else:
-        attribute_value = example[tree.attribute_name]
-        return predict(tree.children[attribute_value], example)
+    copy = lambda child: copies.get(id(child), child)
+    for node, depth in reversed(order):
+        if depth <= 0:
+            assert node.label is not None
+            copies[id(node)] = LeafNode(node.label)
+        elif isinstance(node, ThresholdNode):
+            copies[id(node)] = ThresholdNode(node.attribute_name, node.threshold, copy(node.below), copy(node.above), node.label, node.below_fraction)
+        else:
+            root = TreeNode(node.attribute_name, label=node.label, fractions=node.fractions)
+            for value, child in node.children.items():
+                root.add_child(value, copy(child))
+            copies[id(node)] = root
+    return copies.get(id(tree), tree)
 
 def height(tree: Node) -> int:
-    if isinstance(tree, LeafNode):
-        return 1
-    else:
-        return max(map(height, tree.children.values())) + 1
+    result = 0
+    stack = [(tree, 1)]
+    while len(stack) > 0:
+        node, depth = stack.pop()
+        result = max(result, depth)
+        stack.extend((child, depth + 1) for child in _children(node))
+    return result
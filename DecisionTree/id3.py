@@ -1,86 +1,123 @@
 #!/usr/bin/env python3
 
-from typing import Callable, Dict, Optional, Set
-from math import log2
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from functools import wraps
 from itertools import islice
 from collections import defaultdict
 
-from dataset.dataset import Examples, Attribute, AttributeName, AttributeValue, Weights, partition, most_common_label_value
-from .decision_tree import Node, TreeNode, LeafNode
+from dataset.dataset import Examples, Attribute, AttributeName, AttributeValue, Weights, partition_indices, most_common_label_value
+from . import impurity
+from .decision_tree import Node, TreeNode, LeafNode, truncate
 
 ##################
 # ID3
 
 EntropyFunc = Callable[[Examples, Weights, AttributeName], float]
 
-def attribute_gains(entropy_func: EntropyFunc, S: Examples, weights: Weights, attributes: Set[Attribute], label: Attribute) -> Dict[Attribute, float]:
-    initial_entropy = entropy_func(S, weights, label.name)
+Partitions = Dict[Attribute, Dict[AttributeValue, List[int]]]
+
+def _attribute_gains(entropy_func: EntropyFunc, S: Examples, weights: List[float], rows: List[int], attributes: Set[Attribute], label: Attribute) -> Tuple[Dict[Attribute, float], Partitions]:
+    initial_entropy = entropy_func([S[i] for i in rows], [weights[i] for i in rows], label.name)
+    total_weight = sum(weights[i] for i in rows)
 
-    def attribute_gain(A: Attribute) -> float:
-        total_entropy = 0
+    gains: Dict[Attribute, float] = {}
+    partitions: Partitions = {}
+    for A in attributes:
+        # one pass over rows partitions them by every value of A
+        partitions[A] = partition_indices(S, rows, A.name)
+        total_entropy = 0.0
         for v in A.values:
-            Sv, Wv = partition(S, weights, A.name, v)
-            if len(Sv) > 0:
-                weight = sum(islice(Wv, len(Sv))) / sum(islice(weights, len(S)))
-                total_entropy += weight * entropy_func(Sv, Wv, label.name)
-        return initial_entropy - total_entropy
+            rows_v = partitions[A].get(v, [])
+            if len(rows_v) > 0:
+                Wv = [weights[i] for i in rows_v]
+                total_entropy += (sum(Wv) / total_weight) * entropy_func([S[i] for i in rows_v], Wv, label.name)
+        gains[A] = initial_entropy - total_entropy
 
-    return dict(map(lambda A: (A, attribute_gain(A)), attributes))
+    return gains, partitions
+
+def attribute_gains(entropy_func: EntropyFunc, S: Examples, weights: Weights, attributes: Set[Attribute], label: Attribute) -> Dict[Attribute, float]:
+    gains, _ = _attribute_gains(entropy_func, S, list(islice(weights, len(S))), list(range(len(S))), attributes, label)
+    return gains
 
 def ID3(entropy_func: EntropyFunc, max_depth: Optional[int], S: Examples, weights: Weights, attributes: Set[Attribute], label: Attribute) -> Node:
-    def _ID3(S: Examples, weights: Weights, attributes: Set[Attribute], depth: int = 0) -> Node:
-        assert len(S) > 0
-        assert len(S) == len(weights) if isinstance(weights, list) else True
+    assert len(S) == len(weights) if isinstance(weights, list) else True
+    W = list(islice(weights, len(S)))
+
+    # nodes pass down indices into S; the partition of the chosen attribute
+    # computed while finding gains is reused for the children
+    def _ID3(rows: List[int], attributes: Set[Attribute], depth: int) -> Tuple[Node, Optional[Attribute], Dict[AttributeValue, List[int]]]:
+        assert len(rows) > 0
 
-        label_values = set(map(lambda s: s[label.name], S))
+        label_values = set(S[i][label.name] for i in rows)
         if len(label_values) < 2:
-            return LeafNode(label_values.pop())
+            return LeafNode(label_values.pop()), None, {}
 
+        most_common_label = most_common_label_value([S[i] for i in rows], [W[i] for i in rows], label.name)
         if len(attributes) == 0 or (max_depth is not None and depth >= max_depth):
-            return LeafNode(most_common_label_value(S, weights, label.name))
+            return LeafNode(most_common_label), None, {}
 
-        gains = attribute_gains(entropy_func, S, weights, attributes, label)
+        gains, partitions = _attribute_gains(entropy_func, S, W, rows, attributes, label)
         A = max(gains.keys(), key=lambda name: gains[name])
-
-        root = TreeNode(A.name)
-
+        return TreeNode(A.name, label=most_common_label), A, partitions[A]
+
+    # nodes wait on a stack with the parent and value they go under instead
+    # of being grown by recursion
+    tree: Optional[Node] = None
+    stack: List[Tuple[List[int], Set[Attribute], int, Optional[TreeNode], AttributeValue]] = [(list(range(len(S))), attributes, 0, None, None)]
+    while len(stack) > 0:
+        rows, node_attributes, depth, parent, parent_value = stack.pop()
+        root, A, partition = _ID3(rows, node_attributes, depth)
+        if parent is None:
+            tree = root
+        else:
+            parent.add_child(parent_value, root)
+        if A is None:
+            continue
+
+        children = []
         for value in A.values:
-            S_v, W_v = partition(S, weights, A.name, value)
-            if len(S_v) == 0:
-                root.add_child(value, LeafNode(most_common_label_value(S, weights, label.name)))
-            else:
-                root.add_child(value, _ID3(S_v, W_v, attributes.difference(set([A])), depth + 1))
-
-        return root
-
-    return _ID3(S, weights, attributes)
+            rows_v = partition.get(value, [])
+            # every value is added in order now; values with rows are
+            # replaced by their subtree later
+            root.add_child(value, LeafNode(root.label))
+            if len(rows_v) > 0:
+                children.append((rows_v, node_attributes.difference(set([A])), depth + 1, root, value))
+        stack.extend(reversed(children))
+
+    assert tree is not None
+    return tree
+
+def ID3_sweep(entropy_func: EntropyFunc, max_depths: Iterable[int], S: Examples, weights: Weights, attributes: Set[Attribute], label: Attribute) -> Dict[int, Node]:
+    # grow once to the deepest depth; shallower trees are truncations of it
+    max_depths = list(max_depths)
+    tree = ID3(entropy_func, max(max_depths), S, weights, attributes, label)
+    return { max_depth: truncate(tree, max_depth) for max_depth in max_depths }
 
 #############################
 # Entropy/Purity Calculations
+#
+# The criteria are defined over weighted label counts in impurity.py. These
+# adapters keep the EntropyFunc signature: one pass over S builds the
+# counts, which any criterion can then score.
 
-def entropy(S: Examples, weights: Weights, label: AttributeName) -> float:
+def label_counts(S: Examples, weights: Weights, label: AttributeName) -> List[float]:
     counts: defaultdict[AttributeValue, float] = defaultdict(lambda: 0)
-    total = 0.0
     for s, weight in zip(S, weights):
         counts[s[label]] += weight
-        total += weight
-    return -sum(map(lambda v: (v/total) * log2(v/total), counts.values()))
+    return list(counts.values())
 
-def majority_error(S: Examples, weights: Weights, label: AttributeName) -> float:
-    counts: defaultdict[AttributeValue, float] = defaultdict(lambda: 0)
-    total = 0.0
-    most_common_count = None
-    for s, weight in zip(S, weights):
-        counts[s[label]] += weight
-        total += weight
-        if most_common_count is None or counts[s[label]] > most_common_count:
-            most_common_count = counts[s[label]]
-    return 1.0 - most_common_count / total
+_count_impurities: Dict[EntropyFunc, impurity.CountImpurity] = {}
 
-def gini_index(S: Examples, weights: Weights, label: AttributeName) -> float:
-    counts: defaultdict[AttributeValue, float] = defaultdict(lambda: 0)
-    total = 0.0
-    for s, weight in zip(S, weights):
-        counts[s[label]] += weight
-        total += weight
-    return 1.0 - sum(map(lambda v: (v/total) ** 2, counts.values()))
+def from_counts(count_impurity: impurity.CountImpurity) -> EntropyFunc:
+    @wraps(count_impurity)
+    def entropy_func(S: Examples, weights: Weights, label: AttributeName) -> float:
+        return float(count_impurity(label_counts(S, weights, label)))
+    _count_impurities[entropy_func] = count_impurity
+    return entropy_func
+
+def count_impurity(entropy_func: EntropyFunc) -> Optional[impurity.CountImpurity]:
+    return _count_impurities.get(entropy_func)
+
+entropy = from_counts(impurity.entropy)
+majority_error = from_counts(impurity.majority_error)
+gini_index = from_counts(impurity.gini_index)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+from typing import Callable
+
+import numpy as np
+
+##################
+# Impurity over weighted label counts
+#
+# Each function takes an array whose last axis holds the weighted count of
+# each label value and reduces over that axis, so a whole (attribute value x
+# label) contingency table can be scored in one call.
+
+CountImpurity = Callable[[np.ndarray], np.ndarray]
+
+def _proportions(counts: np.ndarray) -> np.ndarray:
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum(axis=-1, keepdims=True)
+    return counts / np.where(total > 0, total, 1.0)
+
+def entropy(counts: np.ndarray) -> np.ndarray:
+    p = _proportions(counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p > 0, p * np.log2(p), 0.0)
+    return -terms.sum(axis=-1)
+
+def majority_error(counts: np.ndarray) -> np.ndarray:
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum(axis=-1)
+    most_common = counts.max(axis=-1)
+    return np.where(total > 0, 1.0 - most_common / np.where(total > 0, total, 1.0), 0.0)
+
+def gini_index(counts: np.ndarray) -> np.ndarray:
+    counts = np.asarray(counts, dtype=np.float64)
+    p = _proportions(counts)
+    return np.where(counts.sum(axis=-1) > 0, 1.0 - (p ** 2).sum(axis=-1), 0.0)
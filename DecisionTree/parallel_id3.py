@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.columnar import ColumnarExamples, Encodings
+from . import impurity
+from .columnar_id3 import Histogram, ImpurityFunc, NodeStats, _Splitter, _grow, count_impurity
+from .decision_tree import Node, TreeNode, ThresholdNode
+
+##################
+# Shared Examples
+#
+# Worker processes read the encoded examples from one block of shared
+# memory instead of each receiving a pickled copy.
+
+# (group, attribute name, dtype, offset in bytes, length) of every array
+Layout = List[Tuple[str, str, str, int, int]]
+
+def share_examples(examples: ColumnarExamples) -> Tuple[SharedMemory, Layout]:
+    arrays = [("columns", name, column) for name, column in examples.columns.items()]
+    arrays += [("numeric", name, values) for name, values in examples.numeric.items()]
+    arrays.append(("weights", "", examples.weights))
+
+    layout: Layout = []
+    offset = 0
+    for group, name, a in arrays:
+        layout.append((group, name, a.dtype.str, offset, len(a)))
+        offset += (a.nbytes + 63) // 64 * 64
+    shared = SharedMemory(create=True, size=max(offset, 1))
+    for (group, name, dtype, offset, count), (_, _, a) in zip(layout, arrays):
+        np.frombuffer(shared.buf, dtype=dtype, count=count, offset=offset)[:] = a
+    return shared, layout
+
+def attach_examples(shared: SharedMemory, layout: Layout) -> ColumnarExamples:
+    groups = { "columns": {}, "numeric": {}, "weights": {} }
+    for group, name, dtype, offset, count in layout:
+        groups[group][name] = np.frombuffer(shared.buf, dtype=dtype, count=count, offset=offset)
+    return ColumnarExamples(groups["columns"], groups["weights"][""], groups["numeric"])
+
+##################
+# Workers
+
+# set in each worker process by _start_worker
+_worker: Optional[Tuple[SharedMemory, _Splitter, impurity.CountImpurity, Optional[int]]] = None
+
+def _start_worker(
+        name: str,
+        layout: Layout,
+        attributes: Set[Attribute],
+        label: Attribute,
+        encodings: Encodings,
+        max_bins: Optional[int],
+        fractional_missing: bool,
+        impurity_func: impurity.CountImpurity,
+        max_depth: Optional[int]
+):
+    global _worker
+    shared = SharedMemory(name)
+    splitter = _Splitter(attach_examples(shared, layout), attributes, label, encodings, max_bins, fractional_missing)
+    _worker = (shared, splitter, impurity_func, max_depth)
+
+def _grow_subtree(rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int], depth: int) -> Node:
+    assert _worker is not None
+    _, splitter, impurity_func, max_depth = _worker
+    return _grow(splitter, impurity_func, max_depth, rows, weights, histogram, candidates, depth)
+
+##################
+# Parallel ID3
+
+# nodes with fewer rows are grown in the calling process, as a worker's
+# subtree costs more to send than to grow
+MIN_SUBTREE_ROWS = 256
+
+class _ThreadedSplitter(_Splitter):
+    # counts blocks of the candidate categorical attributes on the threads
+    # while the continuous ones are counted on this one; bincount releases
+    # the GIL, so the blocks are counted at once. Each attribute's table is
+    # summed in row order whatever its block, so the tables are the same.
+    threads: ThreadPoolExecutor
+    num_threads: int
+
+    def stats(self, rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int]) -> NodeStats:
+        if histogram is not None or len(candidates) == 0:
+            return super().stats(rows, weights, histogram, candidates)
+        blocks = [block.tolist() for block in np.array_split(candidates, min(self.num_threads, len(candidates)))]
+        categorical = [self.threads.submit(self.categorical_stats, rows, weights, histogram, block) for block in blocks]
+        numeric = self.numeric_stats(rows, weights, histogram)
+        return (np.concatenate([tables.result() for tables in categorical]), *numeric)
+
+def _resolve(tree: Node) -> Node:
+    # replaces the subtrees grown by workers with their results, walking the
+    # tree from an explicit stack; a worker's subtree has no placeholders
+    if isinstance(tree, Future):
+        return tree.result()
+    stack = [tree]
+    def settle(child: Node) -> Node:
+        if isinstance(child, Future):
+            return child.result()
+        stack.append(child)
+        return child
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, ThresholdNode):
+            node.below, node.above = settle(node.below), settle(node.above)
+        elif isinstance(node, TreeNode):
+            for value, child in node.children.items():
+                node.children[value] = settle(child)
+    return tree
+
+def ID3_parallel(
+        entropy_func: ImpurityFunc,
+        max_depth: Optional[int],
+        examples: ColumnarExamples,
+        attributes: Set[Attribute],
+        label: Attribute,
+        encodings: Encodings,
+        indices: Optional[np.ndarray] = None,
+        max_bins: Optional[int] = None,
+        workers: Optional[int] = None,
+        subtree_rows: Optional[int] = None,
+        fractional_missing: bool = False,
+        min_subtree_rows: int = MIN_SUBTREE_ROWS
+) -> Node:
+    # grows the same tree as columnar_id3.ID3. Nodes with more than
+    # subtree_rows rows are split here, as are nodes with fewer than
+    # min_subtree_rows and their subtrees; the subtree of every other node
+    # that may still be split is grown whole by a worker process. Splits are
+    # chosen by attribute position in name order, so the tree is the same in
+    # every process.
+    workers = workers or os.cpu_count() or 1
+    impurity_func = count_impurity(entropy_func)
+    splitter = _ThreadedSplitter(examples, attributes, label, encodings, max_bins, fractional_missing)
+
+    if indices is None:
+        indices = np.arange(len(examples))
+    rows = np.asarray(indices, dtype=np.intp)
+    if subtree_rows is None:
+        subtree_rows = len(rows) // (4 * workers)
+
+    shared, layout = share_examples(examples)
+    try:
+        initargs = (shared.name, layout, attributes, label, encodings, max_bins, fractional_missing, impurity_func, max_depth)
+        with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=initargs) as processes, ThreadPoolExecutor(workers) as threads:
+            splitter.threads = threads
+            splitter.num_threads = workers
+
+            def delegate(rows: np.ndarray, weights: np.ndarray, histogram: Optional[Histogram], candidates: List[int], depth: int) -> Optional[Future]:
+                # a node with nothing left to split on stays here
+                if len(candidates) == 0 and len(splitter.numeric) == 0:
+                    return None
+                if min_subtree_rows <= len(rows) <= subtree_rows:
+                    return processes.submit(_grow_subtree, rows, weights, histogram, candidates, depth)
+                return None
+
+            return _resolve(_grow(splitter, impurity_func, max_depth, rows, *splitter.root(rows), delegate=delegate))
+    finally:
+        shared.close()
+        shared.unlink()
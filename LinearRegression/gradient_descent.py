@@ -1,18 +1,40 @@
 #!/usr/bin/env python3
 
-from math import inf, sqrt
+from collections.abc import Mapping
+from math import inf, isfinite
 import random
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from dataset.continuous import AttributeName, Attributes, Example, Examples
+import numpy as np
+from scipy import sparse
+
+from dataset.chunked import ArraySource, Source, minibatches, to_source
+from dataset.continuous import AttributeName, Attributes, Example
+from dataset.sparse import SparseExamples
+from Optimization.optimizers import Optimizer, plain
 
 Weights = Dict[AttributeName, float]
 WeightsAndBias = Tuple[Weights, float]
 
+# raised by the trainers when a run's cost blows up or it runs out of
+# iterations without converging; a smaller rate may converge
+class Diverged(Exception):
+    pass
+
+# sgd's costs are noisy, so a run diverges once a recorded cost is this many
+# times the cost at the zero weights it starts from
+DIVERGENCE = 100.0
+# bgd's cost falls on every iteration of a converging run, so a run diverges
+# once it has risen on this many iterations in a row
+RISING = 3
+
+##################
+# Loss and Gradient
+
 def compute_error(w: Weights, bias: float, example: Example, label: AttributeName) -> float:
     return example[label] - (bias + sum(map(lambda k: w[k] * example[k], w.keys())))
 
-def compute_loss_gradient(w: Weights, bias: float, examples: Examples, label: AttributeName) -> Tuple[float, Weights, float]:
+def compute_loss_gradient(w: Weights, bias: float, examples: Iterable[Example], label: AttributeName) -> Tuple[float, Weights, float]:
     cost = 0.0
     gradient_w = { k: 0.0 for k in w.keys() }
     gradient_bias = 0.0
@@ -24,66 +46,267 @@ def compute_loss_gradient(w: Weights, bias: float, examples: Examples, label: At
         gradient_bias -= error
     return cost, gradient_w, gradient_bias
 
-def bgd(examples: Examples, attributes: Attributes, label: AttributeName, r: float, max_iterations: int) -> Tuple[List[float], Weights, float]:
-    w = { a: 0.0 for a in attributes }
+##################
+# Arrays
+
+Chunks = Iterable[Tuple[np.ndarray, np.ndarray]]
+
+def example_chunks(examples: Source, names: Sequence[AttributeName], label: AttributeName) -> Callable[[], Chunks]:
+    # reads the examples as (example x attribute) chunks with columns in the
+    # order of names: a list is converted once and kept as one chunk, a
+    # source is read a chunk at a time on every pass, and sparse examples
+    # are one CSR chunk
+    if isinstance(examples, SparseExamples):
+        X_sparse = examples.X[:, examples.columns(names)].tocsr()
+        return lambda: [(X_sparse, examples.y)]
+    if isinstance(examples, ArraySource):
+        columns = examples.columns(names)
+        return lambda: ((X[:, columns], y) for X, y in examples.chunks())
+    X = np.array([[example[name] for name in names] for example in examples], dtype=np.float64).reshape(len(examples), len(names))
+    y = np.array([example[label] for example in examples], dtype=np.float64)
+    return lambda: [(X, y)]
+
+def zero_cost(examples: Source, label: AttributeName) -> float:
+    # the cost at zero weights and bias, half the sum of the squared labels
+    if isinstance(examples, (ArraySource, SparseExamples)):
+        y = np.asarray(examples.y, dtype=np.float64)
+    else:
+        y = np.array([example[label] for example in examples], dtype=np.float64)
+    return 0.5 * float(y @ y)
+
+def loss_gradient_arrays(w: np.ndarray, bias: float, chunks: Chunks) -> Tuple[float, np.ndarray, float]:
+    # compute_loss_gradient over arrays
+    cost = 0.0
+    gradient_w = np.zeros(len(w))
+    gradient_bias = 0.0
+    for X, y in chunks:
+        error = y - (bias + X @ w)
+        cost += 0.5 * float(error @ error)
+        gradient_w -= X.T @ error
+        gradient_bias -= float(np.sum(error))
+    return cost, gradient_w, gradient_bias
+
+##################
+# Gradient Descent
+
+def bgd(examples: Source, attributes: Attributes, label: AttributeName, r: float, max_iterations: int) -> Tuple[List[float], Weights, float]:
+    # the examples are kept as an (example x attribute) matrix, so the cost
+    # and gradient are a few matrix-vector products per iteration
+    names = list(attributes)
+    chunks = example_chunks(examples, names, label)
+    w = np.zeros(len(names))
     bias = 0.0
 
     change = inf
     i = 0
+    rising = 0
 
     costs = []
 
-    while i < 2 or change > (1 / (10 ** 6)):
-        if i > max_iterations:
-            raise Exception("diverges")
-        i += 1
+    with np.errstate(over="ignore", invalid="ignore"):
+        while i < 2 or change > (1 / (10 ** 6)):
+            if i > max_iterations:
+                raise Diverged("diverges")
+            i += 1
 
-        cost, gradient_w, gradient_bias = compute_loss_gradient(w, bias, examples, label)
-        costs.append(cost)
+            # below 2 / (largest eigenvalue of Xᵀ X), r lowers the cost on
+            # every iteration; above it the cost soon grows geometrically, so
+            # a cost rising RISING times in a row means the run diverges
+            cost, gradient_w, gradient_bias = loss_gradient_arrays(w, bias, chunks())
+            rising = rising + 1 if len(costs) > 0 and cost > costs[-1] else 0
+            if not isfinite(cost) or rising >= RISING:
+                raise Diverged("diverges")
+            costs.append(cost)
 
-        sum_sqs = 0
-        for k in w.keys():
-            adjust = r * gradient_w[k]
-            w[k] -= adjust
-            sum_sqs += adjust ** 2
-        change = sqrt(sum_sqs)
+            adjust = r * gradient_w
+            w -= adjust
+            change = float(np.sqrt(adjust @ adjust))
+
+            bias -= r * gradient_bias
+
+    return costs, dict(zip(names, w.tolist())), bias
+
+##################
+# Cost Tracking
+#
+# sgd records costs through a policy, called after every step with the step
+# number, the loss of the step's example before the update and the updated
+# weights. It returns the cost to record, or None to record nothing.
+
+CostPolicy = Callable[[int, float, Weights, float], Optional[float]]
+
+def every_cost(examples: Iterable[Example], label: AttributeName, k: int = 1) -> CostPolicy:
+    # the cost over the examples, such as the training set or a held-out
+    # sample, every k steps
+    if isinstance(examples, SparseExamples):
+        return _sparse_cost(examples, k)
+    def policy(i: int, loss: float, w: Weights, bias: float) -> Optional[float]:
+        if i % k != 0:
+            return None
+        cost, _, _ = compute_loss_gradient(w, bias, examples, label)
+        return cost
+    return policy
+
+def _sparse_cost(examples: SparseExamples, k: int) -> CostPolicy:
+    # X is sliced to the weights' attributes once, and again only if a run
+    # has them in another order
+    sliced: Optional[Tuple[Tuple[AttributeName, ...], sparse.csr_matrix]] = None
+    def policy(i: int, loss: float, w: Weights, bias: float) -> Optional[float]:
+        nonlocal sliced
+        if i % k != 0:
+            return None
+        names = tuple(w.keys())
+        if sliced is None or sliced[0] != names:
+            sliced = (names, examples.X[:, examples.columns(names)].tocsr())
+        error = examples.y - (bias + sliced[1] @ np.array(list(w.values())))
+        return 0.5 * float(error @ error)
+    return policy
 
+def sample_cost(examples: Source, label: AttributeName, size: int, k: int = 1, rng=random) -> CostPolicy:
+    # the cost over a fixed random sample of the examples every k steps,
+    # scaled up to all of them
+    sample = [examples[j] for j in sorted(rng.sample(range(len(examples)), min(size, len(examples))))]
+    scale = len(examples) / len(sample)
+    sample_policy = every_cost(sample, label, k)
+    def policy(i: int, loss: float, w: Weights, bias: float) -> Optional[float]:
+        cost = sample_policy(i, loss, w, bias)
+        return None if cost is None else scale * cost
+    return policy
+
+def smoothed_cost(count: int, alpha: float = 0.01) -> CostPolicy:
+    # an exponentially smoothed mean of the losses of the sampled examples,
+    # times the number of examples, every step; it costs nothing to track.
+    # The mean starts over with each run.
+    running = 0.0
+    def policy(i: int, loss: float, w: Weights, bias: float) -> Optional[float]:
+        nonlocal running
+        running = loss if i == 1 else (1 - alpha) * running + alpha * loss
+        return count * running
+    return policy
+
+def _example_steps(examples: Source, attributes: Attributes, label: AttributeName, r: float) -> Callable[[], Tuple[float, Weights, float]]:
+    # steps on one example chosen at random, on dict weights
+    w = { a: 0.0 for a in attributes }
+    bias = 0.0
+    def step() -> Tuple[float, Weights, float]:
+        nonlocal bias
+        example = random.choice(examples)
+        loss, gradient_w, gradient_bias = compute_loss_gradient(w, bias, [example], label)
+
+        for k in w.keys():
+            w[k] -= r * gradient_w[k]
         bias -= r * gradient_bias
+        return loss, w, bias
+    return step
+
+class ArrayWeights(Mapping):
+    # array weights read as Weights without copying them, for the steps that
+    # touch only some of the weights
+    def __init__(self, names: Sequence[AttributeName], w: np.ndarray):
+        self.index = { name: i for i, name in enumerate(names) }
+        self.w = w
+
+    def __getitem__(self, name: AttributeName) -> float:
+        return float(self.w[self.index[name]])
 
-    return costs, w, bias
+    def __iter__(self) -> Iterator[AttributeName]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+def _sparse_steps(examples: SparseExamples, attributes: Attributes, label: AttributeName, r: float) -> Callable[[], Tuple[float, Weights, float]]:
+    # steps on one example chosen at random, as _example_steps does, taking
+    # the dot product with and updating only its nonzero attributes
+    names = list(attributes)
+    X = examples.X[:, examples.columns(names)].tocsr()
+    w = np.zeros(len(names))
+    weights = ArrayWeights(names, w)
+    bias = 0.0
+    def step() -> Tuple[float, Weights, float]:
+        nonlocal bias
+        i = random.randrange(len(examples))
+        span = slice(X.indptr[i], X.indptr[i + 1])
+        columns, values = X.indices[span], X.data[span]
+        error = examples.y[i] - (bias + float(w[columns] @ values))
+
+        w[columns] += r * error * values
+        bias += r * error
+        return 0.5 * (error ** 2), weights, bias
+    return step
+
+def _batch_steps(
+        examples: Source, attributes: Attributes, label: AttributeName, r: float,
+        optimizer: Optimizer, batch_size: int
+) -> Callable[[], Tuple[float, Weights, float]]:
+    # steps by the optimizer on the mean gradient of each minibatch of a
+    # shuffled epoch, as the other batch trainers take them, starting a new
+    # epoch when one runs out; the last batch of an epoch may be smaller
+    names = list(attributes)
+    source = to_source(examples, names, label)
+    batches: Iterator[Tuple[np.ndarray, np.ndarray]] = iter(())
+    params = [np.zeros(len(names)), np.zeros(1)]
+    w, bias = params
+    def step() -> Tuple[float, Weights, float]:
+        nonlocal batches
+        batch = next(batches, None)
+        if batch is None:
+            batches = minibatches(source, names, batch_size)
+            batch = next(batches)
+        X, y = batch
+        error = y - (bias[0] + X @ w)
+        loss = 0.5 * float(error @ error) / len(y)
+        optimizer(params, [-(X.T @ error) / len(y), -np.sum(error, keepdims=True) / len(y)], r)
+        return loss, dict(zip(names, w.tolist())), float(bias[0])
+    return step
+
+def sgd(
+        examples: Source, attributes: Attributes, label: AttributeName, r: float, max_iterations: int,
+        cost_policy: Optional[CostPolicy] = None, tolerance: Optional[float] = None,
+        optimizer: Optional[Optimizer] = None, batch_size: int = 1
+) -> Tuple[List[float], Weights, float]:
+    # the costs are those recorded by cost_policy, by default the cost over
+    # all examples after every step. With a tolerance, stops once a recorded
+    # cost is within tolerance, relative, of the one before it. With an
+    # optimizer or a batch_size, every step is made by the optimizer on the
+    # mean gradient of a batch of examples.
+    policy = cost_policy or every_cost(examples, label)
+    if optimizer is None and batch_size == 1 and isinstance(examples, SparseExamples):
+        step = _sparse_steps(examples, attributes, label, r)
+    elif optimizer is None and batch_size == 1:
+        step = _example_steps(examples, attributes, label, r)
+    else:
+        step = _batch_steps(examples, attributes, label, r, optimizer or plain(), batch_size)
 
-def sgd(examples: Examples, attributes: Attributes, label: AttributeName, r: float, max_iterations: int) -> Tuple[List[float], Weights, float]:
     w = { a: 0.0 for a in attributes }
     bias = 0.0
 
     i = 0
-    costs = []
-    change = inf
+    costs: List[float] = []
+    # the first recorded cost may be far below the run's typical one, such
+    # as a smoothed loss of one well-fit example, so divergence is judged
+    # against where every run starts
+    limit = DIVERGENCE * zero_cost(examples, label)
 
-    while i < 2 or change > (1 / (10 ** 6)):
+    while True:
         if i > max_iterations:
-#            raise Exception("diverges")
             break
         i += 1
 
-        example = random.choice(examples)
-        _, gradient_w, gradient_bias = compute_loss_gradient(w, bias, [example], label)
-
-        sum_sqs = 0
-        for k in w.keys():
-            adjust = -r * gradient_w[k]
-            w[k] += adjust
-            sum_sqs += adjust ** 2
-        bias -= r * gradient_bias
-
-        cost, _, _ = compute_loss_gradient(w, bias, examples, label)
-        costs.append(cost)
-#        change = sqrt(sum_sqs)
+        loss, w, bias = step()
 
-        if cost == inf:
-            raise Exception("diverges")
+        recorded = policy(i, loss, w, bias)
+        if recorded is not None:
+            if not isfinite(recorded) or recorded > limit:
+                raise Diverged("diverges")
+            converged = tolerance is not None and len(costs) > 0 and abs(costs[-1] - recorded) <= tolerance * costs[-1]
+            costs.append(recorded)
+            if converged:
+                break
 
-        if i % 10000 == 0:
-            print(r, "iter", i, "cost", cost, change)
+    return costs, dict(w), bias
 
-    return costs, w, bias
+def predict_batch(w: Weights, bias: float, X: np.ndarray, attributes: Sequence[AttributeName]) -> np.ndarray:
+    # predictions for the rows of X, dense or sparse, whose columns hold the
+    # attributes in order
+    return X @ np.array([w[a] for a in attributes]) + bias
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+from typing import Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+
+from dataset.chunked import Source
+from dataset.continuous import AttributeName, Attributes
+from .gradient_descent import Chunks, Weights, example_chunks
+
+##################
+# Normal Equations
+#
+# The least squares fit solves (Xᵀ X) w = Xᵀ y, where X has a leading
+# column of ones for the bias. Both sides are sums over examples, so they
+# are accumulated a chunk at a time and the examples are read once.
+
+def accumulate(chunks: Chunks, num_attributes: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Xᵀ X and Xᵀ y, with the bias first
+    XtX = np.zeros((num_attributes + 1, num_attributes + 1))
+    Xty = np.zeros(num_attributes + 1)
+    for X, y in chunks:
+        if sparse.issparse(X):
+            # Xᵀ X of sparse examples is sparse until it is added in
+            X = sparse.hstack((np.ones((len(y), 1)), X), format="csr")
+            XtX += (X.T @ X).toarray()
+        else:
+            X = np.hstack((np.ones((len(y), 1)), X))
+            XtX += X.T @ X
+        Xty += X.T @ y
+    return XtX, Xty
+
+def solve(XtX: np.ndarray, Xty: np.ndarray, ridge: float = 0.0) -> np.ndarray:
+    # by Cholesky when Xᵀ X + ridge I is positive definite, otherwise the
+    # least squares solution; the bias is not regularized
+    A = XtX + ridge * np.diag(np.r_[0.0, np.ones(len(Xty) - 1)])
+    try:
+        return cho_solve(cho_factor(A), Xty)
+    except LinAlgError:
+        return np.linalg.lstsq(A, Xty, rcond=None)[0]
+
+def least_squares(examples: Source, attributes: Attributes, label: AttributeName, ridge: float = 0.0) -> Tuple[Weights, float]:
+    # the weights and bias bgd converges to, in one pass over the examples
+    names = list(attributes)
+    wstar = solve(*accumulate(example_chunks(examples, names, label)(), len(names)), ridge)
+    return dict(zip(names, wstar[1:].tolist())), float(wstar[0])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass
+import multiprocessing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .gradient_descent import Diverged, Weights
+
+##################
+# Learning Rate Search
+#
+# Candidate rates are trained at once in a pool of worker processes and the
+# fit of the largest rate that converges is kept, as halving the rate until
+# a run converges would find. Runs stop on their own once their cost shows
+# they diverge. Once a rate converges, smaller ones have lost: those not yet
+# started are skipped, and those running are terminated along with the pool
+# as soon as every larger rate is known to diverge.
+#
+# Workers are forked, so the trainer may be any callable, such as a lambda
+# over the training set and cost policy, without being pickled.
+
+Trainer = Callable[[float], Tuple[List[float], Weights, float]]
+
+@dataclass(frozen = True)
+class Fit:
+    r: float
+    costs: List[float]
+    w: Weights
+    bias: float
+
+# the trainer and the largest rate known to converge, a shared double; set
+# in each worker process by _start_worker
+_worker: Optional[Tuple[Trainer, Any]] = None
+
+def _start_worker(train: Trainer, converged: Any):
+    global _worker
+    _worker = (train, converged)
+
+def _train_rate(r: float) -> Tuple[float, Optional[Fit]]:
+    # None when the rate diverges or a larger one has converged
+    train, converged = _worker
+    if r < converged.value:
+        return r, None
+    try:
+        costs, w, bias = train(r)
+    except Diverged:
+        return r, None
+    with converged.get_lock():
+        converged.value = max(converged.value, r)
+    return r, Fit(r, costs, w, bias)
+
+def search_rates(train: Trainer, rates: Iterable[float], processes: Optional[int] = None) -> Tuple[Fit, List[float]]:
+    # the fit of the largest converging rate and the larger rates that
+    # diverge, largest first; raises Diverged if every rate diverges
+    rates = sorted(set(rates), reverse=True)
+    context = multiprocessing.get_context("fork")
+    converged = context.Value("d", 0.0)
+    results: Dict[float, Optional[Fit]] = {}
+
+    with context.Pool(processes, initializer=_start_worker, initargs=(train, converged)) as pool:
+        for r, fit in pool.imap_unordered(_train_rate, rates):
+            results[r] = fit
+            # rates are settled from the largest down until one is unknown
+            for candidate in rates:
+                if candidate not in results:
+                    break
+                best = results[candidate]
+                if best is not None:
+                    return best, [d for d in rates if d > candidate]
+
+    raise Diverged("every rate diverges")
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 
 from math import e
-from random import shuffle
-from typing import Callable, List
+from typing import Callable, List, Optional, Sequence
 
+import numpy as np
+
+from dataset.chunked import Source, minibatches, shuffled, to_source
 from dataset.continuous import AttributeName, Example, Examples
+from Optimization.optimizers import Optimizer, plain
 
 sigmoid = lambda x: 1.0 / (1.0 + e ** (-x))
 dot = lambda a, b: sum(map(lambda ab: ab[0] * ab[1], zip(a, b)))
@@ -46,23 +49,89 @@ def cost(examples: Examples, attributes: List[AttributeName], label: AttributeNa
         avg_cost += L / len(examples)
     return avg_cost
 
+##################
+# Batches
+#
+# The network as arrays: the weights into the first and second hidden
+# layers as matrices with a row per unit, and the output weights as a
+# vector.
+
+def layer_arrays(w: List[List[List[float]]]) -> List[np.ndarray]:
+    return [np.array(w[1][1:], dtype=np.float64), np.array(w[2][1:], dtype=np.float64), np.array(w[3][1], dtype=np.float64)]
+
+def layer_lists(params: Sequence[np.ndarray]) -> List[List[List[float]]]:
+    return [[], [[]] + params[0].tolist(), [[]] + params[1].tolist(), [[]] + [params[2].tolist()]]
+
+def backpropagation_batch(params: Sequence[np.ndarray], X: np.ndarray, ystar: np.ndarray) -> List[np.ndarray]:
+    # the gradients of backpropagation averaged over the rows of X, each a
+    # 1 followed by an example's attributes
+    W1, W2, w3 = params
+    n = len(ystar)
+    ones = np.ones((n, 1))
+
+    # forward pass; like dot, a unit only meets as many inputs as it has weights
+    x = X[:, :W1.shape[1]]
+    s1 = 1.0 / (1.0 + np.exp(-(x @ W1.T)))
+    z1 = np.hstack((ones, s1))
+    s2 = 1.0 / (1.0 + np.exp(-(z1[:, :W2.shape[1]] @ W2.T)))
+    z2 = np.hstack((ones, s2))
+    y = z2 @ w3
+
+    # back propagation
+    dL = y - ystar
+    dw3 = dL @ z2 / n
+
+    delta2 = dL[:, None] * w3[None, 1:] * s2 * (1 - s2)
+    dW2 = delta2.T @ z1[:, :W2.shape[1]] / n
+
+    delta1 = (delta2 @ W2)[:, 1:] * s1 * (1 - s1)
+    dW1 = delta1.T @ x / n
+
+    return [dW1, dW2, dw3]
+
+def _train_batches(
+        w: List[List[List[float]]], examples: Source, attributes: List[AttributeName], label: AttributeName,
+        T: int, r0: float, d: float, optimizer: Optimizer, batch_size: int
+) -> List[List[List[float]]]:
+    source = to_source(examples, attributes, label)
+    params = layer_arrays(w)
+
+    for t in range(T):
+        r = r0 / (1 + (r0/d) * t)
+
+        for X, y in minibatches(source, attributes, batch_size):
+            X = np.hstack((np.ones((len(y), 1)), X))
+            ystar = np.where(y == 0, -1.0, 1.0)
+            optimizer(params, backpropagation_batch(params, X, ystar), r)
+
+        if t % (T / 10) == 0:
+            print("epoch", t, "cost", cost(source, attributes, label, layer_lists(params)))
+
+    return layer_lists(params)
+
+##################
+# Training
+
 def train_sgd(
-        examples: Examples, attributes: List[AttributeName], label: AttributeName,
-        width: int, T: int, r0: float, d: float, initial_weight: Callable[[], float]
+        examples: Source, attributes: List[AttributeName], label: AttributeName,
+        width: int, T: int, r0: float, d: float, initial_weight: Callable[[], float],
+        optimizer: Optional[Optimizer] = None, batch_size: int = 1
 ) -> List[List[List[float]]]:
+    # with an optimizer or a batch_size, every step is made by the optimizer
+    # on the mean gradient of a batch of examples
     w = [
         [],
         [[]] + [[initial_weight() for _ in attributes] for _ in range(width - 1)],
         [[]] + [[initial_weight() for _ in range(width)] for _ in range(width - 1)],
         [[]] + [[initial_weight() for _ in range(width)]]
     ]
+    if optimizer is not None or batch_size != 1:
+        return _train_batches(w, examples, attributes, label, T, r0, d, optimizer or plain(), batch_size)
 
     for t in range(T):
-        shuffle(examples)
-
         r = r0 / (1 + (r0/d) * t)
 
-        for example in examples:
+        for example in shuffled(examples):
             x = [1.0] + list(map(lambda a: example[a], attributes))
             y = -1 if example[label] == 0 else 1
 
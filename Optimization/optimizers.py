@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+##################
+# Optimizers
+#
+# An optimizer updates a list of NumPy parameter arrays in place from their
+# gradients and a learning rate. The trainers keep their learning rate
+# schedules and pass the rate of the current step; an optimizer keeps any
+# state it needs, such as moments, from one step to the next, so a new one
+# is made for every run.
+
+Optimizer = Callable[[Sequence[np.ndarray], Sequence[np.ndarray], float], None]
+
+def plain() -> Optimizer:
+    # p -= rate * g, the update the trainers make without an optimizer
+    def step(params: Sequence[np.ndarray], grads: Sequence[np.ndarray], rate: float):
+        for p, g in zip(params, grads):
+            p -= rate * g
+    return step
+
+def momentum(beta: float = 0.9) -> Optimizer:
+    # steps along a velocity that accumulates the gradients, decayed by beta
+    velocities: List[np.ndarray] = []
+    def step(params: Sequence[np.ndarray], grads: Sequence[np.ndarray], rate: float):
+        if len(velocities) == 0:
+            velocities.extend(np.zeros_like(p) for p in params)
+        for p, g, v in zip(params, grads, velocities):
+            v *= beta
+            v += g
+            p -= rate * v
+    return step
+
+def adagrad(epsilon: float = 1e-8) -> Optimizer:
+    # scales each parameter's rate by the root of its summed squared gradients
+    sums: List[np.ndarray] = []
+    def step(params: Sequence[np.ndarray], grads: Sequence[np.ndarray], rate: float):
+        if len(sums) == 0:
+            sums.extend(np.zeros_like(p) for p in params)
+        for p, g, s in zip(params, grads, sums):
+            s += g * g
+            p -= rate * g / (np.sqrt(s) + epsilon)
+    return step
+
+def adam(beta1: float = 0.9, beta2: float = 0.999, epsilon: float = 1e-8) -> Optimizer:
+    # steps along the bias-corrected mean gradient, scaled by the root of the
+    # bias-corrected mean squared gradient
+    moments: List[np.ndarray] = []
+    squares: List[np.ndarray] = []
+    t = 0
+    def step(params: Sequence[np.ndarray], grads: Sequence[np.ndarray], rate: float):
+        nonlocal t
+        if len(moments) == 0:
+            moments.extend(np.zeros_like(p) for p in params)
+            squares.extend(np.zeros_like(p) for p in params)
+        t += 1
+        for p, g, m, v in zip(params, grads, moments, squares):
+            m *= beta1
+            m += (1 - beta1) * g
+            v *= beta2
+            v += (1 - beta2) * g * g
+            p -= rate * (m / (1 - beta1 ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + epsilon)
+    return step
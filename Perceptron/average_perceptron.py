@@ -1,68 +1,41 @@
 #!/usr/bin/env python3
 
-from random import shuffle
-from typing import Iterable, List, Tuple
+from typing import Tuple, Union
 
-from dataset.continuous import AttributeName, Attributes, Example
-from .perceptron import Weights, predict as predict_perceptron
+import numpy as np
 
-def perceptron_step(
-        r: float,
-        label: AttributeName,
-        weights: Weights,
-        bias: float,
-        a_weights: Weights,
-        a_bias: float,
-        example: Example
-) -> Tuple[bool, Weights, float, Weights, float]:
-    correct = predict_perceptron(weights, bias, example) == example[label]
-    if not correct:
-        change = 1.0 if example[label] == 1 else -1.0
-
-        for attribute in weights:
-            weights[attribute] += r * change * example[attribute]
-        bias += r * change * 1.0
-
-    for a in a_weights.keys():
-        a_weights[a] += weights[a]
-    a_bias += bias
-
-    return correct, weights, bias, a_weights, a_bias
-
-def perceptron_epoch(
-        r: float,
-        label: AttributeName,
-        examples: Iterable[Example],
-        weights: Weights,
-        bias: float,
-        a_weights: Weights,
-        a_bias: float
-) -> Tuple[int, Weights, float, Weights, float]:
-    count_correct = 0
-    for example in examples:
-        correct, weights, bias, a_weights, a_bias = perceptron_step(r, label, weights, bias, a_weights, a_bias, example)
-        count_correct += 1 if correct else 0
-    return count_correct, weights, bias, a_weights, a_bias
+from dataset.chunked import Source
+from dataset.continuous import AttributeName, Attributes
+from .engine import Params, train
+from .perceptron import Weights, predict as predict_perceptron, predict_batch as predict_batch_perceptron
 
 def perceptron(
         epochs: int,
         r: float,
         label: AttributeName,
         attributes: Attributes,
-        examples: List[Example]
+        examples: Source
 ) -> Tuple[Weights, float]:
-    weights = { k: 0.0 for k in attributes }
-    bias = 0.0
-
-    a_weights = weights.copy()
-    a_bias = bias
-
-    for _ in range(epochs):
-        shuffle(examples)
-        count_correct, weights, bias, a_weights, a_bias = perceptron_epoch(r, label, examples, weights, bias, a_weights, a_bias)
-        if count_correct == len(examples):
-            break
-
-    return a_weights, a_bias
+    # the sum of the weights after every one of the T examples seen. A
+    # mistake at example s moving the weights by u adds u to the weights
+    # after examples s to T, so the sum is (T + 1) w - Σ s u, and only the
+    # second term is kept up, on mistakes.
+    count = 0
+    weighted = np.zeros(len(attributes) + 1)
+
+    def correct(run: int, params: Params):
+        nonlocal count
+        count += run
+
+    def mistake(params: Params, columns: Union[slice, np.ndarray], values: np.ndarray, step: float):
+        nonlocal count
+        count += 1
+        weighted[:-1][columns] += count * step * values
+        weighted[-1] += count * step
+
+    names, params = train(epochs, r, label, attributes, examples, correct, mistake)
+    total = (count + 1) * params - weighted
+    return dict(zip(names, total[:-1].tolist())), float(total[-1])
 
 predict = predict_perceptron
+predict_batch = predict_batch_perceptron
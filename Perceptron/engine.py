@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import random
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from dataset.chunked import ArraySource, Source
+from dataset.continuous import AttributeName, Attributes, Examples
+from dataset.sparse import SparseExamples
+
+##################
+# Perceptron Engine
+#
+# The perceptrons keep their weights and bias as one float array, weights
+# in attribute order and the bias last, and the examples as an (example x
+# attribute) array. An epoch scans a block of rows at a time with the
+# current weights and only steps row by row from the first mistake, so a
+# clean stretch of rows costs a few array operations.
+#
+# Scores are matrix products, and updates are made in the same order as the
+# example-wise perceptrons', so the weights are theirs unless a score within
+# rounding of 0 lands on the other side. X may also be a CSR matrix of
+# sparse examples, whose scores are sparse products and whose updates touch
+# only a row's nonzero attributes.
+
+Params = np.ndarray
+Chunks = Iterable[Tuple[np.ndarray, np.ndarray]]
+# called after a mistake with the updated params, the columns and values of
+# the row and the step along it: the weights at the columns moved by
+# step * values and the bias by step
+Mistake = Callable[[Params, Union[slice, np.ndarray], np.ndarray, float], None]
+
+# rows scored at once after a mistake; the block doubles after every clean
+# block
+SCAN_SIZE = 16
+
+def scores(w: np.ndarray, bias: Union[float, np.ndarray], X: np.ndarray) -> np.ndarray:
+    # w · x + bias for every row of X, or for a (perceptron x attribute) w
+    # and a vector of biases, a (row x perceptron) matrix of them
+    return X @ w.T + bias
+
+def predict_batch(w: np.ndarray, bias: float, X: np.ndarray) -> np.ndarray:
+    return (scores(w, bias, X) >= 0).astype(np.int64)
+
+def row(X: np.ndarray, j: int) -> Tuple[Union[slice, np.ndarray], np.ndarray]:
+    # the columns and values of row j: all of a dense row, the nonzeros of
+    # a sparse one
+    if sparse.issparse(X):
+        span = slice(X.indptr[j], X.indptr[j + 1])
+        return X.indices[span], X.data[span]
+    return slice(None), X[j]
+
+def row_scores(X: np.ndarray) -> Callable[[np.ndarray, float, int, int], np.ndarray]:
+    # scores(w, bias, X[start:end]) as a function of (w, bias, start, end).
+    # A sparse block is scored from X's arrays directly, summing each row's
+    # products in column order, as slicing a CSR matrix costs more than
+    # scoring a few rows.
+    if not sparse.issparse(X):
+        return lambda w, bias, start, end: scores(w, bias, X[start:end])
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    def block(w: np.ndarray, bias: float, start: int, end: int) -> np.ndarray:
+        lo, hi = X.indptr[start], X.indptr[end]
+        return np.bincount(rows[lo:hi] - start, weights=X.data[lo:hi] * w[X.indices[lo:hi]], minlength=end - start) + bias
+    return block
+
+def scan(
+        r: float,
+        params: Params,
+        X: np.ndarray,
+        y: np.ndarray,
+        correct: Optional[Callable[[int, Params], None]] = None,
+        mistake: Optional[Mistake] = None
+) -> int:
+    # one pass over the rows in order, updating params in place on every
+    # mistake. correct is told of every run of rows classified correctly,
+    # before the mistake ending it, and mistake is called after the update.
+    # Returns the number of rows classified correctly.
+    count_correct = 0
+    size = SCAN_SIZE
+    score = row_scores(X)
+    i = 0
+    while i < len(y):
+        end = min(i + size, len(y))
+        wrong = np.flatnonzero((score(params[:-1], params[-1], i, end) >= 0).astype(np.int64) != y[i:end])
+        run = (end if len(wrong) == 0 else i + int(wrong[0])) - i
+        count_correct += run
+        if correct is not None and run > 0:
+            correct(run, params)
+        if len(wrong) == 0:
+            size *= 2
+            i = end
+            continue
+
+        j = i + run
+        change = 1.0 if y[j] == 1 else -1.0
+        columns, values = row(X, j)
+        params[:-1][columns] += r * change * values
+        params[-1] += r * change * 1.0
+        if mistake is not None:
+            mistake(params, columns, values, r * change)
+        size = SCAN_SIZE
+        i = j + 1
+    return count_correct
+
+##################
+# Epochs
+
+def example_arrays(examples: Examples, names: Sequence[AttributeName], label: AttributeName) -> Tuple[np.ndarray, np.ndarray]:
+    X = np.array([[example[name] for name in names] for example in examples], dtype=np.float64).reshape(len(examples), len(names))
+    y = np.array([example[label] for example in examples], dtype=np.float64)
+    return X, y
+
+def epoch_chunks(examples: Source, names: Sequence[AttributeName], label: AttributeName, rng=random) -> Callable[[], Chunks]:
+    # the shuffled chunks of one epoch, in the order shuffled() in
+    # dataset.chunked gives: a list is converted once, and its order is
+    # shuffled in place and applied to the list as before, and a source is
+    # read through its shuffle buffer
+    if isinstance(examples, SparseExamples):
+        columns = examples.columns(names)
+        reordered = SparseExamples(examples.X[:, columns], examples.y, tuple(names), label)
+        return lambda: reordered.shuffled_chunks(rng)
+    if isinstance(examples, ArraySource):
+        columns = examples.columns(names)
+        return lambda: ((X[:, columns], y) for X, y in examples.shuffled_chunks(rng))
+
+    original = list(examples)
+    X, y = example_arrays(original, names, label)
+    order = list(range(len(original)))
+    def epoch() -> Chunks:
+        rng.shuffle(order)
+        examples[:] = [original[i] for i in order]
+        return [(X[order], y[order])]
+    return epoch
+
+def train(
+        epochs: int,
+        r: float,
+        label: AttributeName,
+        attributes: Attributes,
+        examples: Source,
+        correct: Optional[Callable[[int, Params], None]] = None,
+        mistake: Optional[Mistake] = None,
+        stop: Optional[Callable[[int], bool]] = None
+) -> Tuple[List[AttributeName], Params]:
+    # runs up to epochs epochs, stopping after one where stop holds for the
+    # number of rows classified correctly, by default one without mistakes,
+    # and returns the attribute order of the weights and the final params
+    names = list(attributes)
+    params = np.zeros(len(names) + 1)
+    epoch = epoch_chunks(examples, names, label)
+    if stop is None:
+        stop = lambda count_correct: count_correct == len(examples)
+    for _ in range(epochs):
+        count_correct = sum(scan(r, params, X, y, correct, mistake) for X, y in epoch())
+        if stop(count_correct):
+            break
+    return names, params
@@ -1,63 +1,80 @@
 #!/usr/bin/env python3
 
-from random import shuffle
-from typing import Iterable, List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple, Union
 
+import numpy as np
+
+from dataset.chunked import Source
 from dataset.continuous import AttributeName, AttributeValue, Attributes, Example
-from .perceptron import Weights, predict as predict_perceptron
+from .engine import Params, scores, train
 
-def perceptron_step(
-        r: float,
-        label: AttributeName,
-        weights: List[Weights],
-        biases: List[float],
-        counts: List[int],
-        example: Example
-) -> None:
-    correct = predict_perceptron(weights[-1], biases[-1], example) == example[label]
-    if correct:
-        counts[-1] += 1
-    else:
-        change = 1.0 if example[label] == 1 else -1.0
-
-        new_weights = weights[-1].copy()
-        for attribute in new_weights:
-            new_weights[attribute] += r * change * example[attribute]
-        new_bias = biases[-1] + r * change * 1.0
-
-        weights.append(new_weights)
-        biases.append(new_bias)
-        counts.append(1)
-
-def perceptron_epoch(
-        r: float,
-        label: AttributeName,
-        examples: Iterable[Example],
-        weights: List[Weights],
-        biases: List[float],
-        counts: List[int]
-) -> None:
-    for example in examples:
-        perceptron_step(r, label, weights, biases, counts, example)
+# every mistake starts a new perceptron, counted once for the example that
+# made it and once for every example it then classifies correctly. The
+# perceptrons are the rows of weights, in the order of attributes.
+@dataclass(frozen = True)
+class VotedPerceptron:
+    attributes: Tuple[AttributeName, ...]
+    weights: np.ndarray
+    biases: np.ndarray
+    counts: np.ndarray
+    # the column of weights holding each attribute
+    attribute_columns: Dict[AttributeName, int] = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "attribute_columns", { a: i for i, a in enumerate(self.attributes) })
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def columns(self, attributes: Iterable[AttributeName]) -> List[int]:
+        # the columns of weights holding the attributes, in their order
+        return [self.attribute_columns[a] for a in attributes]
 
 def perceptron(
         epochs: int,
         r: float,
         label: AttributeName,
         attributes: Attributes,
-        examples: List[Example]
-) -> Tuple[List[Weights], List[float], List[int]]:
-    weights = [{ k: 0.0 for k in attributes }]
-    biases = [0.0]
-    counts = [0]
-    for _ in range(epochs):
-        shuffle(examples)
-        perceptron_epoch(r, label, examples, weights, biases, counts)
-        if counts[-1] == len(examples):
-            break
-    return weights, biases, counts
-
-def predict(weights: List[Weights], biases: List[float], counts: List[int], example: Example) -> AttributeValue:
-    def vote(weights, bias, count):
-        return count * (1 if predict_perceptron(weights, bias, example) == 1 else -1)
-    return 1 if sum(map(lambda wbc: vote(*wbc), zip(weights, biases, counts))) >= 0 else 0
+        examples: Source
+) -> VotedPerceptron:
+    # the perceptrons are appended to an array that doubles when full
+    history = np.zeros((64, len(attributes) + 1))
+    counts = np.zeros(64, dtype=np.int64)
+    size = 1
+
+    def correct(run: int, params: Params):
+        counts[size - 1] += run
+
+    def mistake(params: Params, columns: Union[slice, np.ndarray], values: np.ndarray, step: float):
+        nonlocal history, counts, size
+        if size == len(counts):
+            history = np.concatenate((history, np.zeros_like(history)))
+            counts = np.concatenate((counts, np.zeros_like(counts)))
+        history[size] = params
+        counts[size] = 1
+        size += 1
+
+    def stop(count_correct: int) -> bool:
+        # once the latest perceptron's count, which runs on across epochs,
+        # reaches the number of examples
+        return counts[size - 1] == len(examples)
+
+    names, _ = train(epochs, r, label, attributes, examples, correct, mistake, stop)
+    return VotedPerceptron(tuple(names), history[:size, :-1].copy(), history[:size, -1].copy(), counts[:size].copy())
+
+# rows of X predicted at once, bounding the (row x perceptron) scores
+PREDICT_ROWS = 1024
+
+def predict_batch(voted: VotedPerceptron, X: np.ndarray) -> np.ndarray:
+    # the perceptrons' ±1 predictions for all rows at once, summed with the
+    # counts as weights; X has the columns of voted.attributes
+    predictions = np.empty(X.shape[0], dtype=np.int64)
+    for start in range(0, X.shape[0], PREDICT_ROWS):
+        signs = np.where(scores(voted.weights, voted.biases, X[start:start + PREDICT_ROWS]) >= 0, 1, -1)
+        predictions[start:start + PREDICT_ROWS] = (signs @ voted.counts) >= 0
+    return predictions
+
+def predict(voted: VotedPerceptron, example: Example) -> AttributeValue:
+    x = np.array([[example[a] for a in voted.attributes]], dtype=np.float64)
+    return int(predict_batch(voted, x)[0])
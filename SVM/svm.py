@@ -1,19 +1,37 @@
 #!/usr/bin/env python3
 
-from random import shuffle
-from typing import Callable, Dict, Tuple
+import random
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
-from dataset.continuous import AttributeName, Attributes, Example, Examples
+import numpy as np
+
+from dataset.chunked import Source, minibatches, shuffled, to_source
+from dataset.continuous import AttributeName, Attributes, Example
+from dataset.sparse import SparseExamples
+from Optimization.optimizers import Optimizer, plain
 
 Weights = Dict[str, float]
 
 def predict(weights: Weights, bias: float, example: Example):
     return bias + sum(map(lambda k: weights[k] * example[k], weights.keys()))
 
+def predict_batch(weights: Weights, bias: float, X: np.ndarray, attributes: Sequence[AttributeName]) -> np.ndarray:
+    # predict for the rows of X, dense or sparse, whose columns hold the
+    # attributes in order
+    return X @ np.array([weights[a] for a in attributes]) + bias
+
 def svm(
         T: int, C: float, gamma_schedule: Callable[[int], float],
-        attributes: Attributes, label: AttributeName, examples: Examples
+        attributes: Attributes, label: AttributeName, examples: Source,
+        optimizer: Optional[Optimizer] = None, batch_size: int = 1
 ) -> Tuple[Weights, float]:
+    # with an optimizer or a batch_size, every step is made by the optimizer
+    # on the mean subgradient of a batch of examples
+    if optimizer is not None or batch_size != 1:
+        return _svm_batches(T, C, gamma_schedule, attributes, label, examples, optimizer or plain(), batch_size)
+    if isinstance(examples, SparseExamples):
+        return _svm_sparse(T, C, gamma_schedule, attributes, examples)
+
     N = len(examples)
 
     w = { k: 0.0 for k in attributes }
@@ -27,9 +45,8 @@ def svm(
         return regularization + C * N * hinge_loss
 
     for t in range(T):
-        shuffle(examples)
         gamma = gamma_schedule(t)
-        for xi in examples:
+        for xi in shuffled(examples):
             prediction = predict(w, b, xi)
             yi = 1 if xi[label] == 1 else -1
             if yi * prediction <= 1:
@@ -41,3 +58,65 @@ def svm(
                     w[k] = (1 - gamma) * w[k]
 
     return w, b
+
+def _svm_batches(
+        T: int, C: float, gamma_schedule: Callable[[int], float],
+        attributes: Attributes, label: AttributeName, examples: Source,
+        optimizer: Optimizer, batch_size: int
+) -> Tuple[Weights, float]:
+    names = list(attributes)
+    source = to_source(examples, names, label)
+    N = len(source)
+
+    params = [np.zeros(len(names)), np.zeros(1)]
+    w, b = params
+    for t in range(T):
+        gamma = gamma_schedule(t)
+        for X, y in minibatches(source, names, batch_size):
+            # the subgradient of J: the hinge loss only counts inside the margin
+            yi = np.where(y == 1, 1.0, -1.0)
+            inside = yi * (X @ w + b[0]) <= 1
+            gradient_w = w - C * N * (yi[inside] @ X[inside]) / len(y)
+            gradient_b = -C * N * np.sum(yi[inside], keepdims=True) / len(y)
+            optimizer(params, [gradient_w, gradient_b], gamma)
+
+    return dict(zip(names, w.tolist())), float(b[0])
+
+# below this, the scale of the sparse weights is folded into them
+MIN_SCALE = 1e-9
+
+def _svm_sparse(
+        T: int, C: float, gamma_schedule: Callable[[int], float],
+        attributes: Attributes, examples: SparseExamples
+) -> Tuple[Weights, float]:
+    # the weights are kept as scale * v, so the (1 - gamma) shrink of every
+    # step is one multiplication and a step touches only the example's
+    # nonzero attributes. The examples are shuffled as a list would be.
+    names = list(attributes)
+    X = examples.X[:, examples.columns(names)].tocsr()
+    y = examples.y
+    N = len(examples)
+
+    v = np.zeros(len(names))
+    scale = 1.0
+    b = 0.0
+    order = list(range(N))
+
+    for t in range(T):
+        gamma = gamma_schedule(t)
+        random.shuffle(order)
+        for i in order:
+            span = slice(X.indptr[i], X.indptr[i + 1])
+            columns, values = X.indices[span], X.data[span]
+            prediction = b + scale * float(v[columns] @ values)
+            yi = 1 if y[i] == 1 else -1
+
+            scale *= 1 - gamma
+            if scale < MIN_SCALE:
+                v *= scale
+                scale = 1.0
+            if yi * prediction <= 1:
+                v[columns] += gamma * C * N * yi * values / scale
+                b = b + gamma * C * N * yi * 1
+
+    return dict(zip(names, (scale * v).tolist())), b
@@ -3,9 +3,16 @@
 import os
 import os.path
 import csv
+from itertools import repeat
 from statistics import median
+from typing import Dict, List, Optional, Sequence
 
-from dataset.dataset import Attribute, Dataset
+import numpy as np
+
+from dataset.dataset import Attribute, AttributeName, Dataset
+from dataset.cache import cached
+from dataset.columnar import ColumnarDataset, ColumnarExamples, concatenate_examples, encode_columns, make_encodings
+from dataset.stream import CHUNK_SIZE, Chunk, column_sketches, read_chunks
 
 columns = [
     ("age", int),
@@ -64,12 +71,49 @@ def load(path: str) -> Dataset:
     fixup_examples(train)
     fixup_examples(test)
 
-    def to_attribute(column):
-        if column[1] == int:
-            return Attribute(column[0], set(["<", ">="]))
-        else:
-            return Attribute(column[0], set(column[1]))
     attributes = set(map(to_attribute, columns[:-1]))
     label_attribute = to_attribute(columns[-1])
 
-    return Dataset(train, test, attributes, label_attribute)
+    return Dataset(train, [1.0] * len(train), test, [1.0] * len(test), attributes, label_attribute)
+
+def to_attribute(column):
+    if column[1] == int:
+        return Attribute(column[0], set(["<", ">="]))
+    else:
+        return Attribute(column[0], set(column[1]))
+
+def load_columnar(path: str, numeric: bool = False, cache_dir: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> ColumnarDataset:
+    # with numeric, the integer columns are kept as continuous attributes
+    # instead of being binarized. With a cache_dir the encoded dataset is
+    # cached there. Files are read chunk_size rows at a time, so only the
+    # encoded columns are held whole.
+    paths = [os.path.join(path, "train.csv"), os.path.join(path, "test.csv")]
+    return cached("bank.load_columnar", paths, { "numeric": numeric }, lambda: _load_columnar(paths, numeric, chunk_size), cache_dir)
+
+def _load_columnar(paths: List[str], numeric: bool, chunk_size: int) -> ColumnarDataset:
+    names = [name for name, _ in columns]
+    numeric_names = [name for name, kind in columns if kind == int] if numeric else []
+
+    # otherwise binarize numeric columns against the training median, found
+    # in a first pass over the training file; the median is exact up to
+    # SKETCH_SIZE training examples and estimated past that
+    media: Dict[AttributeName, float] = {}
+    if not numeric:
+        binarized = [name for name, kind in columns if kind == int]
+        sketches = column_sketches(read_chunks(paths[0], names, chunk_size), binarized)
+        media = { name: sketch.median() for name, sketch in sketches.items() }
+
+    attributes = set(Attribute(c[0], set()) if c[0] in numeric_names else to_attribute(c) for c in columns[:-1])
+    label_attribute = to_attribute(columns[-1])
+    encodings = make_encodings(A for A in attributes | set([label_attribute]) if A.name not in numeric_names)
+
+    def encode_chunk(chunk: Chunk) -> ColumnarExamples:
+        raw: Dict[AttributeName, Sequence[str]] = dict(chunk)
+        for name, m in media.items():
+            raw[name] = np.where(np.asarray(chunk[name], dtype=np.int64) < m, "<", ">=")
+        return encode_columns(raw, repeat(1.0), encodings, numeric_names)
+
+    def read(path: str) -> ColumnarExamples:
+        return concatenate_examples([encode_chunk(chunk) for chunk in read_chunks(path, names, chunk_size)])
+
+    return ColumnarDataset(read(paths[0]), read(paths[1]), attributes, label_attribute, encodings)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from .dataset import Attribute
+from .columnar import ColumnarDataset, ColumnarExamples, Encoding
+
+##################
+# Cache Layout
+#
+# Every cached dataset is a directory named by its key holding
+#
+#   header.json      attributes, label, encodings and the file of every array
+#   *.npy            one array per column, numeric column and weights
+#
+# The key hashes the contents of the source files together with the loader
+# and its parameters, so editing a file or changing a parameter misses the
+# cache. Arrays are opened as read-only memory maps, so a page of a column
+# is only read when it is used.
+
+# where scripts keep their cache, relative to the repository
+CACHE_DIR = "generated/cache"
+# bump when a loader's preprocessing changes, to miss old entries
+FORMAT = 1
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(loader: str, paths: Iterable[str], params: Dict[str, Any]) -> str:
+    key = { "format": FORMAT, "loader": loader, "params": params, "files": [file_digest(path) for path in paths] }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+##################
+# Saving and Loading
+
+def _save_examples(directory: str, part: str, examples: ColumnarExamples) -> Dict[str, Any]:
+    files: Dict[str, Any] = { "columns": {}, "numeric": {} }
+    for group in ("columns", "numeric"):
+        for i, (name, a) in enumerate(getattr(examples, group).items()):
+            files[group][name] = f"{part}-{group}-{i}.npy"
+            np.save(os.path.join(directory, files[group][name]), a)
+    files["weights"] = f"{part}-weights.npy"
+    np.save(os.path.join(directory, files["weights"]), examples.weights)
+    return files
+
+def _load_examples(directory: str, files: Dict[str, Any]) -> ColumnarExamples:
+    def load(filename: str) -> np.ndarray:
+        return np.load(os.path.join(directory, filename), mmap_mode="r")
+    return ColumnarExamples(
+        { name: load(filename) for name, filename in files["columns"].items() },
+        load(files["weights"]),
+        { name: load(filename) for name, filename in files["numeric"].items() }
+    )
+
+def save_dataset(directory: str, dataset: ColumnarDataset):
+    # written beside the directory and moved into place, so a reader never
+    # sees a partial entry
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    try:
+        header = {
+            "attributes": { A.name: sorted(A.values) for A in dataset.attributes },
+            "label": [dataset.label.name, sorted(dataset.label.values)],
+            "encodings": { name: list(encoding.values) for name, encoding in dataset.encodings.items() },
+            "train": _save_examples(staging, "train", dataset.train),
+            "test": _save_examples(staging, "test", dataset.test),
+        }
+        with open(os.path.join(staging, "header.json"), "w") as f:
+            json.dump(header, f)
+        os.rename(staging, directory)
+    except OSError:
+        # another process may have stored the same entry first
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+
+def load_dataset(directory: str) -> ColumnarDataset:
+    with open(os.path.join(directory, "header.json"), "r") as f:
+        header = json.load(f)
+    attributes = set(Attribute(name, set(values)) for name, values in header["attributes"].items())
+    label = Attribute(header["label"][0], set(header["label"][1]))
+    by_name = { A.name: A for A in attributes | set([label]) }
+    encodings = {
+        name: Encoding(by_name[name], tuple(values), { v: i for i, v in enumerate(values) })
+        for name, values in header["encodings"].items()
+    }
+    return ColumnarDataset(
+        _load_examples(directory, header["train"]),
+        _load_examples(directory, header["test"]),
+        attributes, label, encodings
+    )
+
+def cached(
+        loader: str,
+        paths: Iterable[str],
+        params: Dict[str, Any],
+        build: Callable[[], ColumnarDataset],
+        cache_dir: Optional[str] = CACHE_DIR
+) -> ColumnarDataset:
+    # the dataset built from paths by build, from the cache when it is there.
+    # Without a cache_dir the dataset is always built.
+    if cache_dir is None:
+        return build()
+    directory = os.path.join(cache_dir, cache_key(loader, paths, params))
+    if not os.path.isdir(directory):
+        save_dataset(directory, build())
+    return load_dataset(directory)
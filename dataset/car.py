@@ -2,10 +2,13 @@
 
 import csv
 import os.path
+from itertools import repeat
+from typing import Dict, List, Set, Tuple
 
-from .dataset import Dataset, Attribute
+from .dataset import Dataset, Attribute, AttributeName
+from .columnar import ColumnarDataset, encode_columns, make_encodings
 
-def load(path: str) -> Dataset:
+def parse_desc(path: str) -> Tuple[Set[Attribute], Attribute, List[AttributeName]]:
     def parse_attribute_line(line: str) -> Attribute:
         [name, values] = map(lambda s: s.strip().rstrip("."), line.split(":"))
         return Attribute(name, set(values.split(", ")))
@@ -33,6 +36,11 @@ def load(path: str) -> Dataset:
     attributes = set(map(parse_attribute_line, desc["attributes"]))
     columns = desc["columns"][0].split(",")
 
+    return attributes, label_attribute, columns
+
+def load(path: str) -> Dataset:
+    attributes, label_attribute, columns = parse_desc(path)
+
     train = None
     with open(os.path.join(path, "train.csv"), "r") as f:
         reader = csv.DictReader(f, columns)
@@ -43,4 +51,18 @@ def load(path: str) -> Dataset:
         reader = csv.DictReader(f, columns)
         test = list(reader)
 
-    return Dataset(train, test, attributes, label_attribute)
+    return Dataset(train, [1.0] * len(train), test, [1.0] * len(test), attributes, label_attribute)
+
+def load_columnar(path: str) -> ColumnarDataset:
+    attributes, label_attribute, columns = parse_desc(path)
+    encodings = make_encodings(attributes | set([label_attribute]))
+
+    def parse(train_or_test: str) -> Dict[AttributeName, List[str]]:
+        with open(os.path.join(path, train_or_test + ".csv"), "r") as f:
+            rows = list(csv.reader(f))
+        return { name: [row[i] for row in rows] for i, name in enumerate(columns) }
+
+    train = encode_columns(parse("train"), repeat(1.0), encodings)
+    test = encode_columns(parse("test"), repeat(1.0), encodings)
+
+    return ColumnarDataset(train, test, attributes, label_attribute, encodings)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass, field
+import json
+import os
+import os.path
+import random
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .continuous import AttributeName, Example, Examples
+from .sparse import SparseExamples
+from .stream import CHUNK_SIZE, parse_numbers, read_chunks
+
+##################
+# Array Sources
+#
+# A continuous dataset as an (example x attribute) array and a label array,
+# usually memory maps of files written a chunk at a time. A source reads
+# like a list of examples: random.choice and iteration work on it, but an
+# iteration only holds one chunk of rows at a time. Training shuffles it
+# through a buffer of chunks rather than in place.
+
+@dataclass(frozen = True)
+class ArraySource:
+    X: np.ndarray
+    y: np.ndarray
+    attributes: Tuple[AttributeName, ...]
+    label: AttributeName
+    chunk_size: int = CHUNK_SIZE
+    # chunks mixed together when shuffling
+    buffer_chunks: int = 4
+    # the column of X holding each attribute
+    attribute_columns: Dict[AttributeName, int] = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "attribute_columns", { a: i for i, a in enumerate(self.attributes) })
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def example(self, x: Sequence[float], y: float) -> Example:
+        example = dict(zip(self.attributes, x))
+        example[self.label] = y
+        return example
+
+    def columns(self, attributes: Iterable[AttributeName]) -> List[int]:
+        # the columns of X holding the attributes, in their order
+        return [self.attribute_columns[a] for a in attributes]
+
+    def __getitem__(self, i: int) -> Example:
+        return self.example(self.X[i].tolist(), float(self.y[i]))
+
+    def chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for start in range(0, len(self), self.chunk_size):
+            yield np.asarray(self.X[start:start + self.chunk_size]), np.asarray(self.y[start:start + self.chunk_size])
+
+    def __iter__(self) -> Iterator[Example]:
+        for X, y in self.chunks():
+            yield from map(self.example, X.tolist(), y.tolist())
+
+    def shuffled_chunks(self, rng=random) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # the chunks are visited in random order and buffer_chunks of them at
+        # a time are pooled and permuted; rng is the random module or a
+        # random.Random, so seeding it seeds the order
+        starts = list(range(0, len(self), self.chunk_size))
+        rng.shuffle(starts)
+        permutation = np.random.default_rng(rng.getrandbits(64)).permutation
+        for i in range(0, len(starts), self.buffer_chunks):
+            # reading the pooled chunks in file order keeps the reads sequential
+            rows = np.sort(np.concatenate([np.arange(start, min(start + self.chunk_size, len(self))) for start in starts[i:i + self.buffer_chunks]]))
+            order = permutation(len(rows))
+            X, y = np.asarray(self.X[rows]), np.asarray(self.y[rows])
+            yield X[order], y[order]
+
+    def shuffled(self, rng=random) -> Iterator[Example]:
+        for X, y in self.shuffled_chunks(rng):
+            yield from map(self.example, X.tolist(), y.tolist())
+
+Source = Union[Examples, ArraySource, SparseExamples]
+
+def shuffled(examples: Source, rng=random) -> Iterable[Example]:
+    # one epoch of examples in random order: a list is shuffled in place as
+    # before and a source through its buffer of chunks
+    if isinstance(examples, (ArraySource, SparseExamples)):
+        return examples.shuffled(rng)
+    rng.shuffle(examples)
+    return examples
+
+##################
+# Minibatches
+
+def to_source(examples: Source, attributes: Iterable[AttributeName], label: AttributeName) -> Union[ArraySource, SparseExamples]:
+    # a list of examples becomes an in-memory source of one chunk, so an
+    # epoch over it is shuffled whole; sparse examples are read as they are
+    if isinstance(examples, (ArraySource, SparseExamples)):
+        return examples
+    return examples_source(examples, attributes, label, max(len(examples), 1))
+
+def minibatches(source: Union[ArraySource, SparseExamples], attributes: Sequence[AttributeName], batch_size: int, rng=random) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # one epoch of shuffled (X, y) batches, with the columns of X in the
+    # order of attributes
+    columns = source.columns(attributes)
+    for X, y in source.shuffled_chunks(rng):
+        for start in range(0, len(y), batch_size):
+            yield X[start:start + batch_size][:, columns], y[start:start + batch_size]
+
+##################
+# Writing and Opening
+#
+# A source is stored as a directory holding
+#
+#   header.json      attribute names, label and number of examples
+#   X.f8, y.f8       raw little endian float64 arrays
+#
+# The arrays are appended a chunk at a time, so a source of any size is
+# written from a stream of chunks.
+
+def write_source(directory: str, chunks: Iterable[Tuple[np.ndarray, np.ndarray]], attributes: Sequence[AttributeName], label: AttributeName):
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    with open(os.path.join(directory, "X.f8"), "wb") as X_file, open(os.path.join(directory, "y.f8"), "wb") as y_file:
+        for X, y in chunks:
+            assert X.shape == (len(y), len(attributes))
+            X_file.write(np.ascontiguousarray(X, dtype="<f8").tobytes())
+            y_file.write(np.ascontiguousarray(y, dtype="<f8").tobytes())
+            count += len(y)
+    with open(os.path.join(directory, "header.json"), "w") as f:
+        json.dump({ "attributes": list(attributes), "label": label, "count": count }, f)
+
+def open_source(directory: str, chunk_size: int = CHUNK_SIZE, buffer_chunks: int = 4) -> ArraySource:
+    with open(os.path.join(directory, "header.json"), "r") as f:
+        header = json.load(f)
+    count, num_attributes = header["count"], len(header["attributes"])
+    def open_array(filename: str, shape: Tuple[int, ...]) -> np.ndarray:
+        if count == 0:
+            return np.zeros(shape)
+        return np.memmap(os.path.join(directory, filename), dtype="<f8", mode="r", shape=shape)
+    return ArraySource(
+        open_array("X.f8", (count, num_attributes)), open_array("y.f8", (count,)),
+        tuple(header["attributes"]), header["label"], chunk_size, buffer_chunks
+    )
+
+def csv_source(
+        path: str,
+        directory: str,
+        columns: Sequence[AttributeName],
+        attributes: Sequence[AttributeName],
+        label: AttributeName,
+        chunk_size: int = CHUNK_SIZE
+) -> ArraySource:
+    # converts a headerless numeric CSV a chunk at a time
+    def chunks() -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for chunk in read_chunks(path, columns, chunk_size):
+            yield np.stack([parse_numbers(chunk[a]) for a in attributes], axis=1), parse_numbers(chunk[label])
+    write_source(directory, chunks(), attributes, label)
+    return open_source(directory, chunk_size)
+
+def examples_source(examples: Examples, attributes: Iterable[AttributeName], label: AttributeName, chunk_size: int = CHUNK_SIZE) -> ArraySource:
+    # an in-memory source over a list of examples
+    names: List[AttributeName] = sorted(attributes)
+    X = np.array([[example[a] for a in names] for example in examples], dtype=np.float64).reshape(len(examples), len(names))
+    y = np.array([example[label] for example in examples], dtype=np.float64)
+    return ArraySource(X, y, tuple(names), label, chunk_size)
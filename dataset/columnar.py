@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .dataset import Attribute, AttributeName, AttributeValue, Attributes, Dataset, Example, Examples, Weights
+
+##################
+# Type Definitions
+
+# code stored for values that are unknown to an attribute's encoding
+MISSING = -1
+
+@dataclass(frozen = True)
+class Encoding:
+    attribute: Attribute
+    values: Tuple[AttributeValue, ...]
+    codes: Dict[AttributeValue, int] = field(compare=False, repr=False)
+
+    def encode(self, value: AttributeValue) -> int:
+        return self.codes.get(value, MISSING)
+
+    def decode(self, code: int) -> AttributeValue:
+        return self.values[code]
+
+Encodings = Dict[AttributeName, Encoding]
+
+# Categorical attributes are stored as codes in columns. Continuous
+# attributes are stored as float values in numeric, with NaN for missing
+# values, and are given as Attributes without values.
+@dataclass(frozen = True)
+class ColumnarExamples:
+    columns: Dict[AttributeName, np.ndarray]
+    weights: np.ndarray
+    numeric: Dict[AttributeName, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def take(self, indices: np.ndarray) -> 'ColumnarExamples':
+        return ColumnarExamples(
+            { name: column[indices] for name, column in self.columns.items() },
+            self.weights[indices],
+            { name: values[indices] for name, values in self.numeric.items() }
+        )
+
+    def with_weights(self, weights: Weights) -> 'ColumnarExamples':
+        return replace(self, weights=_weights_array(weights, len(self)))
+
+@dataclass(frozen = True)
+class ColumnarDataset:
+    train: ColumnarExamples
+    test: ColumnarExamples
+    attributes: Attributes
+    label: Attribute
+    encodings: Encodings
+
+##################
+# Encoding
+
+def code_dtype(num_values: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_values <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def make_encoding(attribute: Attribute) -> Encoding:
+    values = tuple(sorted(attribute.values))
+    return Encoding(attribute, values, { v: i for i, v in enumerate(values) })
+
+def make_encodings(attributes: Iterable[Attribute]) -> Encodings:
+    return { A.name: make_encoding(A) for A in attributes }
+
+def _weights_array(weights: Weights, count: int) -> np.ndarray:
+    # weights may be an infinite iterator such as repeat(1)
+    return np.fromiter(
+        (w for _, w in zip(range(count), weights)), dtype=np.float64, count=count
+    )
+
+def encode_column(values: Sequence[AttributeValue], encoding: Encoding) -> np.ndarray:
+    codes = encoding.codes
+    return np.fromiter(
+        (codes.get(v, MISSING) for v in values),
+        dtype=code_dtype(len(encoding.values)), count=len(values)
+    )
+
+def numeric_column(values: Sequence[AttributeValue]) -> np.ndarray:
+    # values that do not parse as numbers, such as "?", are missing
+    def parse(v) -> float:
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return np.nan
+    return np.fromiter(map(parse, values), dtype=np.float64, count=len(values))
+
+def encode_columns(
+        raw: Dict[AttributeName, Sequence[AttributeValue]],
+        weights: Weights,
+        encodings: Encodings,
+        numeric: Iterable[AttributeName] = ()
+) -> ColumnarExamples:
+    count = len(next(iter(raw.values()))) if len(raw) > 0 else 0
+    columns = {}
+    for name, encoding in encodings.items():
+        if name in raw:
+            columns[name] = encode_column(raw[name], encoding)
+        else:
+            columns[name] = np.full(count, MISSING, dtype=code_dtype(len(encoding.values)))
+    numeric_columns = {
+        name: numeric_column(raw[name]) if name in raw else np.full(count, np.nan)
+        for name in numeric
+    }
+    return ColumnarExamples(columns, _weights_array(weights, count), numeric_columns)
+
+def concatenate_examples(parts: Sequence[ColumnarExamples]) -> ColumnarExamples:
+    # parts encoded against the same encodings, such as the chunks of a file
+    return ColumnarExamples(
+        { name: np.concatenate([part.columns[name] for part in parts]) for name in parts[0].columns },
+        np.concatenate([part.weights for part in parts]),
+        { name: np.concatenate([part.numeric[name] for part in parts]) for name in parts[0].numeric }
+    )
+
+def encode_examples(examples: Examples, weights: Weights, encodings: Encodings, numeric: Iterable[AttributeName] = ()) -> ColumnarExamples:
+    numeric = list(numeric)
+    raw = { name: [s.get(name) for s in examples] for name in list(encodings.keys()) + numeric }
+    return encode_columns(raw, weights, encodings, numeric)
+
+def numeric_attributes(attributes: Iterable[Attribute]) -> List[AttributeName]:
+    return sorted(A.name for A in attributes if len(A.values) == 0)
+
+def encode_dataset(dataset: Dataset) -> ColumnarDataset:
+    numeric = numeric_attributes(dataset.attributes)
+    encodings = make_encodings(A for A in set(dataset.attributes) | set([dataset.label]) if A.name not in numeric)
+    return ColumnarDataset(
+        encode_examples(dataset.train, dataset.train_weights, encodings, numeric),
+        encode_examples(dataset.test, dataset.test_weights, encodings, numeric),
+        dataset.attributes, dataset.label, encodings
+    )
+
+def decode_example(examples: ColumnarExamples, encodings: Encodings, i: int) -> Example:
+    example = {}
+    for name, column in examples.columns.items():
+        code = int(column[i])
+        if code != MISSING:
+            example[name] = encodings[name].decode(code)
+    for name, values in examples.numeric.items():
+        if not np.isnan(values[i]):
+            example[name] = float(values[i])
+    return example
+
+def decode_examples(examples: ColumnarExamples, encodings: Encodings) -> Tuple[Examples, Weights]:
+    decoded = [decode_example(examples, encodings, i) for i in range(len(examples))]
+    return decoded, list(examples.weights)
+
+##################
+# Dataset Helpers
+
+def most_common_label_code(examples: ColumnarExamples, label: Encoding) -> int:
+    column = examples.columns[label.attribute.name]
+    known = column != MISSING
+    counts = np.bincount(column[known], weights=examples.weights[known], minlength=len(label.values))
+    return int(np.argmax(counts))
+
+def evaluate(predictions: np.ndarray, examples: ColumnarExamples, label: Attribute) -> float:
+    correct = predictions == examples.columns[label.name]
+    return float(np.sum(examples.weights[correct]) / np.sum(examples.weights))
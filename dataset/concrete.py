@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
 import csv
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 import os.path
 
 from .continuous import Dataset
+from .chunked import CHUNK_SIZE, ArraySource, csv_source
 
 attributes = [
     "Cement", "Slag", "Fly ash", "Water", "SP", "Coarse Aggr", "Fine Aggr"
@@ -23,3 +24,10 @@ def load(path: str) -> Dataset:
     test = parse("test")
 
     return Dataset(train, test, set(attributes), label)
+
+def load_chunked(path: str, directory: str, chunk_size: int = CHUNK_SIZE) -> Tuple[ArraySource, ArraySource]:
+    # train and test sources converted into directory a chunk at a time
+    def convert(train_or_test: str) -> ArraySource:
+        return csv_source(os.path.join(path, train_or_test + ".csv"), os.path.join(directory, train_or_test), columns, attributes, label, chunk_size)
+
+    return convert("train"), convert("test")
@@ -42,6 +42,12 @@ def partition(S: Examples, weights: Weights, A: AttributeName, v: AttributeValue
             wv.append(weight)
     return sv, wv
 
+def partition_indices(S: Examples, rows: Iterable[int], A: AttributeName) -> Dict[AttributeValue, List[int]]:
+    groups: defaultdict[AttributeValue, List[int]] = defaultdict(list)
+    for i in rows:
+        groups[S[i][A]].append(i)
+    return groups
+
 def most_common_label_value(S: Examples, weights: Weights, label: AttributeName) -> AttributeValue:
     counts: defaultdict[AttributeValue, float] = defaultdict(lambda: 0)
     most_common_value = None
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 
-from collections import defaultdict
 import csv
-from typing import Any, Dict, Iterable, List, Set, Tuple
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 import os.path
 
+import numpy as np
+
 from .dataset import Attribute, AttributeName, Dataset
+from .cache import cached
+from .columnar import MISSING, ColumnarDataset, ColumnarExamples, Encoding, code_dtype, concatenate_examples, encode_columns, make_encodings
+from .stream import CHUNK_SIZE, Chunk, count_values, read_chunks
 
 attributes: Dict[str, Set[str]] = {
     "age": set(("<25", "25-35", "36-45", "46-55", "56-65", ">65")),
@@ -49,136 +54,182 @@ bucket = {
 
 unknowables = set(("workclass", "occupation", "native.country"))
 
-def make_fractional_examples(example, attribute_name: str, unknowable_counts: Dict[AttributeName, int]):
+##################
+# Bucketing
+#
+# Integer attributes are bucketed by a binary search over their thresholds
+# and string attributes through a dict, a whole column at a time. Unknown
+# values ("?") are left as they are.
+
+def bucket_names(thresholds: Sequence[int]) -> List[str]:
+    # bucket i holds the values above thresholds[i - 1] up to thresholds[i]
+    names = [f"<{thresholds[0]}"]
+    for i in range(1, len(thresholds)):
+        lower = thresholds[i-1] if i == 1 else thresholds[i-1]+1
+        upper = thresholds[i]
+        names.append(str(lower) if upper == lower else f"{lower}-{upper}")
+    names.append(f">{thresholds[-1]}")
+    return names
+
+def bucket_indices(thresholds: Sequence[int], values: np.ndarray) -> np.ndarray:
+    # the bucket of each value, the number of thresholds below it
+    return np.searchsorted(np.asarray(thresholds), values, side="left")
+
+def bucket_column(attr_to_bucket: AttributeName, values: Sequence[str], attributes=attributes, bucket=bucket) -> List[str]:
+    kind, params = bucket[attr_to_bucket]
+    known = [i for i, value in enumerate(values) if value != "?"]
+    bucketed = list(values)
+    if kind == int:
+        names = bucket_names(params)
+        assert set(names) <= attributes[attr_to_bucket]
+        indices = bucket_indices(params, np.array([int(values[i]) for i in known], dtype=np.int64))
+        for i, index in zip(known, indices.tolist()):
+            bucketed[i] = names[index]
+    elif kind == str:
+        assert set(params.values()) <= attributes[attr_to_bucket]
+        for i in known:
+            bucketed[i] = params[values[i]]
+    else:
+        assert False
+    return bucketed
+
+def bucket_value(attr_to_bucket: AttributeName, value: str, attributes=attributes, bucket=bucket) -> str:
+    return bucket_column(attr_to_bucket, [value], attributes, bucket)[0]
+
+def process_bucketing(examples, attributes=attributes, bucket=bucket):
+    for attr_to_bucket in bucket.keys():
+        column = bucket_column(attr_to_bucket, [example[attr_to_bucket] for example in examples], attributes, bucket)
+        for example, value in zip(examples, column):
+            example[attr_to_bucket] = value
+
+##################
+# Unknown Values
+#
+# An unknown value is replaced by copies of its example, one for each value
+# seen for the attribute, weighted by how often that value was seen. The
+# values are counted in a pass over the file a chunk at a time, before its
+# examples are read.
+
+UnknowableCounts = Dict[AttributeName, Dict[str, int]]
+# (value, share of the weight) for every value of each unknowable attribute
+Fractions = Dict[AttributeName, List[Tuple[str, float]]]
+
+def stream_unknowable_counts(path: str, chunk_size: int = CHUNK_SIZE) -> UnknowableCounts:
+    # the known values of each unknowable attribute, in order of first
+    # appearance, and how often each appears
+    return count_values(read_chunks(path, chunk_size=chunk_size), sorted(unknowables), lambda value: value != "?")
+
+def make_fractions(unknowable_counts: UnknowableCounts, bucketed: bool = False) -> Fractions:
+    # with bucketed, the values are bucketed as the examples they are copied
+    # into already are
+    fractions: Fractions = {}
+    for unknowable, counts in unknowable_counts.items():
+        values = list(counts.keys())
+        if bucketed and unknowable in bucket:
+            values = bucket_column(unknowable, values)
+        total_count = sum(counts.values())
+        fractions[unknowable] = [(value, count / total_count) for value, count in zip(values, counts.values())]
+    return fractions
+
+def make_fractional_examples(example, attribute_name: str, fractions: List[Tuple[str, float]]):
     out = []
-    total_count = sum(unknowable_counts.values())
-    for possible_value, count in unknowable_counts.items():
+    for possible_value, share in fractions:
         cur_weight = float(example["weight"])
         new_example = example.copy()
         new_example[attribute_name] = possible_value
-        new_example["weight"] = (count / total_count) * cur_weight
+        new_example["weight"] = share * cur_weight
         out.append(new_example)
     return out
 
-def process_unknowns(examples):
-    unknowable_counts: defaultdict[AttributeName, defaultdict[AttributeName, int]] = defaultdict(lambda: defaultdict(lambda: 0))
-    for example in examples:
-        example["weight"] = 1.0
-        for unknowable in unknowables:
-            if example[unknowable] != "?":
-                unknowable_counts[unknowable][example[unknowable]] += 1
-    fractionalized_examples = []
-    for example in examples:
-        fractional_examples = [example]
-        unknown = []
-        for unknowable in unknowables:
-            if example[unknowable] == "?":
-                unknown.append(unknowable)
-        while len(unknown) > 0:
-            to_adj = unknown.pop()
-            fractional_examples = [fe for example in fractional_examples for fe in make_fractional_examples(example, to_adj, unknowable_counts[to_adj])]
-        assert (sum(map(lambda e: e["weight"], fractional_examples)) - 1) < 0.0001
-        fractionalized_examples += fractional_examples
-    examples = fractionalized_examples
+def fractionalize(example, fractions: Fractions):
+    example["weight"] = 1.0
+    fractional_examples = [example]
+    unknown = [unknowable for unknowable in unknowables if example[unknowable] == "?"]
+    while len(unknown) > 0:
+        to_adj = unknown.pop()
+        fractional_examples = [fe for example in fractional_examples for fe in make_fractional_examples(example, to_adj, fractions[to_adj])]
+    assert (sum(map(lambda e: e["weight"], fractional_examples)) - 1) < 0.0001
+    return fractional_examples
+
+def process_unknowns(examples, unknowable_counts: UnknowableCounts, bucketed: bool = False):
+    fractions = make_fractions(unknowable_counts, bucketed)
+    examples = [fe for example in examples for fe in fractionalize(example, fractions)]
     weights: List[float] = list(map(lambda e: e["weight"], examples))
     return examples, weights
 
-def process_bucketing(examples, attributes=attributes, bucket=bucket):
-    # process bucketing
-    for attr_to_bucket, bucket_params in bucket.items():
-        for example in examples:
-            if bucket_params[0] == int:
-                cur_value = int(example[attr_to_bucket])
-                buckets = bucket_params[1]
-                i = 0
-                while i < len(buckets) and cur_value > buckets[i]:
-                    i += 1
-                new_value = None
-                if i == 0:
-                    new_value = f"<{buckets[0]}"
-                elif i == len(buckets):
-                    new_value = f">{buckets[i - 1]}"
-                else:
-                    lower = buckets[i-1] if i == 1 else buckets[i-1]+1
-                    upper = buckets[i]
-                    new_value = str(lower) if upper == lower else f"{lower}-{upper}"
-                assert new_value in attributes[attr_to_bucket]
-                example[attr_to_bucket] = new_value
-            elif bucket_params[0] == str:
-                cur_value = example[attr_to_bucket]
-                new_value = bucket_params[1][cur_value]
-                assert new_value in attributes[attr_to_bucket]
-                example[attr_to_bucket] = new_value
-            else:
-                assert False
-
-def process_examples(examples):
-    examples, weights = process_unknowns(examples)
+def process_examples(examples, unknowable_counts: UnknowableCounts):
+    # bucketing before the unknowns are filled in buckets each example once
+    # rather than every fractional copy
     process_bucketing(examples)
+    fractions = make_fractions(unknowable_counts, bucketed=True)
+    examples = [fe for example in examples for fe in fractionalize(example, fractions)]
+    weights: List[float] = list(map(lambda e: e["weight"], examples))
     return examples, weights
 
-def process_examples_no_combine(examples):
-    # process unknowns
-    unknowable_counts: defaultdict[AttributeName, defaultdict[AttributeName, int]] = defaultdict(lambda: defaultdict(lambda: 0))
-    for example in examples:
-        example["weight"] = 1.0
-        for unknowable in unknowables:
-            if example[unknowable] != "?":
-                unknowable_counts[unknowable][example[unknowable]] += 1
-    fractionalized_examples = []
-    for example in examples:
-        fractional_examples = [example]
-        unknown = []
-        for unknowable in unknowables:
-            if example[unknowable] == "?":
-                unknown.append(unknowable)
-        while len(unknown) > 0:
-            to_adj = unknown.pop()
-            fractional_examples = [fe for example in fractional_examples for fe in make_fractional_examples(example, to_adj, unknowable_counts[to_adj])]
-        assert (sum(map(lambda e: e["weight"], fractional_examples)) - 1) < 0.0001
-        fractionalized_examples.append((example, fractional_examples))
-    examples = fractionalized_examples
-
-    # process bucketing
-    for attr_to_bucket, bucket_params in bucket.items():
-        for original_example, fractional_examples in examples:
-            for example in fractional_examples:
-                if bucket_params[0] == int:
-                    cur_value = int(example[attr_to_bucket])
-                    buckets = bucket_params[1]
-                    i = 0
-                    while i < len(buckets) and cur_value > buckets[i]:
-                        i += 1
-                    new_value = None
-                    if i == 0:
-                        new_value = f"<{buckets[0]}"
-                    elif i == len(buckets):
-                        new_value = f">{buckets[i - 1]}"
-                    else:
-                        lower = buckets[i-1] if i == 1 else buckets[i-1]+1
-                        upper = buckets[i]
-                        new_value = str(lower) if upper == lower else f"{lower}-{upper}"
-                    assert new_value in attributes[attr_to_bucket]
-                    example[attr_to_bucket] = new_value
-                elif bucket_params[0] == str:
-                    cur_value = example[attr_to_bucket]
-                    new_value = bucket_params[1][cur_value]
-                    assert new_value in attributes[attr_to_bucket]
-                    example[attr_to_bucket] = new_value
-                else:
-                    assert False
-
-    return examples
+def process_examples_no_combine(examples, unknowable_counts: UnknowableCounts):
+    # pairs of each example and its fractional copies
+    process_bucketing(examples)
+    fractions = make_fractions(unknowable_counts, bucketed=True)
+    return [(example, fractionalize(example, fractions)) for example in examples]
+
+##################
+# Loading
 
 def load(path: str) -> Dataset:
+    train_path = os.path.join(path, "train_final.csv")
     train: List[Any] = []
-    with open(os.path.join(path, "train_final.csv"), "r") as f:
+    with open(train_path, "r") as f:
         train = list(csv.DictReader(f))
-    train, train_weights = process_examples(train)
+    train, train_weights = process_examples(train, stream_unknowable_counts(train_path))
 
+    test_path = os.path.join(path, "test_final.csv")
     test: List[Any] = []
-    with open(os.path.join(path, "test_final.csv"), "r") as f:
+    with open(test_path, "r") as f:
         test = list(csv.DictReader(f))
-    test = process_examples_no_combine(test)
+    test = process_examples_no_combine(test, stream_unknowable_counts(test_path))
 
     return Dataset(train, train_weights, test, [], set(map(lambda kv: Attribute(*kv), attributes.items())), label)
+
+def encode_bucketed(name: AttributeName, values: Sequence[str], encoding: Encoding) -> np.ndarray:
+    # straight from raw values to codes: integer values through a binary
+    # search and a table from bucket to code, other values through one dict
+    # from raw value to code
+    kind, params = bucket[name]
+    assert set(encoding.values) == attributes[name]
+    if kind == int:
+        names = bucket_names(params)
+        codes = np.array([encoding.encode(bucket_name) for bucket_name in names] + [MISSING], dtype=code_dtype(len(encoding.values)))
+        known = np.array([value != "?" for value in values], dtype=bool)
+        numbers = np.array([int(value) if value != "?" else 0 for value in values], dtype=np.int64)
+        return codes[np.where(known, bucket_indices(params, numbers), len(names))]
+    raw_codes = { raw: encoding.encode(bucket_name) for raw, bucket_name in params.items() }
+    return np.fromiter((raw_codes.get(value, MISSING) for value in values), dtype=code_dtype(len(encoding.values)), count=len(values))
+
+def load_columnar(path: str, numeric: bool = False, cache_dir: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> ColumnarDataset:
+    # with numeric, the integer columns are kept as continuous attributes
+    # instead of being bucketed. Unknown values are encoded as MISSING rather
+    # than expanded into fractional examples; grow trees with
+    # fractional_missing to share them out among the branches instead. With
+    # a cache_dir the encoded dataset is cached there. Files are read
+    # chunk_size rows at a time, so only the encoded columns are held whole.
+    paths = [os.path.join(path, filename) for filename in ("train_final.csv", "test_final.csv")]
+    return cached("income.load_columnar", paths, { "numeric": numeric }, lambda: _load_columnar(paths, numeric, chunk_size), cache_dir)
+
+def _load_columnar(paths: List[str], numeric: bool, chunk_size: int) -> ColumnarDataset:
+    numeric_names = sorted(name for name, (kind, _) in bucket.items() if kind == int) if numeric else []
+    categorical_bucket = { name: params for name, params in bucket.items() if name not in numeric_names }
+    dataset_attributes = set(Attribute(name, set() if name in numeric_names else values) for name, values in attributes.items())
+    encodings = make_encodings(A for A in dataset_attributes | set([label]) if A.name not in numeric_names)
+
+    def encode_chunk(chunk: Chunk) -> ColumnarExamples:
+        count = len(next(iter(chunk.values())))
+        examples = encode_columns({ name: values for name, values in chunk.items() if name not in categorical_bucket }, repeat(1.0), encodings, numeric_names)
+        for name in categorical_bucket.keys():
+            examples.columns[name] = encode_bucketed(name, chunk[name], encodings[name])
+        assert all(len(column) == count for column in examples.columns.values())
+        return examples
+
+    def read(path: str) -> ColumnarExamples:
+        return concatenate_examples([encode_chunk(chunk) for chunk in read_chunks(path, chunk_size=chunk_size)])
+
+    return ColumnarDataset(read(paths[0]), read(paths[1]), dataset_attributes, label, encodings)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+from dataclasses import dataclass, field
+import random
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from . import dataset as discrete
+from .continuous import AttributeName, AttributeValue, Example
+
+##################
+# Sparse Examples
+#
+# A continuous dataset whose examples are mostly zeros, such as one-hot
+# encoded discrete attributes, as a CSR (example x attribute) matrix and a
+# label array. A row is an example's nonzero attribute indices and values,
+# so the linear learners take dot products with and update only those.
+# Like an ArraySource it reads as a list of examples, with every attribute
+# present, and is shuffled and read in (X, y) chunks, here CSR matrices.
+
+# the indices and values of an example's nonzero attributes
+SparseExample = Tuple[np.ndarray, np.ndarray]
+
+@dataclass(frozen = True)
+class SparseExamples:
+    X: sparse.csr_matrix
+    y: np.ndarray
+    attributes: Tuple[AttributeName, ...]
+    label: AttributeName
+    # the column of X holding each attribute
+    attribute_columns: Dict[AttributeName, int] = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        # frozen, so the index is set past the dataclass's __setattr__
+        object.__setattr__(self, "attribute_columns", { a: i for i, a in enumerate(self.attributes) })
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def row(self, i: int) -> SparseExample:
+        span = slice(self.X.indptr[i], self.X.indptr[i + 1])
+        return self.X.indices[span], self.X.data[span]
+
+    def columns(self, attributes: Iterable[AttributeName]) -> List[int]:
+        # the columns of X holding the attributes, in their order
+        return [self.attribute_columns[a] for a in attributes]
+
+    def example(self, i: int) -> Example:
+        values = np.zeros(len(self.attributes))
+        indices, data = self.row(i)
+        values[indices] = data
+        example = dict(zip(self.attributes, values.tolist()))
+        example[self.label] = float(self.y[i])
+        return example
+
+    def __getitem__(self, i: int) -> Example:
+        return self.example(i)
+
+    def __iter__(self) -> Iterator[Example]:
+        return map(self.example, range(len(self)))
+
+    def chunks(self) -> Iterator[Tuple[sparse.csr_matrix, np.ndarray]]:
+        yield self.X, self.y
+
+    def shuffled_chunks(self, rng=random) -> Iterator[Tuple[sparse.csr_matrix, np.ndarray]]:
+        # the examples are in memory, so an epoch is one chunk in random
+        # order; rng is the random module or a random.Random
+        order = list(range(len(self)))
+        rng.shuffle(order)
+        yield self.X[order], self.y[order]
+
+    def shuffled(self, rng=random) -> Iterator[Example]:
+        order = list(range(len(self)))
+        rng.shuffle(order)
+        return map(self.example, order)
+
+def sparse_examples(
+        X, y: Iterable[float], attributes: Iterable[AttributeName], label: AttributeName
+) -> SparseExamples:
+    # X is anything scipy.sparse.csr_matrix takes, such as a dense array or
+    # a (data, indices, indptr) triple
+    X = sparse.csr_matrix(X, dtype=np.float64)
+    X.sum_duplicates()
+    return SparseExamples(X, np.asarray(y, dtype=np.float64), tuple(attributes), label)
+
+##################
+# One-Hot Encoding
+
+def one_hot_names(attributes: Iterable[discrete.Attribute]) -> List[AttributeName]:
+    # has_<attribute>_<value> for every value of every attribute, in name
+    # order so the columns are the same in every process
+    return [
+        f"has_{attribute.name}_{value}"
+        for attribute in sorted(attributes, key=lambda a: a.name)
+        for value in sorted(attribute.values)
+    ]
+
+def one_hot(
+        examples: Iterable[discrete.Example],
+        attributes: Iterable[discrete.Attribute],
+        label: AttributeName,
+        label_value: Callable[[AttributeValue], float] = float
+) -> SparseExamples:
+    # a 1.0 in the column of each attribute's value and zeros elsewhere; a
+    # value the attribute does not list is all zeros. The label is mapped
+    # by label_value, and is nan for an example without one.
+    attributes = sorted(attributes, key=lambda a: a.name)
+    names = one_hot_names(attributes)
+    # (attribute, value) to column, in the order of names
+    column: Dict[Tuple[AttributeName, AttributeValue], int] = {}
+    for attribute in attributes:
+        for value in sorted(attribute.values):
+            column[(attribute.name, value)] = len(column)
+
+    indices: List[int] = []
+    indptr = [0]
+    y: List[float] = []
+    for example in examples:
+        for attribute in attributes:
+            i: Optional[int] = column.get((attribute.name, example[attribute.name]))
+            if i is not None:
+                indices.append(i)
+        indptr.append(len(indices))
+        y.append(label_value(example[label]) if label in example else np.nan)
+
+    X = (np.ones(len(indices)), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64))
+    return sparse_examples(sparse.csr_matrix(X, shape=(len(y), len(names))), y, names, label)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import csv
+from collections import Counter
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .dataset import AttributeName
+
+##################
+# Chunked Reading
+#
+# A CSV is read a chunk of rows at a time, each chunk as one list of raw
+# strings per column, so only a chunk of rows is held at once.
+
+CHUNK_SIZE = 1 << 16
+
+Chunk = Dict[AttributeName, List[str]]
+
+def read_chunks(path: str, names: Optional[Sequence[AttributeName]] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Chunk]:
+    # without names the first row is the header. A file without rows gives
+    # one empty chunk, so a reader always sees the columns.
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        if names is None:
+            names = next(reader)
+        empty = True
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if len(rows) == 0:
+                break
+            empty = False
+            yield { name: list(column) for name, column in zip(names, zip(*rows)) }
+        if empty:
+            yield { name: [] for name in names }
+
+##################
+# Quantile Sketches
+#
+# A KLL sketch keeps a sample of a stream in levels. An item on level h
+# stands for 2^h items of the stream. When a level is over its capacity it
+# is sorted and every other item, starting at random, moves up a level. The
+# capacities shrink by 2/3 per level below the top, so the sketch holds
+# about 3k items however long the stream. Until the first compaction the
+# sketch holds every item and its quantiles are exact.
+
+SKETCH_SIZE = 1 << 16
+
+class QuantileSketch:
+    def __init__(self, k: int = SKETCH_SIZE, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.zeros(0)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def capacity(self, level: int) -> int:
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def update(self, values: Iterable[float]):
+        # NaN values are skipped
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += len(values)
+        self.compress()
+
+    def merge(self, other: 'QuantileSketch'):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0))
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self.compress()
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self.capacity(level):
+                level += 1
+                continue
+            grown = level + 1 == len(self.levels)
+            if grown:
+                self.levels.append(np.zeros(0))
+            items = np.sort(items)
+            # an odd item out stays on this level
+            even = len(items) - len(items) % 2
+            self.levels[level] = items[even:]
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], items[self.rng.integers(2):even:2]))
+            # a new top level shrinks the capacities below it
+            level = 0 if grown else level + 1
+
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def quantile(self, q: float) -> float:
+        # the least item with at least q of the weight at or below it
+        if self.exact():
+            return float(np.quantile(self.levels[0], q, method="inverted_cdf"))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        i = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[order][min(i, len(items) - 1)])
+
+    def median(self) -> float:
+        # the midpoint of the middle two items while exact, like np.median
+        if self.exact():
+            return float(np.median(self.levels[0]))
+        return self.quantile(0.5)
+
+##################
+# Streamed Statistics
+#
+# The first pass over a file for loaders that need statistics of a whole
+# column before they can encode any chunk of it.
+
+def parse_numbers(values: Sequence[str]) -> np.ndarray:
+    # values that do not parse as numbers, such as "?", are NaN
+    def parse(v: str) -> float:
+        try:
+            return float(v)
+        except ValueError:
+            return np.nan
+    return np.fromiter(map(parse, values), dtype=np.float64, count=len(values))
+
+def column_sketches(chunks: Iterable[Chunk], names: Sequence[AttributeName], k: int = SKETCH_SIZE) -> Dict[AttributeName, QuantileSketch]:
+    sketches = { name: QuantileSketch(k) for name in names }
+    for chunk in chunks:
+        for name in names:
+            sketches[name].update(parse_numbers(chunk[name]))
+    return sketches
+
+def count_values(chunks: Iterable[Chunk], names: Sequence[AttributeName], keep: Callable[[str], bool] = lambda _: True) -> Dict[AttributeName, Counter]:
+    # counts of the values of each column for which keep holds, in order of
+    # first appearance
+    counts: Dict[AttributeName, Counter] = { name: Counter() for name in names }
+    for chunk in chunks:
+        for name in names:
+            counts[name].update(filter(keep, chunk[name]))
+    return counts
@@ -9,6 +9,7 @@ from dataset.continuous import Example as ContinuousExample, evaluate
 from dataset.dataset import Example as DiscreteExample
 from dataset.income import load as load_income_dataset
 from NeuralNetwork.backpropagation import train_sgd, predict
+from models.serialization import load_network, save_network
 
 def main():
     random.seed(4242)
@@ -36,11 +37,10 @@ def main():
 
     net_w = []
     net_path = f"generated/final-ann-discrete-{T}"
-    weights_path = f"{net_path}-weights.py"
+    weights_path = f"{net_path}-weights.model"
     output_path = f"{net_path}.csv"
     if os.path.exists(weights_path):
-        with open(weights_path, "r") as f:
-            net_w = eval(f.read())
+        net_w = load_network(weights_path)
     else:
         net_w = train_sgd(
             train_continuous, ordered_attributes, dataset.label.name,
@@ -54,8 +54,7 @@ def main():
     print("train error", 1.0 - evaluate(binary_predictor, dataset.label.name, train_continuous))
 
     # save net
-    with open(weights_path, "w") as f:
-        f.write(repr(net_w))
+    save_network(weights_path, net_w)
 
     # make and save predictions
     with open(output_path, "w") as f:
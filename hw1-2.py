@@ -6,33 +6,43 @@ import os.path
 
 from dataset.dataset import evaluate
 from dataset.car import load as load_car_dataset
-from DecisionTree.decision_tree import TreeNode, LeafNode, predict
-from DecisionTree.id3 import entropy, ID3, gini_index, majority_error
+from dataset.columnar import encode_dataset
+from DecisionTree.compiled import compile_tree, decompile_tree
+from DecisionTree.decision_tree import TreeNode, LeafNode, predict, truncate
+from DecisionTree.columnar_id3 import ID3_multi
+from DecisionTree.id3 import entropy, gini_index, majority_error
+from models.serialization import load_trees, save_trees
 
 car_dataset = load_car_dataset("./data/car/")
+columnar_dataset = encode_dataset(car_dataset)
+encodings = columnar_dataset.encodings
 
 overwrite = False
 
 trees = {}
 
-for (entropy_func, func_name) in [(entropy, "entropy"), (majority_error, "me"), (gini_index, "gi")]:
-    for max_depth in [1, 2, 3, 4, 5, 6]:
-        filename = f"generated/car_id3_{func_name}_depth{max_depth}"
+max_depths = [1, 2, 3, 4, 5, 6]
 
-        if (not overwrite) and os.path.exists(filename):
-            with open(filename, "r") as f:
-                trees[filename] = eval(f.read())
-            continue
+criteria = [(entropy, "entropy"), (majority_error, "me"), (gini_index, "gi")]
 
-        tree = ID3(entropy_func, max_depth, car_dataset.train, repeat(1), car_dataset.attributes, car_dataset.label)
+# the deepest tree is trained once; shallower trees are truncations of it
+filenames = [f"generated/car_id3_{func_name}_depth{max(max_depths)}.model" for _, func_name in criteria]
 
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "w") as f:
-            f.write(repr(tree))
+if (not overwrite) and all(map(os.path.exists, filenames)):
+    deep_trees = [decompile_tree(load_trees(filename)[0][0]) for filename in filenames]
+else:
+    # all criteria are grown together, sharing work where their trees agree
+    deep_trees = ID3_multi([entropy_func for entropy_func, _ in criteria], max(max_depths), columnar_dataset.train, car_dataset.attributes, car_dataset.label, encodings)
 
-        trees[filename] = tree
+    for filename, tree in zip(filenames, deep_trees):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        save_trees(filename, [compile_tree(tree, encodings, car_dataset.label)])
         print(f"wrote {filename}")
 
+for (_, func_name), tree in zip(criteria, deep_trees):
+    for max_depth in max_depths:
+        trees[f"car_id3_{func_name}_depth{max_depth}"] = truncate(tree, max_depth)
+
 all_examples = car_dataset.train + car_dataset.test
 for name, tree in trees.items():
     predictor = lambda example: predict(tree, example)
@@ -6,8 +6,12 @@ from itertools import repeat
 from statistics import median
 
 from dataset.dataset import Attribute, Dataset, evaluate
-from DecisionTree.decision_tree import TreeNode, LeafNode, predict as predict_decisiontree
-from DecisionTree.id3 import ID3, entropy, gini_index, majority_error
+from dataset.columnar import encode_dataset
+from DecisionTree.decision_tree import TreeNode, LeafNode, predict as predict_decisiontree, truncate
+from DecisionTree.columnar_id3 import ID3_multi
+from DecisionTree.compiled import compile_tree, decompile_tree
+from DecisionTree.id3 import entropy, gini_index, majority_error
+from models.serialization import load_trees, save_trees
 
 ########
 # Config
@@ -110,32 +114,37 @@ def to_attribute(column):
 attributes = set(map(to_attribute, columns[:-1]))
 label_attribute = to_attribute(columns[-1])
 
-dataset = Dataset(train, test, attributes, label_attribute)
+dataset = Dataset(train, repeat(1), test, repeat(1), attributes, label_attribute)
+columnar_dataset = encode_dataset(dataset)
 
 ########################
 # Training and Inference
 
 trees = {}
 
-for (entropy_func, func_name) in [(entropy, "entropy"), (majority_error, "me"), (gini_index, "gi")]:
-    for max_depth in range(1, 17):
-        part = "_b" if part_b else ""
-        filename = f"generated/bank{part}_id3_{func_name}_depth{max_depth}"
+max_depths = range(1, 17)
 
-        if (not overwrite) and os.path.exists(filename):
-            with open(filename, "r") as f:
-                trees[filename] = eval(f.read())
-            continue
+criteria = [(entropy, "entropy"), (majority_error, "me"), (gini_index, "gi")]
 
-        tree = ID3(entropy_func, max_depth, dataset.train, repeat(1), dataset.attributes, dataset.label)
+# the deepest tree is trained once; shallower trees are truncations of it
+part = "_b" if part_b else ""
+filenames = [f"generated/bank{part}_id3_{func_name}_depth{max(max_depths)}.model" for _, func_name in criteria]
 
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "w") as f:
-            f.write(repr(tree))
+if (not overwrite) and all(map(os.path.exists, filenames)):
+    deep_trees = [decompile_tree(load_trees(filename)[0][0]) for filename in filenames]
+else:
+    # all criteria are grown together, sharing work where their trees agree
+    deep_trees = ID3_multi([entropy_func for entropy_func, _ in criteria], max(max_depths), columnar_dataset.train, dataset.attributes, dataset.label, columnar_dataset.encodings)
 
-        trees[filename] = tree
+    for filename, tree in zip(filenames, deep_trees):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        save_trees(filename, [compile_tree(tree, columnar_dataset.encodings, dataset.label)])
         print(f"wrote {filename}")
 
+for (_, func_name), tree in zip(criteria, deep_trees):
+    for max_depth in max_depths:
+        trees[f"bank{part}_id3_{func_name}_depth{max_depth}"] = truncate(tree, max_depth)
+
 all_examples = dataset.train + dataset.test
 for name, tree in trees.items():
     predictor = lambda example: predict_decisiontree(tree, example)
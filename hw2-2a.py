@@ -5,11 +5,14 @@ from typing import List, Tuple
 
 from dataset.bank import load as load_bank_dataset
 from dataset.dataset import Attribute, Dataset, Examples, Weights, evaluate
+from dataset.columnar import encode_dataset
 from DecisionTree.decision_tree import Node, TreeNode, LeafNode, predict as predict_decisiontree
-from DecisionTree.id3 import ID3, entropy
+from DecisionTree.columnar_id3 import ID3
+from DecisionTree.id3 import entropy
 from EnsembleLearning.adaboost import adaboost_step, predict as predict_adaboost
 
 dataset = load_bank_dataset("./data/bank")
+columnar_dataset = encode_dataset(dataset)
 
 ########################
 # Training and Inference
@@ -26,7 +29,10 @@ for T in range(1, 501):
     def find_classifier(examples: Examples, weights: Weights) -> Tuple[Node, float]:
         global sum_stump_error, num_stumps
 
-        stump = ID3(entropy, 1, examples, weights, dataset.attributes, dataset.label)
+        stump = ID3(
+            entropy, 1, columnar_dataset.train.with_weights(weights),
+            dataset.attributes, dataset.label, columnar_dataset.encodings
+        )
         error = 1 - evaluate(lambda e: predict_decisiontree(stump, e), examples, weights, dataset.label)
         assert error < 0.5
 
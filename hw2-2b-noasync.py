@@ -6,57 +6,59 @@ import os.path
 import random
 from typing import Iterable, List, Tuple
 
-from dataset.bank import load as load_bank_dataset
+import numpy as np
+
+from dataset.bank import load_columnar as load_bank_dataset
+from dataset.cache import CACHE_DIR
 from dataset.dataset import AttributeValue, Dataset, evaluate
+from dataset.columnar import ColumnarDataset, evaluate as evaluate_columnar
+from DecisionTree.compiled import NONE, CompiledTree, compile_tree, predict_batch
 from DecisionTree.decision_tree import Node, LeafNode, TreeNode, predict as predict_decisiontree
-from DecisionTree.id3 import ID3, entropy
-
-def make_classifier(dataset: Dataset):
-    bootstrap = random.choices(dataset.train, k=len(dataset.train))
-    tree = ID3(entropy, None, bootstrap, repeat(1), dataset.attributes, dataset.label)
+from DecisionTree.columnar_id3 import ID3
+from DecisionTree.id3 import entropy
+from models.serialization import load_trees, save_trees
+
+def make_classifier(dataset: ColumnarDataset):
+    # the bootstrap sample is a set of row indices into the shared training set
+    bootstrap = random.choices(range(len(dataset.train)), k=len(dataset.train))
+    tree = ID3(entropy, None, dataset.train, dataset.attributes, dataset.label, dataset.encodings, bootstrap)
     return tree
 
-save_path = "./generated/bagged-trees"
+save_path = "./generated/bagged-trees.model"
 
-def save_state(trees: List[Node]):
-    with open(save_path, "w") as f:
-        f.write(repr(trees))
+def save_state(trees: List[CompiledTree]):
+    save_trees(save_path, trees)
 
-def load_state(overwrite: bool = False) -> List[Node]:
+def load_state(overwrite: bool = False) -> List[CompiledTree]:
     if overwrite:
         return []
     if os.path.exists(save_path):
-        with open(save_path, "r") as f:
-            return eval(f.read())
+        return load_trees(save_path)[0]
     else:
         return []
 
-memo = {}
-
-def evaluate_bagged(T: int, trees: Iterable[Node], dataset: Dataset) -> Tuple[int, float, float]:
-    global memo
-    def predictor(example):
-        global memo
-        votes: defaultdict[AttributeValue, int] = defaultdict(lambda: 0)
-        for tree in trees:
-            vote = None
-            if (id(tree), id(example)) in memo:
-                vote = memo[(id(tree), id(example))]
-            else:
-                vote = predict_decisiontree(tree, example)
-                memo[(id(tree), id(example))] = vote
-            votes[vote] += 1
-        return max(votes.keys(), key=lambda k: votes[k])
-
-    train_error = 1 - evaluate(predictor, dataset.train, repeat(1), dataset.label)
-    test_error = 1 - evaluate(predictor, dataset.test, repeat(1), dataset.label)
+def evaluate_bagged(T: int, votes: Tuple[np.ndarray, np.ndarray], dataset: ColumnarDataset) -> Tuple[int, float, float]:
+    train_votes, test_votes = votes
+    train_error = 1 - evaluate_columnar(np.argmax(train_votes, axis=1), dataset.train, dataset.label)
+    test_error = 1 - evaluate_columnar(np.argmax(test_votes, axis=1), dataset.test, dataset.label)
 
     return T, train_error, test_error
 
+def add_votes(votes: np.ndarray, predictions: np.ndarray):
+    predicted = predictions != NONE
+    votes[np.flatnonzero(predicted), predictions[predicted]] += 1
+
 def main():
-    dataset = load_bank_dataset("./data/bank")
+    columnar_dataset = load_bank_dataset("./data/bank", cache_dir=CACHE_DIR)
     trees = []
 
+    # running vote counts per example, so each new tree is evaluated once
+    num_labels = len(columnar_dataset.encodings[columnar_dataset.label.name].values)
+    votes = (
+        np.zeros((len(columnar_dataset.train), num_labels)),
+        np.zeros((len(columnar_dataset.test), num_labels))
+    )
+
     print("iteration\ttrain error\ttest error")
 
     def handle_evaluation(evaluation: Tuple[int, float, float]):
@@ -65,11 +67,14 @@ def main():
 
     def handle_tree_created(tree: Node):
         trees.append(tree)
-        evaluation = evaluate_bagged(len(trees), trees, dataset)
+        compiled = compile_tree(tree, columnar_dataset.encodings, columnar_dataset.label)
+        add_votes(votes[0], predict_batch(compiled, columnar_dataset.train))
+        add_votes(votes[1], predict_batch(compiled, columnar_dataset.test))
+        evaluation = evaluate_bagged(len(trees), votes, columnar_dataset)
         handle_evaluation(evaluation)
 
     for _ in range(1, 501):
-        tree = make_classifier(dataset)
+        tree = make_classifier(columnar_dataset)
         handle_tree_created(tree)
 
 if __name__ == "__main__":
@@ -7,47 +7,44 @@ import os.path
 import random
 from typing import Iterable, List, Tuple
 
-from dataset.bank import load as load_bank_dataset
+from dataset.bank import load_columnar as load_bank_dataset
+from dataset.cache import CACHE_DIR
 from dataset.dataset import AttributeValue, Dataset, evaluate
+from dataset.columnar import ColumnarDataset, evaluate as evaluate_columnar
+from DecisionTree.compiled import CompiledTree, compile_tree, predict_forest
 from DecisionTree.decision_tree import Node, LeafNode, TreeNode, predict as predict_decisiontree
-from DecisionTree.id3 import ID3, entropy
-
-def make_classifier(dataset: Dataset):
-    bootstrap = random.choices(dataset.train, k=len(dataset.train))
-    tree = ID3(entropy, None, bootstrap, repeat(1), dataset.attributes, dataset.label)
+from DecisionTree.columnar_id3 import ID3
+from DecisionTree.id3 import entropy
+from models.serialization import load_trees, save_trees
+
+def make_classifier(dataset: ColumnarDataset):
+    # the bootstrap sample is a set of row indices into the shared training set
+    bootstrap = random.choices(range(len(dataset.train)), k=len(dataset.train))
+    tree = ID3(entropy, None, dataset.train, dataset.attributes, dataset.label, dataset.encodings, bootstrap)
     return tree
 
-save_path = "./generated/bagged-trees"
+save_path = "./generated/bagged-trees.model"
 
-def save_state(trees: List[Node]):
-    with open(save_path, "w") as f:
-        f.write(repr(trees))
+def save_state(trees: List[CompiledTree]):
+    save_trees(save_path, trees)
 
-def load_state(overwrite: bool = False) -> List[Node]:
+def load_state(overwrite: bool = False) -> List[CompiledTree]:
     if overwrite:
         return []
     if os.path.exists(save_path):
-        with open(save_path, "r") as f:
-            return eval(f.read())
+        return load_trees(save_path)[0]
     else:
         return []
 
-def evaluate_bagged(T: int, trees: Iterable[Node], dataset: Dataset) -> Tuple[int, float, float]:
-    def predictor(example):
-        votes: defaultdict[AttributeValue, int] = defaultdict(lambda: 0)
-        for tree in trees:
-            vote = predict_decisiontree(tree, example)
-            votes[vote] += 1
-        return max(votes.keys(), key=lambda k: votes[k])
-
-    train_error = 1 - evaluate(predictor, dataset.train, repeat(1), dataset.label)
-    test_error = 1 - evaluate(predictor, dataset.test, repeat(1), dataset.label)
+def evaluate_bagged(T: int, trees: List[CompiledTree], dataset: ColumnarDataset) -> Tuple[int, float, float]:
+    train_error = 1 - evaluate_columnar(predict_forest(trees, dataset.train), dataset.train, dataset.label)
+    test_error = 1 - evaluate_columnar(predict_forest(trees, dataset.test), dataset.test, dataset.label)
 
     return T, train_error, test_error
 
 def main():
     with multiprocessing.Pool() as pool:
-        dataset = load_bank_dataset("./data/bank")
+        columnar_dataset = load_bank_dataset("./data/bank", cache_dir=CACHE_DIR)
         trees = []
         waitables = []
 
@@ -61,17 +58,17 @@ def main():
             print("*** error", error)
 
         def handle_tree_created(tree: Node):
-            trees.append(tree)
+            trees.append(compile_tree(tree, columnar_dataset.encodings, columnar_dataset.label))
             print("tree created", len(trees))
             task = pool.apply_async(
-                evaluate_bagged, (len(trees), trees, dataset),
+                evaluate_bagged, (len(trees), trees, columnar_dataset),
                 callback=handle_evaluation, error_callback=handle_error
             )
             waitables.append(task)
 
         for _ in range(1, 501):
             task = pool.apply_async(
-                make_classifier, (dataset,),
+                make_classifier, (columnar_dataset,),
                 callback=handle_tree_created,
                 error_callback=handle_error
             )
@@ -2,31 +2,23 @@
 
 from dataset.concrete import load as load_concrete_dataset
 from LinearRegression.gradient_descent import bgd, compute_loss_gradient
+from LinearRegression.rate_search import search_rates
 
 def main():
     dataset = load_concrete_dataset("./data/concrete")
 
     iteration_limit = 1_000_000
-    r = 1.0
-    costs, w, bias = None, None, None
-    while True:
-        try:
-            costs, w, bias = bgd(
-                dataset.train, dataset.attributes, dataset.label,
-                r, iteration_limit
-            )
-            break
-        except Exception as e:
-            if "diverges" in str(e) or "Result too large" in str(e):
-                print("diverged with r", r)
-                r /= 2
-                continue
-            else:
-                raise e
+    rates = [1.0 / 2 ** k for k in range(16)]
+    fit, diverged = search_rates(
+        lambda r: bgd(dataset.train, dataset.attributes, dataset.label, r, iteration_limit),
+        rates
+    )
+    for r in diverged:
+        print("diverged with r", r)
 
-    print("r", r, "w", w, "bias", bias, "costs", costs)
+    print("r", fit.r, "w", fit.w, "bias", fit.bias, "costs", fit.costs)
 
-    test_cost, _, _ = compute_loss_gradient(w, bias, dataset.test, dataset.label)
+    test_cost, _, _ = compute_loss_gradient(fit.w, fit.bias, dataset.test, dataset.label)
     print("test cost", test_cost)
 
 if __name__ == "__main__":
@@ -1,36 +1,33 @@
 #!/usr/bin/env python3
 
 from dataset.concrete import load as load_concrete_dataset
-from LinearRegression.gradient_descent import sgd, compute_loss_gradient
+from LinearRegression.gradient_descent import every_cost, sgd, compute_loss_gradient
+from LinearRegression.rate_search import search_rates
 
 def main():
     dataset = load_concrete_dataset("./data/concrete")
 
     iteration_limit = 100_000
-    r = 0.125 / 8
-    costs, w, bias = None, None, None
-    while r > (1 / 1024):
-        try:
-            costs, w, bias = sgd(
-                dataset.train, dataset.attributes, dataset.label,
-                r, iteration_limit
-            )
-        except Exception as e:
-            if "diverges" in str(e) or "Result too large" in str(e):
-                print("diverged with r", r)
-                r /= 2
-                continue
-            else:
-                raise e
+    # the training cost is recorded every cost_every steps
+    cost_every = 100
+    rates = [0.125 / 8 / 2 ** k for k in range(4)]
+    fit, diverged = search_rates(
+        lambda r: sgd(
+            dataset.train, dataset.attributes, dataset.label,
+            r, iteration_limit, every_cost(dataset.train, dataset.label, cost_every)
+        ),
+        rates
+    )
+    for r in diverged:
+        print("diverged with r", r)
 
-        print("r", r, "w", w, "bias", bias)
-        print("costs tsv:")
-        for i, cost in enumerate(costs, 1):
-            print(f"{i}\t{cost}")
+    print("r", fit.r, "w", fit.w, "bias", fit.bias)
+    print("costs tsv:")
+    for i, cost in enumerate(fit.costs, 1):
+        print(f"{i * cost_every}\t{cost}")
 
-        test_cost, _, _ = compute_loss_gradient(w, bias, dataset.test, dataset.label)
-        print("test cost", test_cost)
-        r /= 2 # TODO
+    test_cost, _, _ = compute_loss_gradient(fit.w, fit.bias, dataset.test, dataset.label)
+    print("test cost", test_cost)
 
 if __name__ == "__main__":
     main()
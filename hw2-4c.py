@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 
-import numpy as np
-
 from dataset.concrete import load as load_concrete_dataset
+from LinearRegression.normal_equations import least_squares
 
 def main():
     dataset = load_concrete_dataset("./data/concrete")
@@ -17,19 +16,10 @@ def main():
         "Fine Aggr"
     ]
 
-    X = np.array(list(map(lambda e: [1.0] + [e[a] for a in sorted_attrs], dataset.train))).transpose()
-    print(X)
-    yraw = [[e[dataset.label]] for e in dataset.train]
-    print(yraw)
-    Y = np.array(yraw)
-    print(X.shape, Y.shape)
-
-    print(np.linalg.inv(np.matmul(X, X.transpose())))
-    print(np.matmul(X, Y))
-
-    wstar = np.matmul(np.linalg.inv(np.matmul(X, X.transpose())), np.matmul(X, Y))
-    wstr = "[" + " ".join(map(lambda e: f"{e[0]:.4f}", wstar[1:])) + "]"
-    print(f"w = {wstr} b = {wstar[0][0]:.4f}")
+    # solves the normal equations by Cholesky rather than inverting X Xᵀ
+    w, b = least_squares(dataset.train, dataset.attributes, dataset.label)
+    wstr = "[" + " ".join(map(lambda a: f"{w[a]:.4f}", sorted_attrs)) + "]"
+    print(f"w = {wstr} b = {b:.4f}")
 
 if __name__ == "__main__":
     main()
@@ -9,14 +9,15 @@ from Perceptron.voted_perceptron import perceptron, predict as predict_voted_per
 def main():
     random.seed(4242)
     dataset = load_bank_note_dataset("./data/bank-note")
-    weights, biases, counts = perceptron(10, 1, dataset.label, dataset.attributes, dataset.train)
+    voted = perceptron(10, 1, dataset.label, dataset.attributes, dataset.train)
 
     print("w_variance,w_skewiness,w_curtosis,w_entropy,bias,count")
-    for ws, bias, count in zip(weights, biases, counts):
-        print(",".join([*[f"{ws[a]:.2f}" for a in bank_note_attributes_ordered], f"{bias:.2f}", str(count)]))
+    columns = voted.columns(bank_note_attributes_ordered)
+    for ws, bias, count in zip(voted.weights[:, columns].tolist(), voted.biases.tolist(), voted.counts.tolist()):
+        print(",".join([*[f"{w:.2f}" for w in ws], f"{bias:.2f}", str(count)]))
 
     def predictor(example: Example):
-        return predict_voted_perceptron(weights, biases, counts, example)
+        return predict_voted_perceptron(voted, example)
     test_error = 1 - evaluate(predictor, dataset.label, dataset.test)
     print("test error", test_error)
 
@@ -2,30 +2,34 @@
 
 import csv
 
-from dataset.dataset import evaluate
-from dataset.income import load as load_income_dataset
-from DecisionTree.decision_tree import height, predict as predict_decisiontree
-from DecisionTree.id3 import ID3, entropy
+from dataset.cache import CACHE_DIR
+from dataset.columnar import evaluate
+from dataset.income import load_columnar as load_income_dataset
+from DecisionTree.compiled import compile_tree, predict_batch
+from DecisionTree.columnar_id3 import ID3_sweep
+from DecisionTree.decision_tree import height
+from DecisionTree.id3 import entropy
 
 def main():
-    dataset = load_income_dataset("./data/income")
+    dataset = load_income_dataset("./data/income", cache_dir=CACHE_DIR)
+    label_encoding = dataset.encodings[dataset.label.name]
 
-    for max_depth in [7, 13]: # I have observed depth 12 = fully expanded.
-        tree = ID3(entropy, max_depth, dataset.train, dataset.train_weights, dataset.attributes, dataset.label)
+    # unknown values are shared out among the branches instead of expanding
+    # examples into fractional copies
+    max_depths = [7, 13] # I have observed depth 12 = fully expanded.
+    trees = ID3_sweep(entropy, max_depths, dataset.train, dataset.attributes, dataset.label, dataset.encodings, fractional_missing=True)
 
-        predictor = lambda example: predict_decisiontree(tree, example)
-        train_error = 1 - evaluate(predictor, dataset.train, dataset.train_weights, dataset.label)
-        print(f"max depth {max_depth} real height {height(tree)} train error: {train_error:.2f}")
+    for max_depth in max_depths:
+        tree = trees[max_depth]
+        compiled = compile_tree(tree, dataset.encodings, dataset.label)
 
-        def test_predictor(example):
-            original_example, fractional_examples = example
-            return 1 if sum(map(lambda fe: fe["weight"] * (1 if predictor(fe) == "1" else -1), fractional_examples)) > 0 else 0
+        train_error = 1 - evaluate(predict_batch(compiled, dataset.train), dataset.train, dataset.label)
+        print(f"max depth {max_depth} real height {height(tree)} train error: {train_error:.2f}")
 
         with open(f"generated/test-prediction-{max_depth}", "w") as f:
             writer = csv.writer(f)
             writer.writerow(("ID", "Prediction"))
-            writer.writerows(map(lambda ie: (ie[0], test_predictor(ie[1])), enumerate(dataset.test, 1)))
+            writer.writerows((i, label_encoding.decode(code)) for i, code in enumerate(predict_batch(compiled, dataset.test), 1))
 
-if __name__ == "__main__": pass
 if __name__ == "__main__":
     main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import json
+import mmap
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from DecisionTree.compiled import CompiledTree
+
+##################
+# File Format
+#
+#   magic            8 bytes
+#   version          uint32, little endian
+#   header length    uint32, little endian
+#   header           JSON describing the model and the dtype, shape and
+#                    offset of every array
+#   arrays           raw little endian arrays, each aligned to ALIGNMENT
+#
+# Arrays are read straight out of a memory map, so opening a model does not
+# parse or copy them.
+
+MAGIC = b"CS6350M\0"
+# version 2 added thresholds to trees, version 3 branch fractions
+VERSION = 3
+ALIGNMENT = 64
+
+_preamble = struct.Struct("<8sII")
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_arrays(path: str, kind: str, header: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    arrays = { name: np.ascontiguousarray(a, dtype=np.asarray(a).dtype.newbyteorder("<")) for name, a in arrays.items() }
+
+    # offsets depend on the header length, which depends on the offsets
+    layout: Dict[str, Dict[str, Any]] = {}
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, a in arrays.items():
+            layout[name] = { "dtype": a.dtype.str, "shape": list(a.shape), "offset": offset }
+            offset = _align(offset + a.nbytes)
+        encoded = json.dumps({ "kind": kind, "arrays": layout, **header }).encode("utf-8")
+        if _align(_preamble.size + len(encoded)) == data_start:
+            break
+        data_start = _align(_preamble.size + len(encoded))
+
+    with open(path, "wb") as f:
+        f.write(_preamble.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for name, a in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(a.tobytes())
+
+def read_arrays(path: str, use_mmap: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    with open(path, "rb") as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    magic, version, header_length = _preamble.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a model file")
+    if version > VERSION:
+        raise ValueError(f"{path} has format version {version}, newer than supported version {VERSION}")
+
+    header = json.loads(bytes(buffer[_preamble.size:_preamble.size + header_length]).decode("utf-8"))
+    arrays = {}
+    for name, spec in header.pop("arrays").items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+    return header, arrays
+
+##################
+# Decision Trees and Ensembles
+
+def save_trees(path: str, trees: Sequence[CompiledTree], alphas: Optional[Sequence[float]] = None):
+    # every tree is stored against one shared attribute table
+    attribute_values: Dict[str, Tuple[str, ...]] = {}
+    for compiled in trees:
+        for name, values in zip(compiled.attribute_names, compiled.attribute_values):
+            assert attribute_values.setdefault(name, values) == values
+    attribute_names = sorted(attribute_values.keys())
+    feature_index = { name: i for i, name in enumerate(attribute_names) }
+    label_values = trees[0].label_values if len(trees) > 0 else ()
+
+    features = []
+    for compiled in trees:
+        assert compiled.label_values == label_values
+        tree_index = np.array([feature_index[name] for name in compiled.attribute_names] + [-1], dtype=np.int32)
+        features.append(tree_index[compiled.feature])
+
+    arrays = {
+        "node_start": np.cumsum([0] + [len(compiled.feature) for compiled in trees], dtype=np.int64),
+        "slot_start": np.cumsum([0] + [len(compiled.children) for compiled in trees], dtype=np.int64),
+        "height": np.array([compiled.height for compiled in trees], dtype=np.int32),
+        "feature": np.concatenate(features or [np.zeros(0, dtype=np.int32)]),
+        "child_offset": np.concatenate([compiled.child_offset for compiled in trees] or [np.zeros(0, dtype=np.int32)]),
+        "children": np.concatenate([compiled.children for compiled in trees] or [np.zeros(0, dtype=np.int32)]),
+        "label": np.concatenate([compiled.label for compiled in trees] or [np.zeros(0, dtype=np.int32)]),
+    }
+    if any(compiled.threshold is not None for compiled in trees):
+        arrays["threshold"] = np.concatenate([
+            compiled.threshold if compiled.threshold is not None else np.full(len(compiled.feature), np.nan)
+            for compiled in trees
+        ])
+    if any(compiled.fraction is not None for compiled in trees):
+        arrays["fraction"] = np.concatenate([
+            compiled.fraction if compiled.fraction is not None else np.full(len(compiled.children), np.nan)
+            for compiled in trees
+        ])
+    if alphas is not None:
+        arrays["alpha"] = np.asarray(alphas, dtype=np.float64)
+
+    header = {
+        "attribute_names": attribute_names,
+        "attribute_values": [attribute_values[name] for name in attribute_names],
+        "label_values": label_values,
+    }
+    write_arrays(path, "trees", header, arrays)
+
+def load_trees(path: str, use_mmap: bool = True) -> Tuple[List[CompiledTree], Optional[np.ndarray]]:
+    header, arrays = read_arrays(path, use_mmap)
+    if header["kind"] != "trees":
+        raise ValueError(f"{path} holds {header['kind']}, not trees")
+
+    attribute_names = tuple(header["attribute_names"])
+    attribute_values = tuple(map(tuple, header["attribute_values"]))
+    label_values = tuple(header["label_values"])
+
+    node_start, slot_start = arrays["node_start"], arrays["slot_start"]
+    trees = []
+    for i, height in enumerate(arrays["height"]):
+        nodes = slice(node_start[i], node_start[i + 1])
+        slots = slice(slot_start[i], slot_start[i + 1])
+        threshold = arrays["threshold"][nodes] if "threshold" in arrays else None
+        if threshold is not None and np.isnan(threshold).all():
+            threshold = None
+        fraction = arrays["fraction"][slots] if "fraction" in arrays else None
+        if fraction is not None and np.isnan(fraction).all():
+            fraction = None
+        trees.append(CompiledTree(
+            attribute_names, attribute_values, label_values,
+            arrays["feature"][nodes], arrays["child_offset"][nodes],
+            arrays["children"][slots], arrays["label"][nodes],
+            int(height), threshold, fraction
+        ))
+    return trees, arrays.get("alpha")
+
+##################
+# Neural Networks
+
+NetworkWeights = List[List[List[float]]]
+
+def save_network(path: str, w: NetworkWeights):
+    # layer l of a network from train_sgd is [[]] followed by rows of equal length
+    arrays = { f"layer{l}": np.array(layer[1:], dtype=np.float64) for l, layer in enumerate(w) if l > 0 }
+    write_arrays(path, "network", { "layers": len(w) - 1 }, arrays)
+
+def load_network(path: str, use_mmap: bool = True) -> NetworkWeights:
+    header, arrays = read_arrays(path, use_mmap)
+    if header["kind"] != "network":
+        raise ValueError(f"{path} holds {header['kind']}, not a network")
+    return [[]] + [[[]] + arrays[f"layer{l}"].tolist() for l in range(1, header["layers"] + 1)]
@@ -2,7 +2,9 @@
 
 import unittest
 
-from NeuralNetwork.backpropagation import backpropagation
+import numpy as np
+
+from NeuralNetwork.backpropagation import backpropagation, backpropagation_batch, layer_arrays
 
 class TestGradientDescent(unittest.TestCase):
     def test_compute_loss_gradient(self):
@@ -35,3 +37,21 @@ class TestGradientDescent(unittest.TestCase):
         self.assertAlmostEqual(gradient_w[3][1][0], -3.437, places=3)
         self.assertAlmostEqual(gradient_w[3][1][1], -0.06197, places=5)
         self.assertAlmostEqual(gradient_w[3][1][2], -3.375, places=3)
+
+    def test_batch(self):
+        # a hidden unit meets as many inputs as it has weights
+        w = [
+            [],
+            [[], [-1, -2], [1, 2], [0.5, -0.5]],
+            [[], [-1, -2, -3, 1], [1, 2, 3, -1], [0.5, 0.5, -0.5, 0.5]],
+            [[], [-1, 2, -1.5, 0.5]]
+        ]
+        X = [[1.0, 1.0, 0.5], [1.0, -2.0, 3.0], [1.0, 0.25, -1.0]]
+        ystar = [1.0, -1.0, 1.0]
+
+        gradients = backpropagation_batch(layer_arrays(w), np.array(X), np.array(ystar))
+
+        expected = [backpropagation(w, x, y) for x, y in zip(X, ystar)]
+        np.testing.assert_allclose(gradients[0], np.mean([np.array(g[1][1:])[:, :2] for g in expected], axis=0))
+        np.testing.assert_allclose(gradients[1], np.mean([g[2][1:] for g in expected], axis=0))
+        np.testing.assert_allclose(gradients[2], np.mean([g[3][1] for g in expected], axis=0))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import os
+import os.path
+import tempfile
+import unittest
+from itertools import repeat
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.cache import cache_key, cached, load_dataset, save_dataset
+from dataset.columnar import ColumnarDataset, encode_examples, make_encodings
+
+O = Attribute("O", set(("S", "O", "R")))
+T = Attribute("T", set())
+label = Attribute("Play?", set(("-", "+")))
+encodings = make_encodings((O, label))
+train = [
+    { "O": "S", "T": 85, "Play?": "-" },
+    { "O": "O", "T": 70, "Play?": "+" },
+    { "O": "_", "T": "?", "Play?": "+" },
+]
+test = [{ "O": "R", "T": 60 }]
+
+def make_dataset() -> ColumnarDataset:
+    return ColumnarDataset(
+        encode_examples(train, [1.0, 0.5, 2.0], encodings, ["T"]),
+        encode_examples(test, repeat(1.0), encodings, ["T"]),
+        set((O, T)), label, encodings
+    )
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def assertSameDataset(self, a: ColumnarDataset, b: ColumnarDataset):
+        self.assertEqual(a.attributes, b.attributes)
+        self.assertEqual(a.label, b.label)
+        self.assertEqual(a.encodings, b.encodings)
+        for part in ("train", "test"):
+            x, y = getattr(a, part), getattr(b, part)
+            self.assertEqual(x.columns.keys(), y.columns.keys())
+            for name in x.columns:
+                self.assertEqual(x.columns[name].dtype, y.columns[name].dtype)
+                self.assertEqual(x.columns[name].tolist(), y.columns[name].tolist())
+            for name in x.numeric:
+                np.testing.assert_array_equal(x.numeric[name], y.numeric[name])
+            self.assertEqual(x.weights.tolist(), y.weights.tolist())
+
+    def test_round_trip(self):
+        entry = os.path.join(self.directory.name, "entry")
+        save_dataset(entry, make_dataset())
+        loaded = load_dataset(entry)
+
+        self.assertSameDataset(loaded, make_dataset())
+        self.assertEqual(loaded.encodings["O"].encode("R"), encodings["O"].encode("R"))
+        self.assertFalse(loaded.train.weights.flags.writeable)
+
+    def test_key(self):
+        source = os.path.join(self.directory.name, "source.csv")
+        with open(source, "w") as f:
+            f.write("a,b\n")
+        key = cache_key("loader", [source], { "numeric": False })
+
+        self.assertEqual(cache_key("loader", [source], { "numeric": False }), key)
+        self.assertNotEqual(cache_key("loader", [source], { "numeric": True }), key)
+        self.assertNotEqual(cache_key("other", [source], { "numeric": False }), key)
+        with open(source, "a") as f:
+            f.write("c,d\n")
+        self.assertNotEqual(cache_key("loader", [source], { "numeric": False }), key)
+
+    def test_cached(self):
+        source = os.path.join(self.directory.name, "source.csv")
+        with open(source, "w") as f:
+            f.write("a,b\n")
+        cache_dir = os.path.join(self.directory.name, "cache")
+        builds = []
+        def build() -> ColumnarDataset:
+            builds.append(1)
+            return make_dataset()
+
+        first = cached("loader", [source], {}, build, cache_dir)
+        second = cached("loader", [source], {}, build, cache_dir)
+
+        self.assertEqual(len(builds), 1)
+        self.assertSameDataset(first, make_dataset())
+        self.assertSameDataset(second, make_dataset())
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        cached("loader", [source], {}, build, None)
+        self.assertEqual(len(builds), 2)
+
+if __name__ == "__main__":
+    unittest.main()
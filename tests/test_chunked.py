@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import os.path
+import random
+import tempfile
+import unittest
+
+from dataset.chunked import csv_source, examples_source, open_source, write_source
+from LinearRegression.gradient_descent import bgd
+from Perceptron.perceptron import perceptron, predict
+
+examples = [
+    { "x1":  1.0, "x2": -1.0, "y": 0.0 },
+    { "x1":  2.0, "x2":  1.0, "y": 1.0 },
+    { "x1": -1.0, "x2":  2.0, "y": 0.0 },
+    { "x1":  3.0, "x2": -2.0, "y": 1.0 },
+    { "x1": -2.0, "x2": -1.0, "y": 0.0 },
+    { "x1":  1.5, "x2":  0.5, "y": 1.0 },
+    { "x1":  0.5, "x2":  2.5, "y": 0.0 },
+]
+
+class TestArraySource(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_csv_source(self):
+        path = os.path.join(self.directory.name, "data.csv")
+        with open(path, "w") as f:
+            f.writelines(f"{e['x1']},{e['x2']},{e['y']}\n" for e in examples)
+        source = csv_source(path, os.path.join(self.directory.name, "source"), ["x1", "x2", "y"], ["x1", "x2"], "y", chunk_size=3)
+
+        self.assertEqual(len(source), len(examples))
+        self.assertEqual(list(source), examples)
+        self.assertEqual(source[3], examples[3])
+        self.assertEqual(list(open_source(os.path.join(self.directory.name, "source"))), examples)
+
+    def test_empty_source(self):
+        directory = os.path.join(self.directory.name, "empty")
+        write_source(directory, [], ["x1", "x2"], "y")
+        self.assertEqual(list(open_source(directory)), [])
+
+    def test_shuffled(self):
+        source = examples_source(examples, ["x1", "x2"], "y", chunk_size=2)
+        first = list(source.shuffled(random.Random(1)))
+        again = list(source.shuffled(random.Random(1)))
+
+        self.assertEqual(first, again)
+        self.assertCountEqual(first, examples)
+
+    def test_bgd_matches_list(self):
+        data = [{ "x1": e["x1"], "x2": e["x2"], "y": e["x1"] + 2 * e["x2"] } for e in examples]
+        source = examples_source(data, ["x1", "x2"], "y", chunk_size=3)
+
+        # chunks are summed separately, so the results agree to rounding
+        source_costs, source_w, source_b = bgd(source, set(("x1", "x2")), "y", 0.01, 10000)
+        costs, w, b = bgd(data, set(("x1", "x2")), "y", 0.01, 10000)
+        self.assertEqual(len(source_costs), len(costs))
+        for k in w.keys():
+            self.assertAlmostEqual(source_w[k], w[k], places=9)
+        self.assertAlmostEqual(source_b, b, places=9)
+
+    def test_perceptron(self):
+        source = examples_source(examples, ["x1", "x2"], "y", chunk_size=2)
+        random.seed(4242)
+        weights, bias = perceptron(100, 1, "y", set(("x1", "x2")), source)
+
+        self.assertEqual([predict(weights, bias, e) for e in source], [e["y"] for e in examples])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import unittest
+from itertools import repeat
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.columnar import MISSING, decode_example, encode_examples, make_encodings, most_common_label_code
+
+O = Attribute("O", set(("S", "O", "R")))
+W = Attribute("W", set(("S", "W")))
+label = Attribute("Play?", set(("-", "+")))
+encodings = make_encodings((O, W, label))
+examples = [
+    { "O": "S", "W": "W", "Play?": "-" },
+    { "O": "S", "W": "S", "Play?": "-" },
+    { "O": "O", "W": "W", "Play?": "+" },
+    { "O": "R", "W": "W", "Play?": "+" },
+    { "O": "_", "W": "S", "Play?": "+" },
+]
+
+class TestColumnarExamples(unittest.TestCase):
+    def test_encode_decode(self):
+        columnar = encode_examples(examples, repeat(1), encodings)
+
+        self.assertEqual(len(columnar), len(examples))
+        self.assertEqual(columnar.columns["O"].dtype, np.int8)
+        self.assertEqual(list(columnar.weights), [1.0] * len(examples))
+
+        for i, example in enumerate(examples[:-1]):
+            self.assertEqual(decode_example(columnar, encodings, i), example)
+
+        # values outside of the attribute are missing
+        self.assertEqual(columnar.columns["O"][-1], MISSING)
+        self.assertEqual(decode_example(columnar, encodings, 4), { "W": "S", "Play?": "+" })
+
+    def test_take_and_weights(self):
+        columnar = encode_examples(examples, [1, 1, 1, 1, 0.5], encodings)
+
+        self.assertEqual(encodings["Play?"].decode(most_common_label_code(columnar, encodings["Play?"])), "+")
+
+        subset = columnar.take(np.array([0, 1, 4])).with_weights([1, 1, 3])
+        self.assertEqual(len(subset), 3)
+        self.assertEqual(list(subset.weights), [1.0, 1.0, 3.0])
+        self.assertEqual(encodings["Play?"].decode(most_common_label_code(subset, encodings["Play?"])), "+")
+
+if __name__ == "__main__":
+    unittest.main()
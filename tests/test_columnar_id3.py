@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+from itertools import repeat
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.columnar import ColumnarExamples, encode_examples, make_encodings
+from DecisionTree.decision_tree import LeafNode, ThresholdNode, TreeNode, predict
+from DecisionTree import columnar_id3, id3, impurity
+
+O = Attribute("O", set(("S", "O", "R")))
+T = Attribute("T", set(("H", "M", "C")))
+H = Attribute("H", set(("H", "N", "L")))
+W = Attribute("W", set(("S", "W")))
+attributes = set((O, T, H, W))
+label = Attribute("Play?", set(("-", "+")))
+encodings = make_encodings(attributes | set([label]))
+raw_examples = [
+    { "O": "S", "T": "H", "H": "H", "W": "W", "Play?": "-" },
+    { "O": "S", "T": "H", "H": "H", "W": "S", "Play?": "-" },
+    { "O": "O", "T": "H", "H": "H", "W": "W", "Play?": "+" },
+    { "O": "R", "T": "M", "H": "H", "W": "W", "Play?": "+" },
+    { "O": "R", "T": "C", "H": "N", "W": "W", "Play?": "+" },
+    { "O": "R", "T": "C", "H": "N", "W": "S", "Play?": "-" },
+    { "O": "O", "T": "C", "H": "N", "W": "S", "Play?": "+" },
+    { "O": "S", "T": "M", "H": "H", "W": "W", "Play?": "-" },
+    { "O": "S", "T": "C", "H": "N", "W": "W", "Play?": "+" },
+    { "O": "R", "T": "M", "H": "N", "W": "W", "Play?": "+" },
+    { "O": "S", "T": "M", "H": "N", "W": "S", "Play?": "+" },
+    { "O": "O", "T": "M", "H": "H", "W": "S", "Play?": "+" },
+    { "O": "O", "T": "H", "H": "N", "W": "W", "Play?": "+" },
+    { "O": "R", "T": "M", "H": "H", "W": "S", "Play?": "-" },
+]
+examples = encode_examples(raw_examples, repeat(1), encodings)
+
+class TestColumnarID3(unittest.TestCase):
+    def test_impurity_of_counts(self):
+        self.assertAlmostEqual(float(impurity.entropy([9.0, 5.0])), 0.940, places=3)
+        self.assertAlmostEqual(float(impurity.majority_error([9.0, 5.0])), 5/14, places=6)
+        self.assertAlmostEqual(float(impurity.gini_index([9.0, 5.0])), 0.459, places=3)
+        self.assertEqual(float(impurity.entropy([0.0, 0.0])), 0.0)
+
+    def test_gains_match_id3(self):
+        weights = [1.0 for _ in raw_examples]
+        for entropy_func in (id3.entropy, id3.majority_error, id3.gini_index):
+            with self.subTest(entropy_func=entropy_func.__name__):
+                expected = id3.attribute_gains(entropy_func, raw_examples, weights, attributes, label)
+                gains = columnar_id3.attribute_gains(entropy_func, examples, attributes, label, encodings)
+                for A in attributes:
+                    self.assertAlmostEqual(gains[A], expected[A], places=9)
+
+    def test_id3_full_depth(self):
+        tree = columnar_id3.ID3(id3.entropy, None, examples, attributes, label, encodings)
+
+        assert isinstance(tree, TreeNode)
+        self.assertEqual(tree.attribute_name, O.name)
+
+        childS, childO, childR = tree.children["S"], tree.children["O"], tree.children["R"]
+        assert isinstance(childS, TreeNode)
+        assert isinstance(childO, LeafNode)
+        assert isinstance(childR, TreeNode)
+        self.assertEqual(childS.attribute_name, H.name)
+        self.assertEqual(childO.label, "+")
+        self.assertEqual(childR.attribute_name, W.name)
+
+        # no training example has H=L, so it falls back to the most common label
+        self.assertEqual(childS.children["L"], LeafNode("-"))
+        self.assertEqual(childR.children["S"], LeafNode("-"))
+        self.assertEqual(childR.children["W"], LeafNode("+"))
+
+    def test_id3_indices_match_copies(self):
+        bootstrap = [0, 0, 2, 3, 5, 5, 5, 7, 8, 9, 10, 11, 13, 13]
+        copies = encode_examples([raw_examples[i] for i in bootstrap], repeat(1), encodings)
+        for max_depth in (1, 2, None):
+            with self.subTest(max_depth=max_depth):
+                self.assertEqual(
+                    columnar_id3.ID3(id3.entropy, max_depth, examples, attributes, label, encodings, bootstrap),
+                    columnar_id3.ID3(id3.entropy, max_depth, copies, attributes, label, encodings)
+                )
+
+    def test_id3_sweep_matches_separate_training(self):
+        weights = [1.0 for _ in raw_examples]
+        dict_trees = id3.ID3_sweep(id3.entropy, range(0, 4), raw_examples, weights, attributes, label)
+        columnar_trees = columnar_id3.ID3_sweep(id3.entropy, range(0, 4), examples, attributes, label, encodings)
+        deepest = columnar_id3.ID3(id3.entropy, 3, examples, attributes, label, encodings)
+        for max_depth in range(0, 4):
+            with self.subTest(max_depth=max_depth):
+                self.assertEqual(dict_trees[max_depth], id3.ID3(id3.entropy, max_depth, raw_examples, weights, attributes, label))
+                tree = columnar_id3.ID3(id3.entropy, max_depth, examples, attributes, label, encodings)
+                self.assertEqual(columnar_trees[max_depth], tree)
+                for example in raw_examples:
+                    self.assertEqual(predict(deepest, example, max_depth=max_depth), predict(tree, example))
+
+    def test_id3_records_most_common_label(self):
+        tree = columnar_id3.ID3(id3.entropy, None, examples, attributes, label, encodings)
+        assert isinstance(tree, TreeNode)
+        self.assertEqual(tree.label, "+")
+        self.assertEqual(tree.children["S"].label, "-")
+
+    def test_id3_weighted_stump(self):
+        weights = [1.0 for _ in raw_examples]
+        weights[0] = 100.0
+        tree = columnar_id3.ID3(id3.entropy, 0, examples.with_weights(weights), attributes, label, encodings)
+        self.assertEqual(tree, LeafNode("-"))
+
+    def test_legacy_impurity_adapters(self):
+        weights = [1.0 for _ in raw_examples]
+        self.assertAlmostEqual(id3.entropy(raw_examples, weights, label.name), 0.940, places=3)
+        self.assertAlmostEqual(id3.majority_error(raw_examples, weights, label.name), 5/14, places=6)
+        self.assertAlmostEqual(id3.gini_index(raw_examples, weights, label.name), 0.459, places=3)
+        self.assertIs(columnar_id3.count_impurity(id3.gini_index), impurity.gini_index)
+        self.assertIs(columnar_id3.count_impurity(impurity.gini_index), impurity.gini_index)
+
+    def test_id3_multi_matches_separate_training(self):
+        criteria = [id3.entropy, id3.majority_error, id3.gini_index]
+        weights = [1.0 for _ in raw_examples]
+        weights[3] = 4.0
+        weighted = examples.with_weights(weights)
+        for max_depth in (1, 2, None):
+            with self.subTest(max_depth=max_depth):
+                trees = columnar_id3.ID3_multi(criteria, max_depth, weighted, attributes, label, encodings)
+                self.assertEqual(len(trees), len(criteria))
+                for entropy_func, tree in zip(criteria, trees):
+                    self.assertEqual(tree, columnar_id3.ID3(entropy_func, max_depth, weighted, attributes, label, encodings))
+
+class TestThresholdSplits(unittest.TestCase):
+    def setUp(self):
+        self.label_encodings = make_encodings([label])
+
+    def numeric_examples(self, values, labels, weights=None):
+        return ColumnarExamples(
+            { label.name: np.array([self.label_encodings[label.name].encode(l) for l in labels], dtype=np.int8) },
+            np.ones(len(labels)) if weights is None else np.asarray(weights, dtype=np.float64),
+            { name: np.asarray(v, dtype=np.float64) for name, v in values.items() }
+        )
+
+    def test_threshold_tables_match_brute_force(self):
+        rng = random.Random(0)
+        values = [
+            np.array([rng.choice([np.nan] + list(range(40))) for _ in range(200)]),
+            np.array([rng.uniform(0, 1) for _ in range(200)]),
+        ]
+        labels = np.array([rng.randrange(2) for _ in range(200)])
+        weights = np.array([rng.uniform(0.5, 2) for _ in range(200)])
+        ranks, distinct, _, offsets = columnar_id3.rank_matrix(values, 200)
+
+        # small subsets sort their ranks, large ones count every value
+        for size in (3, 10, 200):
+            rows = np.array(rng.sample(range(200), size))
+            attribute, split_ranks, tables = columnar_id3.threshold_tables(ranks[rows], labels[rows], weights[rows], offsets, 2)
+            expected = []
+            for j, v in enumerate(values):
+                present = np.unique(v[rows][~np.isnan(v[rows])])
+                for lower, upper in zip(present[:-1], present[1:]):
+                    known = ~np.isnan(v[rows])
+                    below = known & (v[rows] <= lower)
+                    above = known & (v[rows] >= upper)
+                    expected.append((j, lower, upper,
+                        np.bincount(labels[rows][below], weights=weights[rows][below], minlength=2),
+                        np.bincount(labels[rows][above], weights=weights[rows][above], minlength=2)))
+            with self.subTest(size=size):
+                self.assertEqual(len(attribute), len(expected))
+                for k, (j, lower, upper, below, above) in enumerate(expected):
+                    self.assertEqual(attribute[k], j)
+                    self.assertEqual(tuple(distinct[split_ranks[:, k]]), (lower, upper))
+                    np.testing.assert_allclose(tables[k], [below, above])
+
+    def test_id3_threshold_between_values(self):
+        examples = self.numeric_examples({ "x": [1, 2, 3, 4, 10, 12] }, ["-", "-", "-", "-", "+", "+"])
+        tree = columnar_id3.ID3(id3.entropy, None, examples, set([Attribute("x", set())]), label, self.label_encodings)
+        self.assertEqual(tree, ThresholdNode("x", 7.0, LeafNode("-"), LeafNode("+"), label="-"))
+
+    def test_id3_splits_numeric_attribute_again(self):
+        # + only inside [3, 6), which needs two thresholds on x
+        x = [1, 2, 3, 4, 5, 6, 7, 8]
+        examples = self.numeric_examples({ "x": x }, ["+" if 3 <= v < 6 else "-" for v in x])
+        tree = columnar_id3.ID3(id3.entropy, None, examples, set([Attribute("x", set())]), label, self.label_encodings)
+        for v in x:
+            self.assertEqual(predict(tree, { "x": v }), "+" if 3 <= v < 6 else "-")
+        self.assertIsInstance(tree, ThresholdNode)
+
+    def test_id3_mixed_attributes(self):
+        # a continuous attribute alongside the categorical ones
+        raw = [dict(e, t=str(i % 5)) for i, e in enumerate(raw_examples)]
+        columns = encode_examples(raw, repeat(1), encodings, ["t"])
+        mixed = attributes | set([Attribute("t", set())])
+        tree = columnar_id3.ID3(id3.entropy, None, columns, mixed, label, encodings)
+        for example in raw:
+            self.assertEqual(predict(tree, example), example["Play?"])
+
+    def test_id3_missing_values_are_not_split(self):
+        examples = self.numeric_examples({ "x": [1, 2, np.nan, 3, 4] }, ["-", "-", "+", "+", "+"])
+        tree = columnar_id3.ID3(id3.entropy, None, examples, set([Attribute("x", set())]), label, self.label_encodings)
+        self.assertEqual(tree, ThresholdNode("x", 2.5, LeafNode("-"), LeafNode("+"), label="+"))
+
+    def test_id3_constant_numeric_attribute(self):
+        examples = self.numeric_examples({ "x": [1, 1, 1] }, ["-", "+", "+"])
+        tree = columnar_id3.ID3(id3.entropy, None, examples, set([Attribute("x", set())]), label, self.label_encodings)
+        self.assertEqual(tree, LeafNode("+"))
+
+    def test_id3_multi_with_thresholds(self):
+        rng = random.Random(1)
+        x = [rng.randrange(20) for _ in range(60)]
+        y = [rng.uniform(0, 1) for _ in range(60)]
+        labels = ["+" if (a > 8) != (b > 0.6) or rng.random() < 0.1 else "-" for a, b in zip(x, y)]
+        examples = self.numeric_examples({ "x": x, "y": y }, labels)
+        numeric = set([Attribute("x", set()), Attribute("y", set())])
+        criteria = [id3.entropy, id3.majority_error, id3.gini_index]
+        trees = columnar_id3.ID3_multi(criteria, 4, examples, numeric, label, self.label_encodings)
+        for entropy_func, tree in zip(criteria, trees):
+            self.assertEqual(tree, columnar_id3.ID3(entropy_func, 4, examples, numeric, label, self.label_encodings))
+
+class TestGrowth(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.raw = [dict(e, t=str(rng.randrange(30))) for e in raw_examples * 10]
+        for e in self.raw:
+            e["Play?"] = "+" if (float(e["t"]) > 12) != (e["O"] == "S") or rng.random() < 0.2 else "-"
+        self.columns = encode_examples(self.raw, repeat(1), encodings, ["t"])
+        self.attributes = attributes | set([Attribute("t", set())])
+
+    def leaves(self, tree):
+        if isinstance(tree, LeafNode):
+            return 1
+        elif isinstance(tree, ThresholdNode):
+            return self.leaves(tree.below) + self.leaves(tree.above)
+        return sum(map(self.leaves, tree.children.values()))
+
+    def test_best_first_without_budget_matches_depth_first(self):
+        tree = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings)
+        self.assertEqual(columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, best_first=True), tree)
+
+    def test_max_leaves(self):
+        full = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings)
+        for best_first in (False, True):
+            for max_leaves in (1, 2, 5, 12):
+                with self.subTest(best_first=best_first, max_leaves=max_leaves):
+                    tree = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, max_leaves=max_leaves, best_first=best_first)
+                    self.assertLessEqual(self.leaves(tree), max_leaves)
+                    self.assertLessEqual(self.leaves(tree), self.leaves(full))
+
+    def test_best_first_spends_leaves_on_larger_gains(self):
+        errors = lambda tree: sum(predict(tree, e) != e["Play?"] for e in self.raw)
+        depth_first = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, max_leaves=8)
+        best_first = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, max_leaves=8, best_first=True)
+        self.assertLess(errors(best_first), errors(depth_first))
+
+class TestFractionalMissing(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        self.raw = [dict(e, t=str(rng.randrange(30))) for e in raw_examples * 10]
+        for e in self.raw:
+            e["Play?"] = "+" if (float(e["t"]) > 12) != (e["O"] == "S") or rng.random() < 0.2 else "-"
+            for name in ("O", "H", "t"):
+                if rng.random() < 0.15:
+                    del e[name]
+        self.columns = encode_examples(self.raw, repeat(1), encodings, ["t"])
+        self.attributes = attributes | set([Attribute("t", set())])
+
+    def test_root_matches_fractional_examples(self):
+        # at the root, sharing out the rows missing a categorical value is the
+        # same as expanding them into copies weighted by the known values
+        known = [e for e in self.raw if "O" in e]
+        counts = { v: sum(1 for e in known if e["O"] == v) for v in O.values }
+        expanded, weights = [], []
+        for e in self.raw:
+            for v in (O.values if "O" not in e else [e["O"]]):
+                expanded.append(dict(e, O=v))
+                weights.append(1.0 if "O" in e else counts[v] / len(known))
+        expanded_columns = encode_examples(expanded, weights, encodings)
+        for entropy_func in (id3.entropy, id3.majority_error, id3.gini_index):
+            with self.subTest(entropy_func=entropy_func.__name__):
+                tree = columnar_id3.ID3(entropy_func, 1, self.columns, set([O, W]), label, encodings, fractional_missing=True)
+                expected = columnar_id3.ID3(entropy_func, 1, expanded_columns, set([O, W]), label, encodings)
+                self.assertEqual(tree.attribute_name, expected.attribute_name)
+                self.assertEqual({ v: child.label for v, child in tree.children.items() }, { v: child.label for v, child in expected.children.items() })
+        tree = columnar_id3.ID3(id3.entropy, 1, self.columns, set([O]), label, encodings, fractional_missing=True)
+        self.assertEqual(tree.fractions, { v: counts[v] / len(known) for v in counts })
+
+    def test_builders_agree(self):
+        tree = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, fractional_missing=True)
+        self.assertIsNotNone(tree.fractions if isinstance(tree, TreeNode) else tree.below_fraction)
+        multi = columnar_id3.ID3_multi([id3.entropy, id3.gini_index], None, self.columns, self.attributes, label, encodings, fractional_missing=True)
+        self.assertEqual(multi[0], tree)
+        self.assertEqual(multi[1], columnar_id3.ID3(id3.gini_index, None, self.columns, self.attributes, label, encodings, fractional_missing=True))
+
+    def test_multi_splits_in_different_orders(self):
+        # the criteria reach the same conditions in different orders, which
+        # share out the rows missing the split attributes differently
+        attrs = [Attribute(name, set("abc")) for name in "ABCD"]
+        coin = Attribute("y", set("+-"))
+        coin_encodings = make_encodings(set(attrs) | set([coin]))
+        criteria = [id3.entropy, id3.majority_error, id3.gini_index]
+        for seed in (16, 38):
+            rng = random.Random(seed)
+            raw = []
+            for _ in range(60):
+                e = { a.name: rng.choice("abc") for a in attrs }
+                e["y"] = rng.choice("+-")
+                raw.append({ k: v for k, v in e.items() if k == "y" or rng.random() >= 0.2 })
+            columns = encode_examples(raw, repeat(1), coin_encodings)
+            trees = columnar_id3.ID3_multi(criteria, None, columns, set(attrs), coin, coin_encodings, fractional_missing=True)
+            for entropy_func, tree in zip(criteria, trees):
+                with self.subTest(seed=seed, entropy_func=entropy_func.__name__):
+                    self.assertEqual(tree, columnar_id3.ID3(entropy_func, None, columns, set(attrs), coin, coin_encodings, fractional_missing=True))
+
+    def test_subtracted_histograms(self):
+        # rows missing the split's attribute are in every branch's histogram
+        splitter = columnar_id3._Splitter(self.columns, self.attributes, label, encodings, max_bins=len(self.raw), fractional_missing=True)
+        rows = np.arange(len(self.columns))
+        weights, histogram, candidates = splitter.root(rows)
+        for a in (splitter.names.index("O"), splitter.names.index("t")):
+            split = (a, None if splitter.names[a] != "t" else 12.5)
+            branch_rows, branch_weights, branch_histograms, fractions, remaining = splitter.split(rows, weights, histogram, candidates, split)
+            self.assertAlmostEqual(sum(fractions), 1.0)
+            for rows_b, weights_b, histogram_b in zip(branch_rows, branch_weights, branch_histograms):
+                binned = splitter.stats(rows_b, weights_b, histogram_b, remaining)
+                exact = splitter.stats(rows_b, weights_b, None, remaining)
+                np.testing.assert_allclose(binned[0], exact[0], atol=1e-9)
+                np.testing.assert_allclose(binned[1][2], exact[1][2], atol=1e-9)
+                np.testing.assert_allclose(binned[2], exact[2], atol=1e-9)
+
+    def test_missing_rows_reach_every_branch(self):
+        tree = columnar_id3.ID3(id3.entropy, None, self.columns, self.attributes, label, encodings, fractional_missing=True)
+        for example in self.raw:
+            self.assertIn(predict(tree, example), ("+", "-"))
+
+class TestHistogramSplits(unittest.TestCase):
+    def setUp(self):
+        self.label_encodings = make_encodings([label])
+
+    def test_enough_bins_match_exact(self):
+        # with a bin per value the only difference is subtracting histograms
+        rng = random.Random(2)
+        raw = [dict(e, t=str(rng.randrange(30)), u=str(rng.uniform(0, 1) if rng.random() < 0.9 else "?")) for e in raw_examples * 20]
+        for e in raw:
+            e["Play?"] = "+" if (float(e["t"]) > 12) != (e["O"] == "S") or rng.random() < 0.2 else "-"
+        columns = encode_examples(raw, repeat(1), encodings, ["t", "u"])
+        mixed = attributes | set([Attribute("t", set()), Attribute("u", set())])
+        for entropy_func in (id3.entropy, id3.majority_error, id3.gini_index):
+            with self.subTest(entropy_func=entropy_func.__name__):
+                exact = columnar_id3.ID3(entropy_func, 6, columns, mixed, label, encodings)
+                self.assertEqual(columnar_id3.ID3(entropy_func, 6, columns, mixed, label, encodings, max_bins=len(raw)), exact)
+                self.assertEqual(columnar_id3.ID3_multi([entropy_func], 6, columns, mixed, label, encodings, max_bins=len(raw))[0], exact)
+
+    def test_categorical_only(self):
+        # without continuous attributes the rank histograms are empty
+        for entropy_func in (id3.entropy, id3.majority_error, id3.gini_index):
+            with self.subTest(entropy_func=entropy_func.__name__):
+                exact = columnar_id3.ID3(entropy_func, None, examples, attributes, label, encodings)
+                self.assertEqual(columnar_id3.ID3(entropy_func, None, examples, attributes, label, encodings, max_bins=16), exact)
+
+    def test_bins_bound_thresholds(self):
+        x = np.arange(100, dtype=np.float64)
+        examples = ColumnarExamples(
+            { label.name: (x % 7 < 3).astype(np.int8) },
+            np.ones(100),
+            { "x": x }
+        )
+        tree = columnar_id3.ID3(id3.entropy, 1, examples, set([Attribute("x", set())]), label, self.label_encodings, max_bins=4)
+        self.assertIsInstance(tree, ThresholdNode)
+        self.assertIn(tree.threshold, [24.5, 49.5, 74.5])
+
+    def test_rank_matrix_bins(self):
+        values = [np.array([5.0, 1.0, np.nan, 3.0, 2.0, 4.0, 6.0, 7.0])]
+        ranks, lows, highs, offsets = columnar_id3.rank_matrix(values, 8, max_bins=2)
+        self.assertEqual(list(offsets), [0, 2])
+        self.assertEqual(list(lows), [1.0, 5.0])
+        self.assertEqual(list(highs), [4.0, 7.0])
+        self.assertEqual(list(ranks[:, 0]), [1, 0, 2, 0, 0, 0, 1, 1])
+
+if __name__ == "__main__":
+    unittest.main()
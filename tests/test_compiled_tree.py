@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import unittest
+from itertools import repeat
+
+from dataset.dataset import Attribute
+from dataset.columnar import encode_examples, make_encodings
+from DecisionTree.compiled import NONE, compile_tree, decompile_tree, predict_batch, predict_forest
+from DecisionTree.decision_tree import LeafNode, ThresholdNode, TreeNode, predict, truncate
+
+O = Attribute("O", set(("S", "O", "R")))
+H = Attribute("H", set(("H", "N", "L")))
+W = Attribute("W", set(("S", "W")))
+label = Attribute("Play?", set(("-", "+")))
+encodings = make_encodings((O, H, W, label))
+
+tree = TreeNode("O", {
+    "S": TreeNode("H", { "H": LeafNode("-"), "N": LeafNode("+"), "L": LeafNode("-") }),
+    "O": LeafNode("+"),
+    "R": TreeNode("W", { "S": LeafNode("-"), "W": LeafNode("+") }),
+})
+
+raw_examples = [
+    { "O": o, "H": h, "W": w }
+    for o in ("S", "O", "R") for h in ("H", "N", "L") for w in ("S", "W")
+]
+examples = encode_examples(raw_examples, repeat(1), encodings)
+
+class TestCompiledTree(unittest.TestCase):
+    def test_layout(self):
+        compiled = compile_tree(tree, encodings, label)
+
+        self.assertEqual(len(compiled), 9)
+        self.assertEqual(compiled.height, 2)
+        self.assertEqual(compiled.attribute_names, ("H", "O", "W"))
+        self.assertEqual(compiled.label_values, encodings[label.name].values)
+        self.assertEqual(compiled.feature[0], compiled.attribute_names.index("O"))
+        self.assertEqual(compiled.label[0], NONE)
+
+    def test_predict_batch_matches_predict(self):
+        compiled = compile_tree(tree, encodings, label)
+        predictions = predict_batch(compiled, examples)
+        for example, code in zip(raw_examples, predictions):
+            self.assertEqual(encodings[label.name].decode(code), predict(tree, example))
+
+    def test_predict_batch_leaf(self):
+        compiled = compile_tree(LeafNode("+"), encodings, label)
+        self.assertEqual(set(predict_batch(compiled, examples)), set([encodings[label.name].encode("+")]))
+
+    def test_predict_batch_missing_value(self):
+        missing = encode_examples([{ "O": "S", "W": "W" }, { "O": "R", "W": "W" }], repeat(1), encodings)
+        compiled = compile_tree(tree, encodings, label)
+        self.assertEqual(list(predict_batch(compiled, missing)), [NONE, encodings[label.name].encode("+")])
+
+    def test_predict_batch_max_depth(self):
+        labelled = TreeNode("O", dict(tree.children), label="+")
+        labelled.children["S"] = TreeNode("H", dict(tree.children["S"].children), label="-")
+        labelled.children["R"] = TreeNode("W", dict(tree.children["R"].children), label="+")
+        compiled = compile_tree(labelled, encodings, label)
+        for max_depth in range(0, 3):
+            with self.subTest(max_depth=max_depth):
+                predictions = predict_batch(compiled, examples, max_depth=max_depth)
+                for example, code in zip(raw_examples, predictions):
+                    self.assertEqual(encodings[label.name].decode(code), predict(labelled, example, max_depth=max_depth))
+
+    def test_predict_forest(self):
+        trees = [compile_tree(t, encodings, label) for t in (tree, LeafNode("+"), LeafNode("-"))]
+        predictions = predict_forest(trees, examples, weights=[2.0, 1.0, 0.5])
+        for example, code in zip(raw_examples, predictions):
+            expected = "+" if predict(tree, example) == "+" else "-"
+            self.assertEqual(encodings[label.name].decode(code), expected)
+
+    def test_threshold_tree(self):
+        threshold_tree = TreeNode("O", {
+            "S": ThresholdNode("t", 2.5, LeafNode("-"), ThresholdNode("t", 4.0, LeafNode("+"), LeafNode("-"), label="+"), label="-"),
+            "O": LeafNode("+"),
+            "R": TreeNode("W", { "S": LeafNode("-"), "W": LeafNode("+") }, label="+"),
+        }, label="+")
+        raw = [dict(e, t=str(i % 6)) for i, e in enumerate(raw_examples)]
+        numeric = encode_examples(raw, repeat(1), encodings, ["t"])
+        compiled = compile_tree(threshold_tree, encodings, label)
+
+        self.assertEqual(compiled.attribute_values[compiled.attribute_names.index("t")], ())
+        self.assertEqual(decompile_tree(compiled), threshold_tree)
+        for max_depth in (None, 1, 2):
+            with self.subTest(max_depth=max_depth):
+                predictions = predict_batch(compiled, numeric, max_depth=max_depth)
+                for example, code in zip(raw, predictions):
+                    self.assertEqual(encodings[label.name].decode(code), predict(threshold_tree, example, max_depth=max_depth))
+        self.assertEqual(truncate(threshold_tree, 2).children["S"], ThresholdNode("t", 2.5, LeafNode("-"), LeafNode("+"), label="-"))
+
+        # a missing value stops at the threshold node
+        missing = encode_examples([{ "O": "S" }], repeat(1), encodings, ["t"])
+        self.assertEqual(list(predict_batch(compiled, missing)), [encodings[label.name].encode("-")])
+
+        forest = predict_forest([compiled, compile_tree(tree, encodings, label)], numeric, weights=[2.0, 1.0])
+        self.assertEqual(list(forest), list(predict_batch(compiled, numeric)))
+
+    def test_fraction_tree(self):
+        # examples missing a value follow every branch of nodes with fractions
+        fraction_tree = TreeNode("O", {
+            "S": ThresholdNode("t", 2.5, LeafNode("-"), LeafNode("+"), label="-", below_fraction=0.75),
+            "O": LeafNode("+"),
+            "R": TreeNode("W", { "S": LeafNode("-"), "W": LeafNode("+") }, label="+", fractions={ "S": 0.4, "W": 0.6 }),
+        }, label="+", fractions={ "S": 0.5, "O": 0.15, "R": 0.35 })
+        raw = [
+            { "O": "S", "t": "1" }, { "O": "S", "t": "3" }, { "O": "S" },
+            { "O": "R", "W": "S" }, { "O": "R" }, { "W": "S" }, { "W": "W" }, {},
+        ]
+        numeric = encode_examples(raw, repeat(1), encodings, ["t"])
+        compiled = compile_tree(fraction_tree, encodings, label)
+
+        self.assertEqual(decompile_tree(compiled), fraction_tree)
+        self.assertEqual([predict(fraction_tree, example) for example in raw], ["-", "+", "-", "-", "+", "-", "+", "-"])
+        for max_depth in (None, 0, 1):
+            with self.subTest(max_depth=max_depth):
+                predictions = predict_batch(compiled, numeric, max_depth=max_depth)
+                for example, code in zip(raw, predictions):
+                    self.assertEqual(encodings[label.name].decode(code), predict(fraction_tree, example, max_depth=max_depth))
+        self.assertEqual(list(predict_forest([compiled], numeric)), list(predict_batch(compiled, numeric)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from DecisionTree.decision_tree import LeafNode, ThresholdNode, TreeNode, height, predict, truncate
+
+def chain(length: int) -> ThresholdNode:
+    # node i sends x < i to "-" and the rest on to node i + 1
+    tree = LeafNode("+")
+    for i in reversed(range(length)):
+        tree = ThresholdNode("x", i, LeafNode("-"), tree, label="-")
+    return tree
+
+class TestDecisionTree(unittest.TestCase):
+    def test_deep_tree(self):
+        # far deeper than the recursion limit
+        tree = chain(5000)
+        self.assertEqual(height(tree), 5001)
+        self.assertEqual(predict(tree, { "x": 4998.5 }), "-")
+        self.assertEqual(predict(tree, { "x": 4999 }), "+")
+        self.assertEqual(height(truncate(tree, 100)), 101)
+
+    def test_predict_max_depth(self):
+        tree = chain(3)
+        self.assertEqual(predict(tree, { "x": 10 }), "+")
+        self.assertEqual(predict(tree, { "x": 10 }, max_depth=2), "-")
+
+    def test_truncate(self):
+        tree = TreeNode("a", label="+")
+        tree.add_child("x", LeafNode("-"))
+        tree.add_child("y", chain(2))
+        expected = TreeNode("a", label="+")
+        expected.add_child("x", LeafNode("-"))
+        expected.add_child("y", ThresholdNode("x", 0, LeafNode("-"), LeafNode("-"), label="-"))
+        self.assertEqual(truncate(tree, 2), expected)
+        self.assertEqual(truncate(tree, 0), LeafNode("+"))
+        self.assertEqual(truncate(tree, 10), tree)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+import random
 import unittest
 
-from LinearRegression.gradient_descent import compute_loss_gradient
+import numpy as np
+
+from LinearRegression.gradient_descent import Diverged, bgd, compute_loss_gradient, every_cost, sample_cost, sgd, smoothed_cost
 
 class TestGradientDescent(unittest.TestCase):
     def test_compute_loss_gradient(self):
@@ -20,13 +23,89 @@ class TestGradientDescent(unittest.TestCase):
         self.assertAlmostEqual(gradient_w["x3"], -56, places=3)
         self.assertAlmostEqual(gradient_b, -10, places=3)
 
-#        costs, w, b = bgd(
-#            [
-#                { "x1":  1, "x2": -1, "x3":  2, "y":  1 },
-#                { "x1":  1, "x2":  1, "x3":  3, "y":  4 },
-#                { "x1": -1, "x2":  1, "x3":  0, "y": -1 },
-#                { "x1":  1, "x2":  2, "x3": -4, "y": -2 },
-#                { "x1":  3, "x2": -1, "x3": -1, "y":  0 },
-#            ], set(("x1", "x2", "x3")), "y", r=0.02, max_iterations=7
-#        )
-#        print(costs, w, b)
+    def test_bgd(self):
+        examples = [
+            { "x1":  1, "x2": -1, "x3":  2, "y":  1 },
+            { "x1":  1, "x2":  1, "x3":  3, "y":  4 },
+            { "x1": -1, "x2":  1, "x3":  0, "y": -1 },
+            { "x1":  1, "x2":  2, "x3": -4, "y": -2 },
+            { "x1":  3, "x2": -1, "x3": -1, "y":  0 },
+        ]
+        costs, w, b = bgd(examples, set(("x1", "x2", "x3")), "y", r=0.02, max_iterations=100000)
+
+        # the cost and gradient at the result match the example-wise ones
+        cost, gradient_w, gradient_b = compute_loss_gradient(w, b, examples, "y")
+        self.assertAlmostEqual(costs[-1], cost, places=6)
+        for k in w.keys():
+            self.assertAlmostEqual(gradient_w[k], 0, places=3)
+        self.assertAlmostEqual(gradient_b, 0, places=3)
+        self.assertEqual(sorted(costs, reverse=True), costs)
+
+    def test_bgd_diverges(self):
+        examples = [{ "x1": 10 * i, "y": i } for i in range(5)]
+        with self.assertRaisesRegex(Diverged, "diverges"):
+            bgd(examples, set(("x1",)), "y", r=1.0, max_iterations=100000)
+
+    def test_sgd_cost_policies(self):
+        examples = [{ "x1": i / 10, "x2": (i % 3) / 3, "y": i / 5 + (i % 3) / 3 } for i in range(20)]
+        attributes = set(("x1", "x2"))
+
+        random.seed(1)
+        costs, w, b = sgd(examples, attributes, "y", 0.05, 999)
+        self.assertEqual(len(costs), 1000)
+        self.assertAlmostEqual(costs[-1], compute_loss_gradient(w, b, examples, "y")[0])
+
+        # policies only change what is recorded, not the steps taken
+        for policy, count in [
+            (every_cost(examples, "y", 100), 10),
+            (sample_cost(examples, "y", 5, 10), 100),
+            (smoothed_cost(len(examples)), 1000),
+        ]:
+            with self.subTest(count=count):
+                random.seed(1)
+                policy_costs, policy_w, policy_b = sgd(examples, attributes, "y", 0.05, 999, policy)
+                self.assertEqual(len(policy_costs), count)
+                self.assertEqual((policy_w, policy_b), (w, b))
+
+        random.seed(1)
+        every_costs, _, _ = sgd(examples, attributes, "y", 0.05, 999, every_cost(examples, "y", 100))
+        self.assertEqual(every_costs, costs[99::100])
+
+    def test_sgd_converging_not_diverged(self):
+        # the first example drawn is the first, at the origin with label 0,
+        # whose loss is 0 at zero weights; so is the sampled cost's example
+        examples = [{ "x1": i / 10, "x2": (i % 3) / 3, "y": i / 5 + (i % 3) / 3 } for i in range(20)]
+        attributes = set(("x1", "x2"))
+        for name, policy in [
+            ("every_cost", lambda: every_cost(examples, "y")),
+            ("sample_cost", lambda: sample_cost(examples, "y", 1, rng=random.Random(31))),
+            ("smoothed_cost", lambda: smoothed_cost(len(examples))),
+        ]:
+            with self.subTest(policy=name):
+                random.seed(31)
+                costs, w, b = sgd(examples, attributes, "y", 0.05, 2000, policy())
+                self.assertLess(compute_loss_gradient(w, b, examples, "y")[0], 1e-3)
+
+    def test_bgd_near_limit(self):
+        # just below 2 / (largest eigenvalue of Xᵀ X, with the bias column)
+        # the run converges, and just above it diverges long before
+        # max_iterations
+        examples = [{ "x1": i, "y": 2 * i + 1 } for i in range(4)]
+        X = np.array([[e["x1"], 1] for e in examples], dtype=np.float64)
+        limit = 2 / np.linalg.eigvalsh(X.T @ X)[-1]
+        costs, w, b = bgd(examples, set(("x1",)), "y", r=0.95 * limit, max_iterations=100000)
+        self.assertAlmostEqual(w["x1"], 2, places=3)
+        self.assertAlmostEqual(b, 1, places=3)
+        with self.assertRaisesRegex(Diverged, "diverges"):
+            bgd(examples, set(("x1",)), "y", r=1.05 * limit, max_iterations=1000)
+
+    def test_sgd_tolerance(self):
+        examples = [{ "x1": i / 10, "y": i / 5 } for i in range(20)]
+        random.seed(1)
+        costs, _, _ = sgd(examples, set(("x1",)), "y", 0.05, 100000, every_cost(examples, "y", 10), tolerance=1e-3)
+
+        self.assertLess(len(costs), 10000)
+        self.assertLessEqual(abs(costs[-1] - costs[-2]), 1e-3 * costs[-2])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import csv
+import os.path
+import tempfile
+import unittest
+
+from dataset.dataset import Attribute
+from dataset.columnar import MISSING, encode_column, make_encoding
+from dataset.income import attributes, bucket, bucket_column, bucket_value, encode_bucketed, process_examples, stream_unknowable_counts
+
+class TestBucketing(unittest.TestCase):
+    def test_int_buckets(self):
+        values = ["0", "24", "25", "26", "35", "36", "45", "46", "65", "66", "90", "?"]
+        expected = ["<25", "<25", "<25", "25-35", "25-35", "36-45", "36-45", "46-55", "56-65", ">65", ">65", "?"]
+        self.assertEqual(bucket_column("age", values), expected)
+        self.assertEqual([bucket_value("age", value) for value in values], expected)
+
+    def test_single_value_buckets(self):
+        self.assertEqual(bucket_column("education.num", ["9", "10", "11"]), ["8-9", "10", "11-12"])
+
+    def test_str_buckets(self):
+        values = ["Cuba", "?", "United-States", "Japan"]
+        self.assertEqual(bucket_column("native.country", values), ["Caribbean", "?", "US-Main", "Asia/ME"])
+
+    def test_encode_bucketed(self):
+        for name, (kind, params) in bucket.items():
+            with self.subTest(name=name):
+                encoding = make_encoding(Attribute(name, attributes[name]))
+                if kind == int:
+                    values = [str(v) for t in params for v in (t - 1, t, t + 1)] + ["?"]
+                else:
+                    values = list(params.keys()) + ["?"]
+
+                codes = encode_bucketed(name, values, encoding)
+                self.assertEqual(codes.tolist(), encode_column(bucket_column(name, values), encoding).tolist())
+                self.assertEqual(codes[-1], MISSING)
+
+class TestUnknowns(unittest.TestCase):
+    def test_streamed_counts(self):
+        rows = [
+            { "workclass": "Private", "occupation": "Sales", "native.country": "Cuba" },
+            { "workclass": "?", "occupation": "Sales", "native.country": "Japan" },
+            { "workclass": "State-gov", "occupation": "?", "native.country": "?" },
+            { "workclass": "Private", "occupation": "Tech-support", "native.country": "Cuba" },
+        ]
+        for row in rows:
+            row.update({ "age": "30", "education.num": "10", "capital.gain": "0", "capital.loss": "0", "hours.per.week": "40" })
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "train.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, list(rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+            counts = stream_unknowable_counts(path, chunk_size=2)
+
+        self.assertEqual(list(counts["workclass"].items()), [("Private", 2), ("State-gov", 1)])
+        self.assertEqual(list(counts["native.country"].items()), [("Cuba", 2), ("Japan", 1)])
+
+        examples, weights = process_examples([dict(row) for row in rows], counts)
+        self.assertAlmostEqual(sum(weights), len(rows))
+        # the third example is split over both unknown attributes
+        examples, weights = process_examples([dict(rows[2])], counts)
+        third = [(e["occupation"], e["native.country"], w) for e, w in zip(examples, weights)]
+        self.assertEqual(len(third), 4)
+        self.assertIn(("Sales", "Caribbean", 2 / 3 * 2 / 3), third)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+from dataset.chunked import examples_source
+from LinearRegression.normal_equations import least_squares
+
+examples = [
+    { "x1":  1, "x2": -1, "x3":  2, "y":  1 },
+    { "x1":  1, "x2":  1, "x3":  3, "y":  4 },
+    { "x1": -1, "x2":  1, "x3":  0, "y": -1 },
+    { "x1":  1, "x2":  2, "x3": -4, "y": -2 },
+    { "x1":  3, "x2": -1, "x3": -1, "y":  0 },
+]
+attributes = set(("x1", "x2", "x3"))
+
+class TestNormalEquations(unittest.TestCase):
+    def test_matches_lstsq(self):
+        names = sorted(attributes)
+        X = np.array([[1.0] + [e[a] for a in names] for e in examples])
+        y = np.array([e["y"] for e in examples], dtype=np.float64)
+        expected = np.linalg.lstsq(X, y, rcond=None)[0]
+        w, b = least_squares(examples, attributes, "y")
+
+        for i, k in enumerate(names):
+            self.assertAlmostEqual(w[k], expected[i + 1], places=9)
+        self.assertAlmostEqual(b, expected[0], places=9)
+
+    def test_chunks(self):
+        w, b = least_squares(examples, attributes, "y")
+        chunked_w, chunked_b = least_squares(examples_source(examples, attributes, "y", chunk_size=2), attributes, "y")
+
+        for k in attributes:
+            self.assertAlmostEqual(chunked_w[k], w[k], places=9)
+        self.assertAlmostEqual(chunked_b, b, places=9)
+
+    def test_ridge(self):
+        w, _ = least_squares(examples, attributes, "y")
+        ridge_w, _ = least_squares(examples, attributes, "y", ridge=10.0)
+        self.assertLess(np.linalg.norm(list(ridge_w.values())), np.linalg.norm(list(w.values())))
+
+    def test_singular(self):
+        # x2 repeats x1, so Xᵀ X is singular and the least squares solution
+        # splits the weight between them
+        data = [{ "x1": x, "x2": x, "y": 2 * x + 1 } for x in range(5)]
+        w, b = least_squares(data, set(("x1", "x2")), "y")
+
+        self.assertAlmostEqual(w["x1"] + w["x2"], 2.0, places=6)
+        self.assertAlmostEqual(b, 1.0, places=6)
+
+if __name__ == "__main__":
+    unittest.main()
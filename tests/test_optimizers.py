@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+
+import numpy as np
+
+from dataset.chunked import minibatches, to_source
+from LinearRegression.gradient_descent import sgd
+from Optimization.optimizers import adagrad, adam, momentum, plain
+from SVM.svm import predict, svm
+
+examples = [{ "x1": i / 10, "x2": (i % 3) / 3, "y": i / 5 + (i % 3) / 3 } for i in range(20)]
+
+class TestOptimizers(unittest.TestCase):
+    def test_plain(self):
+        p = [np.array([1.0, 2.0]), np.array([3.0])]
+        plain()(p, [np.array([1.0, -1.0]), np.array([2.0])], 0.5)
+        self.assertEqual([a.tolist() for a in p], [[0.5, 2.5], [2.0]])
+
+    def test_minimize_quadratic(self):
+        # f(p) = |p - target|^2 / 2 has gradient p - target
+        target = np.array([3.0, -2.0, 0.5])
+        for name, make, rate in [("plain", plain, 0.1), ("momentum", momentum, 0.05), ("adagrad", adagrad, 1.0), ("adam", adam, 0.1)]:
+            with self.subTest(optimizer=name):
+                optimizer = make()
+                p = [np.zeros(3)]
+                for _ in range(1000):
+                    optimizer(p, [p[0] - target], rate)
+                np.testing.assert_allclose(p[0], target, atol=1e-3)
+
+    def test_sgd_batch_of_one(self):
+        # plain steps on batches of one example follow the shuffled epochs
+        # of minibatches, one example at a time
+        names = ["x1", "x2"]
+        random.seed(1)
+        _, batch_w, batch_b = sgd(examples, names, "y", 0.05, 500, lambda *_: None, optimizer=plain())
+
+        random.seed(1)
+        source = to_source(examples, names, "y")
+        w, b = np.zeros(2), 0.0
+        steps = 0
+        while steps <= 500:
+            for X, y in minibatches(source, names, 1):
+                error = y[0] - (b + X[0] @ w)
+                w += 0.05 * error * X[0]
+                b += 0.05 * error
+                steps += 1
+                if steps > 500:
+                    break
+
+        for k, expected in zip(names, w.tolist()):
+            self.assertAlmostEqual(batch_w[k], expected, places=9)
+        self.assertAlmostEqual(batch_b, b, places=9)
+
+    def test_sgd_adam_batches(self):
+        random.seed(1)
+        costs, _, _ = sgd(examples, set(("x1", "x2")), "y", 0.05, 2000, optimizer=adam(), batch_size=4)
+        self.assertLess(costs[-1], 0.01)
+
+    def test_svm_batches(self):
+        separable = [{ "x1": x1, "x2": x2, "y": 1.0 if x1 + x2 > 0 else 0.0 } for x1, x2 in [(1, 2), (-1, -2), (2, -1), (-2, 1.5), (0.5, 0.2), (-0.5, -0.4)]]
+        random.seed(1)
+        w, b = svm(50, 1.0, lambda t: 0.01, set(("x1", "x2")), "y", separable, adam(), batch_size=2)
+        self.assertEqual([1.0 if predict(w, b, e) >= 0 else 0.0 for e in separable], [e["y"] for e in separable])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import Future
+import random
+import sys
+import unittest
+from itertools import repeat
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.columnar import encode_examples, make_encodings
+from DecisionTree import columnar_id3, id3, parallel_id3
+from DecisionTree.decision_tree import LeafNode, ThresholdNode
+
+attributes = set([Attribute("a", set("xyz")), Attribute("b", set("pq")), Attribute("t", set()), Attribute("u", set())])
+label = Attribute("label", set("+-"))
+encodings = make_encodings(A for A in attributes | set([label]) if len(A.values) > 0)
+
+def make_examples(count: int, seed: int):
+    rng = random.Random(seed)
+    raw = []
+    for _ in range(count):
+        e = { "a": rng.choice("xyz"), "b": rng.choice("pq"), "t": str(rng.randrange(50)), "u": str(rng.uniform(0, 1)) if rng.random() < 0.9 else "?" }
+        e["label"] = "+" if (e["a"] == "x") != (int(e["t"]) > 20) or rng.random() < 0.15 else "-"
+        raw.append(e)
+    return encode_examples(raw, (rng.uniform(0.5, 2) for _ in repeat(None)), encodings, ["t", "u"])
+
+class TestParallelID3(unittest.TestCase):
+    def test_share_examples_round_trip(self):
+        examples = make_examples(50, 0)
+        shared, layout = parallel_id3.share_examples(examples)
+        try:
+            attached = parallel_id3.attach_examples(shared, layout)
+            for name, column in examples.columns.items():
+                np.testing.assert_array_equal(attached.columns[name], column)
+            for name, values in examples.numeric.items():
+                np.testing.assert_array_equal(attached.numeric[name], values)
+            np.testing.assert_array_equal(attached.weights, examples.weights)
+            del attached
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_matches_serial(self):
+        examples = make_examples(2000, 1)
+        for max_depth, max_bins, fractional_missing in ((None, None, False), (4, None, False), (None, 16, False), (None, None, True)):
+            with self.subTest(max_depth=max_depth, max_bins=max_bins, fractional_missing=fractional_missing):
+                serial = columnar_id3.ID3(id3.entropy, max_depth, examples, attributes, label, encodings, max_bins=max_bins, fractional_missing=fractional_missing)
+                parallel = parallel_id3.ID3_parallel(id3.entropy, max_depth, examples, attributes, label, encodings, max_bins=max_bins, workers=2, subtree_rows=300, fractional_missing=fractional_missing)
+                self.assertEqual(parallel, serial)
+                # every subtree that may be split goes to a worker
+                parallel = parallel_id3.ID3_parallel(id3.entropy, max_depth, examples, attributes, label, encodings, max_bins=max_bins, workers=2, subtree_rows=300, fractional_missing=fractional_missing, min_subtree_rows=1)
+                self.assertEqual(parallel, serial)
+
+    def test_resolve_deep_tree(self):
+        # a chain deeper than the recursion limit, with a worker's subtree
+        # hanging off every node
+        def subtree(label):
+            future = Future()
+            future.set_result(LeafNode(label))
+            return future
+        tree = subtree("-")
+        for i in range(sys.getrecursionlimit() + 100):
+            tree = ThresholdNode("t", float(i), subtree("+"), tree)
+
+        node = parallel_id3._resolve(tree)
+        depth = 0
+        while isinstance(node, ThresholdNode):
+            self.assertEqual(node.below, LeafNode("+"))
+            node = node.above
+            depth += 1
+        self.assertEqual(node, LeafNode("-"))
+        self.assertEqual(depth, sys.getrecursionlimit() + 100)
+
+if __name__ == "__main__":
+    unittest.main()
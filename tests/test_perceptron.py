@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+
+import numpy as np
+
+from dataset.chunked import examples_source
+from Perceptron import average_perceptron, perceptron, voted_perceptron
+from Perceptron.engine import predict_batch
+
+rng = random.Random(3)
+examples = [{ "x1": rng.uniform(-2, 2), "x2": rng.uniform(-2, 2), "x3": rng.uniform(-2, 2) } for _ in range(300)]
+for e in examples:
+    # mostly separable, with a few flipped labels
+    e["y"] = float((e["x1"] - 0.5 * e["x2"] + 0.1 > 0) != (rng.random() < 0.05))
+attributes = ["x1", "x2", "x3"]
+
+def correct_epoch(count_correct, counts, examples):
+    return count_correct == len(examples)
+
+def voted_stop(count_correct, counts, examples):
+    return counts[-1] == len(examples)
+
+def reference(epochs, r, examples, stop=correct_epoch):
+    # the perceptrons example by example on dicts, as they were before the
+    # engine: final weights, averaged weights and voted weights and counts.
+    # The standard and averaged perceptrons stopped after an epoch without
+    # mistakes, the voted one with voted_stop.
+    w = { k: 0.0 for k in attributes }
+    bias = 0.0
+    a_w, a_bias = w.copy(), 0.0
+    voted, counts = [(w.copy(), bias)], [0]
+    for _ in range(epochs):
+        random.shuffle(examples)
+        count_correct = 0
+        for e in examples:
+            if perceptron.predict(w, bias, e) == e["y"]:
+                count_correct += 1
+                counts[-1] += 1
+            else:
+                change = 1.0 if e["y"] == 1 else -1.0
+                for k in w:
+                    w[k] += r * change * e[k]
+                bias += r * change * 1.0
+                voted.append((w.copy(), bias))
+                counts.append(1)
+            for k in a_w:
+                a_w[k] += w[k]
+            a_bias += bias
+        if stop(count_correct, counts, examples):
+            break
+    return (w, bias), (a_w, a_bias), ([v[0] for v in voted], [v[1] for v in voted], counts)
+
+class TestPerceptron(unittest.TestCase):
+    def test_matches_reference(self):
+        for r in (1, 0.1):
+            with self.subTest(r=r):
+                random.seed(11)
+                final, averaged, voted = reference(10, r, list(examples))
+
+                random.seed(11)
+                self.assertEqual(perceptron.perceptron(10, r, "y", attributes, list(examples)), final)
+                # the averaged weights are summed lazily, so they agree to rounding
+                random.seed(11)
+                a_weights, a_bias = average_perceptron.perceptron(10, r, "y", attributes, list(examples))
+                for k in attributes:
+                    self.assertAlmostEqual(a_weights[k], averaged[0][k], delta=1e-9 * abs(averaged[0][k]))
+                self.assertAlmostEqual(a_bias, averaged[1], delta=1e-9 * abs(averaged[1]))
+                random.seed(11)
+                _, _, voted = reference(10, r, list(examples), voted_stop)
+                random.seed(11)
+                model = voted_perceptron.perceptron(10, r, "y", attributes, list(examples))
+                weights, biases, counts = voted
+                self.assertEqual([dict(zip(model.attributes, ws)) for ws in model.weights.tolist()], weights)
+                self.assertEqual(model.biases.tolist(), biases)
+                self.assertEqual(model.counts.tolist(), counts)
+
+    def test_voted_stops_as_before(self):
+        # on separable examples an epoch without mistakes comes well before
+        # the latest perceptron's count reaches the number of examples
+        separable = [{ **e, "y": float(e["x1"] - 0.5 * e["x2"] + 0.1 > 0) } for e in examples]
+        random.seed(5)
+        _, _, (weights, biases, counts) = reference(100, 1, list(separable), voted_stop)
+        random.seed(5)
+        model = voted_perceptron.perceptron(100, 1, "y", attributes, list(separable))
+        self.assertEqual(model.counts.tolist(), counts)
+        self.assertEqual(model.biases.tolist(), biases)
+        random.seed(5)
+        _, _, (_, _, early) = reference(100, 1, list(separable))
+        self.assertLess(sum(early), sum(counts))
+
+    def test_shuffles_in_place(self):
+        data = list(examples)
+        random.seed(5)
+        perceptron.perceptron(3, 1, "y", attributes, data)
+        shuffled = list(examples)
+        random.seed(5)
+        reference(3, 1, shuffled)
+        self.assertEqual(data, shuffled)
+
+    def test_source(self):
+        source = examples_source(examples, attributes, "y", chunk_size=64)
+        weights, bias = perceptron.perceptron(10, 1, "y", attributes, source)
+        self.assertGreater(np.mean([perceptron.predict(weights, bias, e) == e["y"] for e in examples]), 0.85)
+
+    def test_predict_batch(self):
+        weights, bias = perceptron.perceptron(10, 1, "y", attributes, list(examples))
+        X = np.array([[e[k] for k in attributes] for e in examples])
+        w = np.array([weights[k] for k in attributes])
+        self.assertEqual(predict_batch(w, bias, X).tolist(), [perceptron.predict(weights, bias, e) for e in examples])
+
+    def test_voted_predict(self):
+        random.seed(2)
+        model = voted_perceptron.perceptron(10, 1, "y", attributes, list(examples))
+        self.assertGreater(len(model), 10)
+
+        # the vote of every stored perceptron, example by example
+        def vote(example):
+            total = 0
+            for ws, bias, count in zip(model.weights.tolist(), model.biases.tolist(), model.counts.tolist()):
+                total += count * (1 if perceptron.predict(dict(zip(model.attributes, ws)), bias, example) == 1 else -1)
+            return 1 if total >= 0 else 0
+
+        X = np.array([[e[k] for k in model.attributes] for e in examples])
+        expected = [vote(e) for e in examples]
+        self.assertEqual(voted_perceptron.predict_batch(model, X).tolist(), expected)
+        self.assertEqual([voted_perceptron.predict(model, e) for e in examples], expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from LinearRegression.gradient_descent import Diverged, bgd
+from LinearRegression.rate_search import search_rates
+
+examples = [{ "x1": i, "x2": (i % 3) - 1, "y": 2 * i - (i % 3) + 1 } for i in range(8)]
+attributes = set(("x1", "x2"))
+
+class TestRateSearch(unittest.TestCase):
+    def test_largest_converging_rate(self):
+        rates = [1.0 / 2 ** k for k in range(12)]
+        fit, diverged = search_rates(lambda r: bgd(examples, attributes, "y", r, 100000), rates, processes=2)
+
+        # halving the rate until bgd converges finds the same rate and fit
+        r = 1.0
+        while True:
+            try:
+                costs, w, bias = bgd(examples, attributes, "y", r, 100000)
+                break
+            except Diverged:
+                r /= 2
+        self.assertEqual(fit.r, r)
+        self.assertEqual(diverged, [d for d in rates if d > r])
+        self.assertEqual(fit.costs, costs)
+        self.assertEqual(fit.w, w)
+        self.assertEqual(fit.bias, bias)
+
+    def test_all_diverge(self):
+        with self.assertRaises(Diverged):
+            search_rates(lambda r: bgd(examples, attributes, "y", r, 100000), [4.0, 2.0, 1.0], processes=2)
+
+if __name__ == "__main__":
+    unittest.main()
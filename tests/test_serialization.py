@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import tempfile
+import unittest
+
+from dataset.dataset import Attribute
+from dataset.columnar import make_encodings
+from DecisionTree.compiled import compile_tree, decompile_tree
+from DecisionTree.decision_tree import LeafNode, ThresholdNode, TreeNode
+from NeuralNetwork.backpropagation import train_sgd
+from models.serialization import load_network, load_trees, save_network, save_trees
+
+O = Attribute("O", set(("S", "O", "R")))
+H = Attribute("H", set(("H", "N", "L")))
+W = Attribute("W", set(("S", "W")))
+label = Attribute("Play?", set(("-", "+")))
+encodings = make_encodings((O, H, W, label))
+
+trees = [
+    TreeNode("O", {
+        "S": TreeNode("H", { "H": LeafNode("-"), "N": LeafNode("+"), "L": LeafNode("-") }),
+        "O": LeafNode("+"),
+        "R": TreeNode("W", { "S": LeafNode("-"), "W": LeafNode("+") }),
+    }),
+    TreeNode("W", { "S": LeafNode("-"), "W": LeafNode("+") }),
+    LeafNode("+"),
+]
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "model")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_trees_round_trip(self):
+        save_trees(self.path, [compile_tree(tree, encodings, label) for tree in trees], alphas=[0.5, 0.25, 0.125])
+
+        for use_mmap in (True, False):
+            with self.subTest(use_mmap=use_mmap):
+                loaded, alphas = load_trees(self.path, use_mmap)
+                self.assertEqual([decompile_tree(compiled) for compiled in loaded], trees)
+                self.assertEqual(list(alphas), [0.5, 0.25, 0.125])
+
+    def test_trees_without_alphas(self):
+        save_trees(self.path, [compile_tree(trees[0], encodings, label)])
+        loaded, alphas = load_trees(self.path)
+        self.assertIsNone(alphas)
+        self.assertEqual(decompile_tree(loaded[0]), trees[0])
+
+    def test_threshold_trees_round_trip(self):
+        threshold_tree = TreeNode("W", { "S": ThresholdNode("t", 0.5, LeafNode("-"), LeafNode("+"), label="-"), "W": LeafNode("+") }, label="+")
+        save_trees(self.path, [compile_tree(tree, encodings, label) for tree in (trees[0], threshold_tree)])
+        loaded, _ = load_trees(self.path)
+        self.assertIsNone(loaded[0].threshold)
+        self.assertEqual([decompile_tree(compiled) for compiled in loaded], [trees[0], threshold_tree])
+
+    def test_fraction_trees_round_trip(self):
+        fraction_tree = TreeNode("W", {
+            "S": ThresholdNode("t", 0.5, LeafNode("-"), LeafNode("+"), label="-", below_fraction=0.25),
+            "W": LeafNode("+"),
+        }, label="+", fractions={ "S": 0.5, "W": 0.5 })
+        save_trees(self.path, [compile_tree(tree, encodings, label) for tree in (trees[0], fraction_tree)])
+        loaded, _ = load_trees(self.path)
+        self.assertIsNone(loaded[0].fraction)
+        self.assertEqual([decompile_tree(compiled) for compiled in loaded], [trees[0], fraction_tree])
+
+    def test_network_round_trip(self):
+        random.seed(0)
+        examples = [
+            { "x1": 0.5, "x2": -1.0, "y": 1 },
+            { "x1": -0.5, "x2": 1.0, "y": 0 },
+        ]
+        w = train_sgd(examples, ["x1", "x2"], "y", width=3, T=1, r0=0.1, d=1, initial_weight=random.random)
+
+        save_network(self.path, w)
+        self.assertEqual(load_network(self.path), w)
+
+    def test_kind_mismatch(self):
+        save_trees(self.path, [compile_tree(trees[2], encodings, label)])
+        with self.assertRaises(ValueError):
+            load_network(self.path)
+
+    def test_not_a_model(self):
+        with open(self.path, "w") as f:
+            f.write(repr(trees))
+        with self.assertRaises(ValueError):
+            load_trees(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
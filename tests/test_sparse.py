@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+
+import numpy as np
+
+from dataset.dataset import Attribute
+from dataset.sparse import one_hot, one_hot_names
+from LinearRegression.gradient_descent import bgd, every_cost, predict_batch as predict_linear, sgd
+from LinearRegression.normal_equations import least_squares
+from Perceptron import average_perceptron, perceptron, voted_perceptron
+from SVM.svm import predict as predict_svm, predict_batch as predict_svm_batch, svm
+
+attributes = [
+    Attribute("color", set(("red", "green", "blue"))),
+    Attribute("size", set(("small", "large"))),
+    Attribute("shape", set(("round", "square", "flat", "long"))),
+]
+
+rng = random.Random(8)
+discrete_examples = []
+for _ in range(200):
+    example = { a.name: rng.choice(sorted(a.values)) for a in attributes }
+    example["label"] = "1" if (example["color"] == "red") != (example["shape"] in ("flat", "long")) else "0"
+    discrete_examples.append(example)
+
+examples = one_hot(discrete_examples, attributes, "label", lambda v: 1.0 if v == "1" else 0.0)
+dense = list(examples)
+names = list(examples.attributes)
+
+class TestOneHot(unittest.TestCase):
+    def test_encoding(self):
+        self.assertEqual(names, one_hot_names(attributes))
+        self.assertEqual(names[:3], ["has_color_blue", "has_color_green", "has_color_red"])
+        self.assertEqual(examples.X.shape, (200, 9))
+        self.assertEqual(examples.X.nnz, 3 * 200)
+
+        example = dense[0]
+        for a in attributes:
+            for value in a.values:
+                self.assertEqual(example[f"has_{a.name}_{value}"], 1.0 if discrete_examples[0][a.name] == value else 0.0)
+        self.assertEqual(example["label"], 1.0 if discrete_examples[0]["label"] == "1" else 0.0)
+
+    def test_unknown_and_unlabeled(self):
+        encoded = one_hot([{ "color": "red", "size": "?", "shape": "flat" }], attributes, "label")
+        indices, values = encoded.row(0)
+        self.assertEqual([names[i] for i in indices], ["has_color_red", "has_shape_flat"])
+        self.assertEqual(values.tolist(), [1.0, 1.0])
+        self.assertTrue(np.isnan(encoded.y[0]))
+
+class TestSparseLearners(unittest.TestCase):
+    def test_perceptrons(self):
+        # the first epoch is shuffled the same way for a list and sparse
+        # examples, and one-hot products are exact
+        for module in (perceptron, average_perceptron):
+            with self.subTest(module=module.__name__):
+                random.seed(3)
+                expected = module.perceptron(1, 1, "label", names, list(dense))
+                random.seed(3)
+                weights, bias = module.perceptron(1, 1, "label", names, examples)
+                self.assertEqual(weights, expected[0])
+                self.assertEqual(bias, expected[1])
+                self.assertEqual(
+                    module.predict_batch(weights, bias, examples.X, names).tolist(),
+                    [module.predict(weights, bias, e) for e in dense]
+                )
+
+        random.seed(3)
+        voted = voted_perceptron.perceptron(10, 1, "label", names, examples)
+        self.assertEqual(
+            voted_perceptron.predict_batch(voted, examples.X).tolist(),
+            [voted_perceptron.predict(voted, e) for e in dense]
+        )
+
+    def test_svm(self):
+        schedule = lambda t: 0.01 / (1 + t)
+        random.seed(5)
+        expected_w, expected_b = svm(5, 0.1, schedule, set(names), "label", list(dense))
+        random.seed(5)
+        w, b = svm(5, 0.1, schedule, set(names), "label", examples)
+
+        for k in names:
+            self.assertAlmostEqual(w[k], expected_w[k], places=9)
+        self.assertAlmostEqual(b, expected_b, places=9)
+        np.testing.assert_allclose(predict_svm_batch(w, b, examples.X, names), [predict_svm(w, b, e) for e in dense])
+
+    def test_bgd(self):
+        _, expected_w, expected_b = bgd(list(dense), set(names), "label", 0.001, 100000)
+        _, w, b = bgd(examples, set(names), "label", 0.001, 100000)
+        for k in names:
+            self.assertAlmostEqual(w[k], expected_w[k], places=9)
+        self.assertAlmostEqual(b, expected_b, places=9)
+
+    def test_sgd(self):
+        random.seed(6)
+        expected_costs, expected_w, expected_b = sgd(list(dense), set(names), "label", 0.01, 500, every_cost(dense, "label", 50))
+        random.seed(6)
+        costs, w, b = sgd(examples, set(names), "label", 0.01, 500, every_cost(examples, "label", 50))
+
+        np.testing.assert_allclose(costs, expected_costs)
+        for k in names:
+            self.assertAlmostEqual(w[k], expected_w[k], places=9)
+        self.assertAlmostEqual(b, expected_b, places=9)
+
+    def test_sgd_cost_reused(self):
+        # one policy over runs with the attributes in different orders
+        policy = every_cost(examples, "label", 50)
+        for order in (names, names[::-1]):
+            with self.subTest(first=order[0]):
+                random.seed(6)
+                expected_costs, _, _ = sgd(list(dense), order, "label", 0.01, 500, every_cost(dense, "label", 50))
+                random.seed(6)
+                costs, _, _ = sgd(examples, order, "label", 0.01, 500, policy)
+                np.testing.assert_allclose(costs, expected_costs)
+
+    def test_least_squares(self):
+        # the one-hot columns of an attribute sum to the bias column, so the
+        # fit is only unique with a ridge term
+        expected_w, expected_b = least_squares(list(dense), names, "label", ridge=1.0)
+        w, b = least_squares(examples, names, "label", ridge=1.0)
+        for k in names:
+            self.assertAlmostEqual(w[k], expected_w[k], places=9)
+        self.assertAlmostEqual(b, expected_b, places=9)
+
+        predictions = predict_linear(w, b, examples.X, names)
+        np.testing.assert_allclose(predictions, [b + sum(w[k] * e[k] for k in names) for e in dense])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os.path
+import tempfile
+import unittest
+
+import numpy as np
+
+from dataset.stream import QuantileSketch, column_sketches, count_values, read_chunks
+
+class TestReadChunks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, text: str) -> str:
+        path = os.path.join(self.directory.name, "data.csv")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_chunks(self):
+        path = self.write("a,b\n1,x\n2,?\n3,y\n4,x\n5,x\n")
+        chunks = list(read_chunks(path, chunk_size=2))
+
+        self.assertEqual([len(chunk["a"]) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sum((chunk["a"] for chunk in chunks), []), ["1", "2", "3", "4", "5"])
+
+        counts = count_values(read_chunks(path, chunk_size=2), ["b"], lambda value: value != "?")
+        self.assertEqual(list(counts["b"].items()), [("x", 3), ("y", 1)])
+
+        sketches = column_sketches(read_chunks(path, chunk_size=2), ["a"])
+        self.assertEqual(sketches["a"].median(), 3.0)
+
+    def test_names(self):
+        path = self.write("1,x\n2,y\n")
+        self.assertEqual(list(read_chunks(path, ["a", "b"])), [{ "a": ["1", "2"], "b": ["x", "y"] }])
+
+    def test_empty(self):
+        path = self.write("a,b\n")
+        self.assertEqual(list(read_chunks(path)), [{ "a": [], "b": [] }])
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_exact(self):
+        sketch = QuantileSketch(100)
+        sketch.update([4, 1, np.nan, 3, 2])
+
+        self.assertTrue(sketch.exact())
+        self.assertEqual(len(sketch), 4)
+        self.assertEqual(sketch.median(), 2.5)
+        self.assertEqual(sketch.quantile(0.5), 2.0)
+        self.assertEqual(sketch.quantile(1.0), 4.0)
+
+    def test_bounded(self):
+        values = np.random.default_rng(0).permutation(200000).astype(np.float64)
+        sketch = QuantileSketch(200)
+        for chunk in np.array_split(values, 20):
+            sketch.update(chunk)
+
+        self.assertFalse(sketch.exact())
+        self.assertEqual(len(sketch), len(values))
+        self.assertLess(sum(len(items) for items in sketch.levels), 3 * 200)
+        for q in (0.1, 0.5, 0.9):
+            with self.subTest(q=q):
+                rank = np.mean(values <= sketch.quantile(q))
+                self.assertAlmostEqual(rank, q, delta=0.02)
+
+    def test_merge(self):
+        values = np.random.default_rng(1).permutation(100000).astype(np.float64)
+        a, b = QuantileSketch(200), QuantileSketch(200, seed=1)
+        a.update(values[:30000])
+        b.update(values[30000:])
+        a.merge(b)
+
+        self.assertEqual(len(a), len(values))
+        self.assertAlmostEqual(np.mean(values <= a.median()), 0.5, delta=0.02)
+
+if __name__ == "__main__":
+    unittest.main()